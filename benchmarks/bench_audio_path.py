@@ -0,0 +1,244 @@
+"""CPU per session of the audio path, with the previous and the planned audio settings.
+
+Runs --sessions AgentService pipelines with the simulated STT/LLM/TTS in
+this process, each behind a loopback transport that does what the WebRTC
+transport does with real calls: it decodes 20 ms Opus frames (48 kHz
+stereo) into the input rate and feeds them in real time, looping a
+synthetic utterance followed by silence, and it encodes the bot's audio
+back to Opus as the WebRTC track consumes it. After each utterance the bot
+speaks a reply of --reply-words (queued as TTSSpeakFrame, the simulated LLM
+stays silent so the sentence tokenizer's NLTK data is not needed). Reports
+the process CPU time per session while all sessions run.
+
+"previous" is the audio setup before the sample rate plan (input audio
+passed on after the STT), "planned" the AudioConfig defaults (see
+utils/constants.get_audio_config) with the opt-in 40 ms output chunks
+(AUDIO_OUT_10MS_CHUNKS=4).
+
+Usage:
+    python -m benchmarks.bench_audio_path --sessions 8 --seconds 30
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+from aiortc.codecs.opus import OpusEncoder
+from av import AudioFrame
+from av.audio.resampler import AudioResampler
+from loguru import logger
+from pipecat.frames.frames import (
+    CancelFrame,
+    EndFrame,
+    InputAudioRawFrame,
+    OutputAudioRawFrame,
+    StartFrame,
+    TTSSpeakFrame,
+)
+from pipecat.transports.base_input import BaseInputTransport
+from pipecat.transports.base_output import BaseOutputTransport
+from pipecat.transports.base_transport import BaseTransport, TransportParams
+from pipecat.transports.network.small_webrtc import RawAudioTrack
+
+from benchmarks.load_test import SAMPLE_RATE, FRAME_SAMPLES, synthetic_utterance
+from services.simulated_providers_service import REPLY_WORDS
+
+VARIANTS = {
+    "previous": {"AUDIO_STT_PASSTHROUGH": "true"},
+    "planned": {"AUDIO_OUT_10MS_CHUNKS": "4"},
+}
+
+
+class LoopbackInput(BaseInputTransport):
+    """Feeds decoded Opus frames, converted to the input rate like SmallWebRTCClient does."""
+
+    def __init__(self, transport: "LoopbackTransport", params: TransportParams, audio: np.ndarray, **kwargs):
+        super().__init__(params, **kwargs)
+        self._transport = transport
+        self._audio = audio
+        self._feed_task = None
+
+    async def start(self, frame: StartFrame):
+        await super().start(frame)
+        if self._feed_task:
+            return
+        self._resampler = AudioResampler("s16", "mono", self.sample_rate)
+        self._feed_task = self.create_task(self._feed())
+        await self.set_transport_ready(frame)
+        await self._transport._call_event_handler("on_client_connected", None)
+
+    async def stop(self, frame: EndFrame):
+        await super().stop(frame)
+        await self._stop_feed()
+
+    async def cancel(self, frame: CancelFrame):
+        await super().cancel(frame)
+        await self._stop_feed()
+
+    async def _stop_feed(self):
+        if self._feed_task:
+            await self.cancel_task(self._feed_task)
+            self._feed_task = None
+
+    async def _feed(self):
+        start = time.perf_counter()
+        for i in range(10**9):
+            offset = i * FRAME_SAMPLES % (len(self._audio) - FRAME_SAMPLES)
+            samples = self._audio[offset : offset + FRAME_SAMPLES]
+            # What the Opus decoder hands over: 48 kHz interleaved stereo
+            decoded = AudioFrame.from_ndarray(
+                np.repeat(samples, 2)[None, :], format="s16", layout="stereo"
+            )
+            decoded.sample_rate = SAMPLE_RATE
+            for frame in self._resampler.resample(decoded):
+                await self.push_audio_frame(
+                    InputAudioRawFrame(
+                        audio=frame.to_ndarray().astype(np.int16).tobytes(),
+                        sample_rate=frame.sample_rate,
+                        num_channels=1,
+                    )
+                )
+            await asyncio.sleep(max(0.0, start + (i + 1) * 0.02 - time.perf_counter()))
+
+
+class LoopbackOutput(BaseOutputTransport):
+    """Queues the bot's audio on a WebRTC track and encodes it to Opus in real time."""
+
+    def __init__(self, params: TransportParams, **kwargs):
+        super().__init__(params, **kwargs)
+        self._track = None
+        self._send_task = None
+
+    async def start(self, frame: StartFrame):
+        await super().start(frame)
+        if self._send_task:
+            return
+        self._track = RawAudioTrack(sample_rate=self.sample_rate)
+        self._send_task = self.create_task(self._send())
+        await self.set_transport_ready(frame)
+
+    async def stop(self, frame: EndFrame):
+        await super().stop(frame)
+        await self._stop_send()
+
+    async def cancel(self, frame: CancelFrame):
+        await super().cancel(frame)
+        await self._stop_send()
+
+    async def _stop_send(self):
+        if self._send_task:
+            await self.cancel_task(self._send_task)
+            self._send_task = None
+
+    async def _send(self):
+        encoder = OpusEncoder()
+        while True:
+            encoder.encode(await self._track.recv())
+            # The track does not wait when it is behind, a real sender yields on the network write
+            await asyncio.sleep(0)
+
+    async def write_audio_frame(self, frame: OutputAudioRawFrame):
+        await self._track.add_audio_bytes(frame.audio)
+
+
+class LoopbackTransport(BaseTransport):
+    def __init__(self, params: TransportParams, audio: np.ndarray):
+        super().__init__()
+        self._input = LoopbackInput(self, params, audio, name="LoopbackInput")
+        self._output = LoopbackOutput(params, name="LoopbackOutput")
+        self._register_event_handler("on_client_connected")
+        self._register_event_handler("on_client_disconnected")
+
+    def input(self) -> LoopbackInput:
+        return self._input
+
+    def output(self) -> LoopbackOutput:
+        return self._output
+
+
+def caller_audio(args) -> np.ndarray:
+    """One utterance followed by silence, looped by every session."""
+    speech = synthetic_utterance(args.speak_seconds, seed=1)
+    silence = np.zeros(int(args.silence_seconds * SAMPLE_RATE), dtype=np.int16)
+    return np.concatenate([speech, silence])
+
+
+async def reply(agent, args):
+    """Speak a reply after each of the caller's utterances."""
+    text = " ".join(REPLY_WORDS[: args.reply_words])
+    await asyncio.sleep(args.speak_seconds + 1)
+    while True:
+        await agent.task.queue_frame(TTSSpeakFrame(text))
+        await asyncio.sleep(args.speak_seconds + args.silence_seconds)
+
+
+async def run_variant(args, env: dict) -> float:
+    """Returns the CPU time per session as a share of one core."""
+    os.environ.update({"AUDIO_STT_PASSTHROUGH": "false", "AUDIO_OUT_10MS_CHUNKS": "2", **env})
+    from services.agent_service import AgentService
+    from services.providers_service import ProvidersService
+
+    audio = caller_audio(args)
+    agents, runs, replies = [], [], []
+    for _ in range(args.sessions):
+        agent = AgentService()
+        agent.prepare()
+        params = TransportParams(
+            **ProvidersService.get_audio_params(agent.agent_config.audio, agent.vad_analyzer)
+        )
+        await agent.initialize(LoopbackTransport(params, audio))
+        agents.append(agent)
+        runs.append(asyncio.create_task(agent.run()))
+        replies.append(asyncio.create_task(reply(agent, args)))
+
+    # Let every session get through its greeting before measuring
+    await asyncio.sleep(args.warmup_seconds)
+    cpu, wall = time.process_time(), time.perf_counter()
+    await asyncio.sleep(args.seconds)
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+
+    for task in replies:
+        task.cancel()
+    await asyncio.gather(*replies, return_exceptions=True)
+    # A pipeline busy with a reply can miss its CancelFrame, the numbers are taken already
+    await asyncio.wait([asyncio.create_task(agent.stop()) for agent in agents], timeout=5)
+    for run in runs:
+        run.cancel()
+    await asyncio.wait(runs, timeout=5)
+    return cpu / wall / args.sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=30, help="measured time")
+    parser.add_argument("--warmup-seconds", type=float, default=5)
+    parser.add_argument("--speak-seconds", type=float, default=2.5)
+    parser.add_argument("--silence-seconds", type=float, default=8)
+    parser.add_argument("--reply-words", type=int, default=20)
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+    os.environ.update(
+        {
+            "LLM_PROVIDER": "simulated",
+            "STT_PROVIDER": "simulated",
+            "TTS_PROVIDER": "simulated",
+            "TTS_CACHE_ENABLED": "false",
+            "SIMULATED_LLM_REPLY_WORDS": "0",
+        }
+    )
+
+    results = {}
+    for name, env in VARIANTS.items():
+        results[name] = asyncio.run(run_variant(args, env))
+        print(f"{name:>8}: {results[name] * 100:5.1f}% of a core per session")
+    saved = 1 - results["planned"] / results["previous"]
+    print(f"{'':>8}  {saved:.0%} less CPU per session")
+
+
+if __name__ == "__main__":
+    main()
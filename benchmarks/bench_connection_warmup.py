@@ -0,0 +1,194 @@
+"""First-turn vs steady-state LLM time to first token, with and without connection warm-up.
+
+Runs sessions one after another against the local Gemini stub
+(benchmarks/gemini_stub.py) behind a proxy that delays every new TCP
+connection by --handshake-ms, standing in for the DNS, TCP and TLS round
+trips to a remote provider. Each session waits --connect-ms for its client
+to connect (the WebRTC/Daily handshake) before the first turn, then plays
+--turns more turns. Compares a client per session (what the services do on
+their own), the same with a warm-up request during the handshake, and
+clients sharing the ConnectionPoolService sessions with warm-up.
+
+Usage:
+    python -m benchmarks.bench_connection_warmup --sessions 8 --handshake-ms 150
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from google.genai.types import HttpOptions
+from loguru import logger
+from pipecat.frames.frames import LLMFullResponseEndFrame, LLMTextFrame
+from pipecat.pipeline.pipeline import Pipeline
+from pipecat.pipeline.runner import PipelineRunner
+from pipecat.pipeline.task import PipelineParams, PipelineTask
+from pipecat.processors.aggregators.openai_llm_context import (
+    OpenAILLMContext,
+    OpenAILLMContextFrame,
+)
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+from pipecat.services.google.llm import GoogleLLMContext
+
+from benchmarks.gemini_stub import GeminiStub
+from services.connection_pool_service import ConnectionPoolService
+from services.pooled_google_service import PooledGoogleLLMService
+from services.prompt_service import PromptService, PromptType
+
+
+class HandshakeProxy:
+    """TCP proxy that makes every new connection wait `handshake_ms` before it is usable."""
+
+    def __init__(self, upstream_port: int, port: int = 54323, handshake_ms: float = 150):
+        self.upstream_port = upstream_port
+        self.port = port
+        self.handshake_ms = handshake_ms
+        self.connections = 0
+        self._server = None
+        self._writers = set()
+        self._handlers = set()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", self.port)
+
+    async def stop(self):
+        self._server.close()
+        for writer in self._writers:
+            writer.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._handlers.add(asyncio.current_task())
+        await asyncio.sleep(self.handshake_ms / 1000)
+        upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", self.upstream_port)
+        self._writers.update((writer, upstream_writer))
+        await asyncio.gather(
+            self._pipe(reader, upstream_writer), self._pipe(upstream_reader, writer)
+        )
+        self._writers.difference_update((writer, upstream_writer))
+        self._handlers.discard(asyncio.current_task())
+
+    @staticmethod
+    async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while data := await reader.read(65536):
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+class ReplySink(FrameProcessor):
+    def __init__(self):
+        super().__init__()
+        self.first_token = asyncio.Event()
+        self.done = asyncio.Event()
+
+    async def process_frame(self, frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+        if isinstance(frame, LLMTextFrame):
+            self.first_token.set()
+        elif isinstance(frame, LLMFullResponseEndFrame):
+            self.done.set()
+        await self.push_frame(frame, direction)
+
+
+async def run_session(args, proxy: HandshakeProxy, pool: ConnectionPoolService, warm_up: bool) -> list:
+    """Returns the time to first token of each turn, the first one after the handshake."""
+    llm = PooledGoogleLLMService(
+        api_key="stub",
+        model="gemini-2.5-flash",
+        http_options=HttpOptions(base_url=proxy.url),
+    )
+    if warm_up:
+        warm_up_task = asyncio.create_task(
+            pool.warm_up(llm)
+        )
+    sink = ReplySink()
+    task = PipelineTask(Pipeline([llm, sink]), params=PipelineParams())
+    runner = asyncio.create_task(PipelineRunner(handle_sigint=False).run(task))
+    await asyncio.sleep(args.connect_ms / 1000)
+
+    context = GoogleLLMContext.upgrade_to_google(
+        OpenAILLMContext(
+            [
+                {"role": "system", "content": PromptService.SYSTEM_PROMPTS[PromptType.DEFAULT]},
+                {"role": "user", "content": "I had a really long day at work today"},
+            ]
+        )
+    )
+    latencies = []
+    try:
+        for _ in range(args.turns + 1):
+            sink.first_token.clear()
+            sink.done.clear()
+            start = time.perf_counter()
+            await task.queue_frame(OpenAILLMContextFrame(context))
+            await sink.first_token.wait()
+            latencies.append(time.perf_counter() - start)
+            await sink.done.wait()
+    finally:
+        await task.cancel()
+        await runner
+        if warm_up:
+            await warm_up_task
+    return latencies
+
+
+async def run_variant(args, stub: GeminiStub, shared: bool, warm_up: bool) -> dict:
+    proxy = HandshakeProxy(stub.port, handshake_ms=args.handshake_ms)
+    await proxy.start()
+    # The pooled services use the process-wide pool
+    pool = ConnectionPoolService._instance = ConnectionPoolService()
+    if shared:
+        await pool.start()
+    first, steady = [], []
+    try:
+        for _ in range(args.sessions):
+            latencies = await run_session(args, proxy, pool, warm_up)
+            first.append(latencies[0])
+            steady.extend(latencies[1:])
+    finally:
+        await pool.stop()
+        await proxy.stop()
+    return {"first": sorted(first), "steady": sorted(steady), "connections": proxy.connections}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=5, help="turns after the first one in each session")
+    parser.add_argument("--handshake-ms", type=float, default=150, help="cost of opening a connection")
+    parser.add_argument("--connect-ms", type=float, default=500, help="client connection time before the first turn")
+    parser.add_argument("--base-ms", type=float, default=300, help="stub time to first token")
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    stub = GeminiStub(base_ms=args.base_ms, uncached_ms_per_1k=0)
+    stub.start_in_thread()
+    for name, shared, warm_up in (
+        ("per-session", False, False),
+        ("+ warm-up", False, True),
+        ("shared + warm-up", True, True),
+    ):
+        result = asyncio.run(run_variant(args, stub, shared, warm_up))
+        first, steady = result["first"], result["steady"]
+        print(
+            f"{name:>16}: first turn p50={first[len(first) // 2] * 1000:4.0f}ms "
+            f"max={first[-1] * 1000:4.0f}ms | steady p50={steady[len(steady) // 2] * 1000:4.0f}ms | "
+            f"connections opened {result['connections']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
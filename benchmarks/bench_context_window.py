@@ -0,0 +1,145 @@
+"""Time to first token over a long session, with and without the context window.
+
+Plays a long conversation through a pipeline made of ContextWindowProcessor
+(or nothing, as the baseline), the simulated LLM and a sink, one user turn
+at a time, and measures the time from sending the context until the first
+token arrives. The simulated LLM's time to first token grows with the
+prompt (SimulatedProfile.llm_ms_per_1k_prompt_tokens), like real providers
+do because of prefill. Summaries are produced by a local stand-in that
+takes --summary-ms, so no API keys are needed.
+
+Usage:
+    python -m benchmarks.bench_context_window --turns 120
+"""
+
+import argparse
+import asyncio
+import time
+
+from pipecat.frames.frames import LLMFullResponseEndFrame, LLMTextFrame
+from pipecat.pipeline.pipeline import Pipeline
+from pipecat.pipeline.runner import PipelineRunner
+from pipecat.pipeline.task import PipelineParams, PipelineTask
+from pipecat.processors.aggregators.openai_llm_context import (
+    OpenAILLMContext,
+    OpenAILLMContextFrame,
+)
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from models.agent_model import SimulatedProfile
+from services.context_window_service import ContextWindowProcessor
+from services.prompt_service import PromptService, PromptType
+from services.simulated_providers_service import SimulatedLLMService
+from utils.transcript import estimate_tokens
+
+USER_TURNS = [
+    "Work has been really overwhelming lately, my manager keeps adding projects and I feel like I can never catch up no matter how late I stay.",
+    "I tried the breathing exercise you mentioned last time, it helped a little before the meeting, but afterwards the worry came right back.",
+    "My sister called yesterday and we ended up arguing about our parents again, and I could not sleep for hours after that conversation.",
+    "Sometimes I wonder if I am just not good enough for this job, even though my reviews have been fine and people say I do well.",
+]
+
+
+class ReplySink(FrameProcessor):
+    """Records the first token and the full reply of each LLM response."""
+
+    def __init__(self):
+        super().__init__()
+        self.first_token = asyncio.Event()
+        self.done = asyncio.Event()
+        self.text = ""
+
+    async def process_frame(self, frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+        if isinstance(frame, LLMTextFrame):
+            self.text += frame.text
+            self.first_token.set()
+        elif isinstance(frame, LLMFullResponseEndFrame):
+            self.done.set()
+        await self.push_frame(frame, direction)
+
+
+async def run_session(args, windowed: bool) -> list:
+    profile = SimulatedProfile(jitter=0)
+    llm = SimulatedLLMService(profile=profile)
+    sink = ReplySink()
+    window = None
+    processors = [llm, sink]
+    if windowed:
+
+        async def summarize(messages, previous):
+            await asyncio.sleep(args.summary_ms / 1000)
+            # A summary of roughly the size the real one has
+            return " ".join(["note"] * 250)
+
+        window = ContextWindowProcessor(
+            token_budget=args.budget, keep_turns=args.keep_turns, summarizer=summarize
+        )
+        processors.insert(0, window)
+
+    task = PipelineTask(Pipeline(processors), params=PipelineParams())
+    runner = asyncio.create_task(PipelineRunner(handle_sigint=False).run(task))
+
+    system_prompt = PromptService.SYSTEM_PROMPTS[PromptType.DEFAULT]
+    context = OpenAILLMContext([{"role": "system", "content": system_prompt}])
+    rows = []
+    try:
+        for turn in range(args.turns):
+            context.add_message({"role": "user", "content": USER_TURNS[turn % len(USER_TURNS)]})
+            sink.first_token.clear()
+            sink.done.clear()
+            sink.text = ""
+            start = time.perf_counter()
+            await task.queue_frame(OpenAILLMContextFrame(context))
+            await sink.first_token.wait()
+            ttft = time.perf_counter() - start
+            await sink.done.wait()
+            prompt_tokens = estimate_tokens(context.get_messages())
+            context.add_message({"role": "assistant", "content": sink.text})
+            rows.append((turn + 1, prompt_tokens, ttft))
+            # Time the caller takes to answer, summaries run meanwhile
+            await asyncio.sleep(args.turn_gap)
+    finally:
+        await task.cancel()
+        await runner
+    return rows
+
+
+def mean(values) -> float:
+    return sum(values) / len(values) if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=120)
+    parser.add_argument("--budget", type=int, default=3000, help="conversation token budget")
+    parser.add_argument("--keep-turns", type=int, default=6)
+    parser.add_argument("--summary-ms", type=float, default=1500)
+    parser.add_argument("--turn-gap", type=float, default=0.5, help="seconds between a reply and the next user turn")
+    parser.add_argument("--every", type=int, default=10, help="print every Nth turn")
+    args = parser.parse_args()
+
+    results = {}
+    for name, windowed in (("full context", False), ("context window", True)):
+        results[name] = asyncio.run(run_session(args, windowed))
+
+    print(f"{'turn':>5} | {'full: tokens':>12} {'ttft':>8} | {'window: tokens':>14} {'ttft':>8}")
+    for full, windowed in zip(results["full context"], results["context window"]):
+        if full[0] % args.every == 0 or full[0] == 1:
+            print(
+                f"{full[0]:5d} | {full[1]:12d} {full[2] * 1000:6.0f}ms | "
+                f"{windowed[1]:14d} {windowed[2] * 1000:6.0f}ms"
+            )
+
+    print()
+    for name, rows in results.items():
+        first = mean([ttft for _, _, ttft in rows[:10]])
+        last = mean([ttft for _, _, ttft in rows[-10:]])
+        print(
+            f"{name}: ttft first 10 turns {first * 1000:.0f}ms, last 10 turns {last * 1000:.0f}ms "
+            f"({(last / first - 1) * 100:+.0f}%), final prompt {rows[-1][1]} tokens"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""LLM time to first token with a slow-tailed or failing primary, with and without hedging.
+
+Sends one request after another to a simulated primary LLM whose
+--slow-ratio of requests take --slow-ms longer (a congested region), then,
+for --outage turns, fails every request. With hedging a simulated secondary
+provider is raced against the primary once the primary misses its deadline
+(a percentile of its own latencies), and takes over while the primary's
+circuit breaker is open.
+
+Usage:
+    python -m benchmarks.bench_hedging --turns 100 --outage 20
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from loguru import logger
+from pipecat.frames.frames import LLMTextFrame
+from pipecat.pipeline.pipeline import Pipeline
+from pipecat.pipeline.runner import PipelineRunner
+from pipecat.pipeline.task import PipelineParams, PipelineTask
+from pipecat.processors.aggregators.openai_llm_context import (
+    OpenAILLMContext,
+    OpenAILLMContextFrame,
+)
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from models.agent_model import SimulatedProfile
+from services.hedging_service import HedgedLLMService, ProviderHealthService
+from services.metrics_service import HEDGE_EVENTS
+from services.prompt_service import PromptService, PromptType
+from services.simulated_providers_service import SimulatedLLMService
+
+
+class TailLLMService(SimulatedLLMService):
+    """Simulated LLM with a slow tail and an outage switch."""
+
+    def __init__(self, slow_ratio: float, slow_ms: float, **kwargs):
+        super().__init__(**kwargs)
+        self.slow_ratio = slow_ratio
+        self.slow_ms = slow_ms
+        self.failing = False
+
+    async def _process_context(self, context: OpenAILLMContext):
+        if self.failing:
+            await asyncio.sleep(0.05)
+            raise ConnectionError("simulated outage")
+        if random.random() < self.slow_ratio:
+            await asyncio.sleep(self.slow_ms / 1000)
+        await super()._process_context(context)
+
+
+class FirstTokenSink(FrameProcessor):
+    def __init__(self):
+        super().__init__()
+        self.first_token = asyncio.Event()
+
+    async def process_frame(self, frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+        if isinstance(frame, LLMTextFrame):
+            self.first_token.set()
+        await self.push_frame(frame, direction)
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+def hedge_events(event: str) -> float:
+    return HEDGE_EVENTS.labels("llm", "simulated:secondary", event)._value.get()
+
+
+async def run_session(args, hedged: bool) -> dict:
+    random.seed(args.seed)
+    profile = SimulatedProfile(jitter=0.2, llm_reply_words=3)
+    primary = TailLLMService(args.slow_ratio, args.slow_ms, model="primary", profile=profile)
+    llm = primary
+    health = ProviderHealthService(min_samples=20, breaker_cooldown=args.cooldown)
+    ProviderHealthService._instance = health
+    if hedged:
+        secondary = SimulatedLLMService(model="secondary", profile=profile)
+        llm = HedgedLLMService(primary, "simulated", secondary, "simulated")
+    sink = FirstTokenSink()
+    task = PipelineTask(Pipeline([llm, sink]), params=PipelineParams())
+    runner = asyncio.create_task(PipelineRunner(handle_sigint=False).run(task))
+    await asyncio.sleep(0.1)
+
+    context = OpenAILLMContext(
+        [
+            {"role": "system", "content": PromptService.SYSTEM_PROMPTS[PromptType.DEFAULT]},
+            {"role": "user", "content": "I had a really long day at work today"},
+        ]
+    )
+    healthy, outage, unanswered = [], [], 0
+    before = {event: hedge_events(event) for event in ("hedged", "failover", "won")}
+    try:
+        for turn in range(args.turns + args.outage):
+            primary.failing = turn >= args.turns
+            sink.first_token.clear()
+            start = time.perf_counter()
+            await task.queue_frame(OpenAILLMContextFrame(context))
+            try:
+                await asyncio.wait_for(sink.first_token.wait(), 5)
+                (outage if primary.failing else healthy).append(time.perf_counter() - start)
+            except asyncio.TimeoutError:
+                unanswered += 1
+            # Let the rest of the reply stream
+            await asyncio.sleep(0.3)
+    finally:
+        await task.cancel()
+        await runner
+    return {
+        "healthy": healthy,
+        "outage": outage,
+        "unanswered": unanswered,
+        "events": {event: hedge_events(event) - count for event, count in before.items()},
+        "providers": health.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=100, help="requests while the primary is up")
+    parser.add_argument("--outage", type=int, default=20, help="requests while the primary fails")
+    parser.add_argument("--slow-ratio", type=float, default=0.1)
+    parser.add_argument("--slow-ms", type=float, default=2500)
+    parser.add_argument("--cooldown", type=float, default=30, help="circuit breaker cooldown in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="CRITICAL")
+
+    for name, hedged in (("single provider", False), ("hedged", True)):
+        result = asyncio.run(run_session(args, hedged))
+        healthy = result["healthy"]
+        print(
+            f"{name:>15}: ttft p50={percentile(healthy, 50) * 1000:5.0f}ms "
+            f"p95={percentile(healthy, 95) * 1000:5.0f}ms p99={percentile(healthy, 99) * 1000:5.0f}ms | "
+            f"outage: answered {len(result['outage'])}/{args.outage}"
+            + (f" p50={percentile(result['outage'], 50) * 1000:.0f}ms" if result["outage"] else "")
+        )
+        if hedged:
+            events = ", ".join(f"{k} {v:.0f}" for k, v in result["events"].items())
+            print(f"{'':>15}  secondary: {events} | {result['providers']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Prompt size and time to first token with the whole memory in the prompt vs retrieved facts.
+
+Builds a synthetic user memory of about --memory-tokens tokens made of
+distinct facts (people, hobbies, places, worries) and user turns that each
+refer to one of them. Runs GoogleLLMService against the local Gemini stub
+(benchmarks/gemini_stub.py) for --turns turns, once with the whole memory
+appended to the system prompt and once with the default system prompt and
+MemoryRetrievalProcessor injecting the top-k facts for each turn.
+
+Reports TTFT, prompt tokens per turn, how often the fact a turn refers to
+was injected, and the time retrieval and injection take on the event loop
+(--lookups lookups against a context of --history messages).
+
+Usage:
+    python -m benchmarks.bench_memory_retrieval --turns 30 --memory-tokens 3000
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+from google.genai.types import HttpOptions
+from loguru import logger
+from pipecat.pipeline.pipeline import Pipeline
+from pipecat.pipeline.runner import PipelineRunner
+from pipecat.pipeline.task import PipelineParams, PipelineTask
+from pipecat.processors.aggregators.openai_llm_context import (
+    OpenAILLMContext,
+    OpenAILLMContextFrame,
+)
+from pipecat.services.google.llm import GoogleLLMContext, GoogleLLMService
+
+from benchmarks.bench_prompt_cache import ReplySink
+from benchmarks.gemini_stub import GeminiStub
+from services.memory_retrieval_service import MemoryRetrievalProcessor, MemoryRetrievalService
+from services.prompt_service import PromptService, PromptType
+
+NAMES = [
+    "Anika", "Rahul", "Meera", "Tom", "Sofia", "Kenji", "Layla", "Marco", "Ines", "Dev",
+    "Hana", "Omar", "Clara", "Yusuf", "Nora", "Ravi", "Elena", "Sam", "Zara", "Felix",
+]
+RELATIONS = ["sister", "brother", "mother", "father", "best friend", "cousin", "colleague", "neighbor", "partner", "aunt"]
+HOBBIES = [
+    "pottery", "swimming", "guitar", "chess", "yoga", "baking", "cycling", "painting", "hiking", "dancing",
+    "gardening", "photography", "climbing", "knitting", "running", "singing", "tennis", "writing", "boxing", "surfing",
+]
+PLACES = [
+    "Goa", "Lisbon", "Kyoto", "Berlin", "Nairobi", "Oslo", "Cusco", "Hanoi", "Dublin", "Seville",
+    "Tbilisi", "Porto", "Krakow", "Havana", "Bergen", "Jaipur", "Quebec", "Split", "Bruges", "Fez",
+]
+WORRIES = [
+    "performance reviews", "money", "sleep", "exams", "her health", "the move", "deadlines",
+    "public speaking", "driving", "her landlord",
+]
+
+
+def build_memory(tokens: int, rng: random.Random) -> tuple:
+    """Return the memory text and (user turn, fact) pairs, one per fact."""
+    facts, turns = [], []
+    sections = ["Relationships", "Hobbies", "Travel", "Challenges and Concerns"]
+    lines = {section: [] for section in sections}
+    i = 0
+    while sum(len(fact) for fact in facts) < tokens * 4:
+        name, relation = NAMES[i % len(NAMES)], RELATIONS[i % len(RELATIONS)]
+        hobby, place, worry = HOBBIES[i % len(HOBBIES)], PLACES[i % len(PLACES)], WORRIES[i % len(WORRIES)]
+        suffix = f" ({i // len(NAMES) + 1})" if i >= len(NAMES) else ""
+        candidates = [
+            ("Relationships", f"Her {relation} {name}{suffix} calls most weekends and they argue about family plans",
+             f"{name} called me again and we ended up arguing"),
+            ("Hobbies", f"Started {hobby} classes{suffix} in spring and says it calms her down",
+             f"I skipped my {hobby} class this week"),
+            ("Travel", f"Wants to visit {place}{suffix} next year and is saving money for the trip",
+             f"I looked at flights to {place} last night"),
+            ("Challenges and Concerns", f"Gets anxious about {worry}{suffix}, especially late at night",
+             f"I can't stop thinking about {worry}"),
+        ]
+        for section, fact, turn in candidates:
+            lines[section].append(fact)
+            facts.append(fact)
+            turns.append((turn, fact))
+        i += 1
+    memory = "\n\n".join(
+        f"## {section}\n" + "\n".join(f"- {line}" for line in lines[section]) for section in sections
+    )
+    rng.shuffle(turns)
+    return memory, turns
+
+
+async def run_session(args, stub: GeminiStub, memory: str, turns: list, retrieval) -> dict:
+    prompt = PromptService.SYSTEM_PROMPTS[PromptType.DEFAULT]
+    if retrieval is None:
+        prompt = f"{prompt}\n\nWhat you know about the user:\n{memory}"
+
+    llm = GoogleLLMService(
+        api_key="stub",
+        model="gemini-2.5-flash",
+        http_options=HttpOptions(base_url=stub.url),
+    )
+    sink = ReplySink()
+    task = PipelineTask(
+        Pipeline([*([retrieval] if retrieval else []), llm, sink]), params=PipelineParams()
+    )
+    runner = asyncio.create_task(PipelineRunner(handle_sigint=False).run(task))
+
+    context = GoogleLLMContext.upgrade_to_google(
+        OpenAILLMContext([{"role": "system", "content": prompt}])
+    )
+    ttfts, hits = [], 0
+    try:
+        for turn, fact in turns[: args.turns]:
+            context.add_messages([{"role": "user", "content": turn}])
+            sink.first_token.clear()
+            sink.done.clear()
+            sink.text = ""
+            start = time.perf_counter()
+            await task.queue_frame(OpenAILLMContextFrame(context))
+            await sink.first_token.wait()
+            ttfts.append(time.perf_counter() - start)
+            await sink.done.wait()
+            context.add_messages([{"role": "assistant", "content": sink.text}])
+            if retrieval is None or any(fact in injected for injected in retrieval.last_facts):
+                hits += 1
+    finally:
+        await task.cancel()
+        await runner
+    return {"ttfts": sorted(ttfts), "hits": hits}
+
+
+def measure_lookups(args, processor: MemoryRetrievalProcessor, turns: list) -> tuple:
+    """Time of retrieve() alone and of a whole inject() into a Google context, in seconds."""
+    context = GoogleLLMContext.upgrade_to_google(
+        OpenAILLMContext([{"role": "system", "content": PromptService.getDefaultPrompt()}])
+    )
+    for i in range(args.history):
+        context.add_messages([{"role": "user" if i % 2 == 0 else "assistant", "content": turns[i % len(turns)][0]}])
+    retrieve, inject = [], []
+    for i in range(args.lookups):
+        text = turns[i % len(turns)][0]
+        start = time.perf_counter()
+        processor.service.retrieve(processor.store, text)
+        retrieve.append(time.perf_counter() - start)
+
+        context.add_messages([{"role": "user", "content": text}])
+        start = time.perf_counter()
+        processor.inject(context)
+        inject.append(time.perf_counter() - start)
+        context.set_messages(
+            [{"role": "system", "content": context.system_message}]
+            + context.get_messages_for_persistent_storage()[:-2]
+        )
+    return np.array(retrieve), np.array(inject)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--memory-tokens", type=int, default=3000, help="approximate size of the user memory")
+    parser.add_argument("--top-k", type=int, default=5, help="facts injected per turn")
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--history", type=int, default=24, help="messages in the context during lookups")
+    args = parser.parse_args()
+    # pipecat logs every prompt at debug level
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+
+    memory, turns = build_memory(args.memory_tokens, random.Random(7))
+    service = MemoryRetrievalService(directory=tempfile.mkdtemp(prefix="memory-index-"), top_k=args.top_k)
+    store = asyncio.run(service.get_store("bench-user", memory))
+    print(f"memory: {len(memory) // 4} tokens, {len(store.facts)} facts, embedder {service.embedder.name}")
+
+    stub = GeminiStub()
+    stub.start_in_thread()
+    for name, retrieval in (
+        ("whole memory", None),
+        ("retrieval", MemoryRetrievalProcessor(store, service=service)),
+    ):
+        stub.reset()
+        result = asyncio.run(run_session(args, stub, memory, turns, retrieval))
+        ttfts = result["ttfts"]
+        print(
+            f"{name:>12}: ttft p50={ttfts[len(ttfts) // 2] * 1000:6.0f}ms "
+            f"p95={ttfts[int(len(ttfts) * 0.95) - 1] * 1000:6.0f}ms | "
+            f"prompt tokens per turn {stub.prompt_tokens / len(ttfts):6.0f} | "
+            f"referenced fact in prompt {result['hits']}/{len(ttfts)}"
+        )
+
+    retrieve, inject = measure_lookups(args, MemoryRetrievalProcessor(store, service=service), turns)
+    print(
+        f"{'lookups':>12}: retrieve p50={np.percentile(retrieve, 50) * 1000:.3f}ms "
+        f"p99={np.percentile(retrieve, 99) * 1000:.3f}ms | "
+        f"inject into a {args.history}-message context p50={np.percentile(inject, 50) * 1000:.3f}ms "
+        f"p99={np.percentile(inject, 99) * 1000:.3f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
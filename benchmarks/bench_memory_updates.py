@@ -0,0 +1,221 @@
+"""Memory consolidation as a full rewrite vs add/update/remove operations.
+
+Builds a user memory of about --memory-tokens tokens (the synthetic facts of
+bench_memory_retrieval) and consolidates --sessions sessions into it, each
+teaching --new-facts new facts and correcting one existing fact, against the
+local Gemini (benchmarks/gemini_stub.py) and PostgREST
+(benchmarks/postgrest_stub.py) stand-ins. The Gemini stub answers like a
+model would: the whole memory plus the new facts for a rewrite, only the
+changes for operations, and takes --output-ms-per-token to decode each
+output token.
+
+"rewrite" is the previous handler: create_user_memory, then an
+unconditional update_user_context. "operations" is consolidate_user_memory.
+Reports output tokens and time per consolidation, the size of the queued
+job of a rolling session (a memory draft vs its operations) and of the
+write, then runs --races pairs of sessions of the same user ending at the
+same time and counts the sessions whose facts did not survive.
+
+Usage:
+    python -m benchmarks.bench_memory_updates --sessions 5 --races 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+from loguru import logger
+
+from benchmarks.bench_memory_retrieval import NAMES, PLACES, build_memory
+from benchmarks.gemini_stub import GeminiStub
+from benchmarks.postgrest_stub import PostgrestStub, make_user
+
+FACT_LINE = re.compile(r"^\[(\w+)\] \w+ \([\d.]+\): (.*)$")
+
+
+def model_reply(body: dict) -> str:
+    """What the model would answer: the new memory for a rewrite, the changes for operations."""
+    text = "\n".join(
+        part.get("text", "") for content in body["contents"] for part in content.get("parts", [])
+    )
+    existing, _, conversation = text.partition("=== NEW CONVERSATION ===\n")
+    said = [line[3:] for line in conversation.splitlines() if line.startswith("U: ")]
+
+    if body.get("generationConfig", {}).get("responseMimeType") != "application/json":
+        memory = existing.split("=== EXISTING MEMORY ===\n", 1)[-1].strip()
+        return "\n".join([memory, *(f"- {line}" for line in said)])
+
+    facts = [m.groups() for m in map(FACT_LINE.match, existing.splitlines()) if m]
+    operations = []
+    for line in said:
+        if line.startswith("Actually "):
+            name = line.split()[1]
+            fact_id = next((i for i, fact in facts if name in fact), None)
+            if fact_id:
+                operations.append({"op": "update", "id": fact_id, "text": line[9:], "confidence": 0.9})
+                continue
+        operations.append({"op": "add", "type": "event", "text": line, "confidence": 0.8})
+    return json.dumps(operations)
+
+
+def session_messages(session: int, new_facts: int, rng: random.Random) -> list:
+    messages = []
+    for j in range(new_facts):
+        messages.append(
+            {"role": "user", "content": f"I signed up for a {PLACES[rng.randrange(len(PLACES))]} trip, booking {session}-{j}"}
+        )
+        messages.append({"role": "assistant", "content": "That sounds exciting. How are you feeling about it?"})
+    name = NAMES[rng.randrange(len(NAMES))]
+    messages.append({"role": "user", "content": f"Actually {name} moved to {PLACES[rng.randrange(len(PLACES))]} ({session})"})
+    messages.append({"role": "assistant", "content": "Oh, that is a big change. How do you feel about it?"})
+    return messages
+
+
+async def consolidate_rewrite(user_id: str, messages: list) -> str:
+    """The handler before memory operations: rewrite the whole memory, overwrite the column."""
+    from repositories.user_repository import UserRepository
+    from services.user_memory_service import UserMemoryService
+
+    user_repository = UserRepository()
+    user_info = await user_repository.get_user(user_id)
+    memory = await asyncio.to_thread(
+        UserMemoryService().create_user_memory,
+        messages,
+        user_info.context or "",
+        raise_errors=True,
+    )
+    await user_repository.update_user_context(userId=user_id, updatedContext=memory)
+    return memory
+
+
+async def consolidate_operations(user_id: str, messages: list) -> str:
+    from repositories.user_repository import UserRepository
+    from services.memory_queue_service import consolidate_user_memory
+
+    await consolidate_user_memory(user_id, {"messages": messages})
+    return (await UserRepository().get_user(user_id)).context
+
+
+async def store_memory(postgrest: PostgrestStub, mode: str, user_id: str, memory: str):
+    """Start the user with the memory, as free-form text or as a versioned document."""
+    from models.memory import UserMemory
+    from repositories.user_repository import UserRepository
+
+    if mode == "operations":
+        memory = UserMemory(version=1, facts=UserMemory.parse(memory).facts).serialize()
+    postgrest.users[user_id] = {**make_user(user_id), "context": memory}
+    UserRepository.user_cache.invalidate(user_id)
+
+
+async def run_sessions(args, mode: str, gemini: GeminiStub, postgrest: PostgrestStub, memory: str) -> dict:
+    from models.memory import MemoryOperation, UserMemory
+
+    user_id = f"{mode}-user"
+    await store_memory(postgrest, mode, user_id, memory)
+    consolidate = consolidate_rewrite if mode == "rewrite" else consolidate_operations
+    rng = random.Random(11)
+    times, outputs, writes = [], [], []
+    for session in range(args.sessions):
+        messages = session_messages(session, args.new_facts, rng)
+        before = gemini.output_tokens
+        start = time.perf_counter()
+        stored = await consolidate(user_id, messages)
+        times.append(time.perf_counter() - start)
+        outputs.append(gemini.output_tokens - before)
+        writes.append(len(stored.encode()))
+
+    # A rolling session queues what it folded while live plus its last turns
+    tail = messages[-2:]
+    if mode == "rewrite":
+        job = {"messages": tail, "draft": stored, "base_hash": "0" * 16}
+    else:
+        current = UserMemory.parse(stored)
+        _, operations, _ = current.apply(
+            [
+                MemoryOperation(op="add", type="event", text=message["content"], confidence=0.8)
+                for message in messages[:-2:2]
+            ]
+        )
+        job = {
+            "messages": tail,
+            "operations": [o.model_dump(mode="json", exclude_none=True) for o in operations],
+            "base_version": current.version,
+        }
+    return {
+        "time": statistics.median(times),
+        "output_tokens": statistics.mean(outputs),
+        "write_bytes": statistics.mean(writes),
+        "job_bytes": len(json.dumps(job)),
+    }
+
+
+async def run_races(args, mode: str, postgrest: PostgrestStub, memory: str) -> int:
+    """Two sessions of the same user end together, e.g. on two replicas. Returns sessions whose facts were lost."""
+    consolidate = consolidate_rewrite if mode == "rewrite" else consolidate_operations
+    rng = random.Random(13)
+    lost = 0
+    for race in range(args.races):
+        user_id = f"{mode}-race-{race}"
+        await store_memory(postgrest, mode, user_id, memory)
+
+        sessions = [session_messages(1000 * race + i, args.new_facts, rng) for i in range(2)]
+        await asyncio.gather(*(consolidate(user_id, messages) for messages in sessions))
+        stored = postgrest.users[user_id]["context"]
+        for messages in sessions:
+            if not all(m["content"] in stored for m in messages[:-2:2]):
+                lost += 1
+    return lost
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--races", type=int, default=5)
+    parser.add_argument("--memory-tokens", type=int, default=3000, help="approximate size of the user memory")
+    parser.add_argument("--new-facts", type=int, default=4, help="new facts per session")
+    parser.add_argument("--output-ms-per-token", type=float, default=5, help="model decode time per output token")
+    parser.add_argument("--delay-ms", type=float, default=20, help="PostgREST latency")
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    gemini = GeminiStub(base_ms=300, reply=model_reply, output_ms_per_token=args.output_ms_per_token)
+    gemini.start_in_thread()
+    postgrest = PostgrestStub(delay_ms=args.delay_ms)
+    postgrest.start_in_thread()
+    os.environ.update(
+        GOOGLE_API_KEY="stub",
+        GOOGLE_GEMINI_BASE_URL=gemini.url,
+        SUPABASE_URL=postgrest.url,
+        SUPABASE_KEY="benchmark-key",
+        GREETING_PERSONALIZED="false",
+        MEMORY_RETRIEVAL_ENABLED="false",
+    )
+
+    from repositories.user_repository import UserRepository
+
+    memory, _ = build_memory(args.memory_tokens, random.Random(7))
+    print(f"memory: {len(memory) // 4} tokens, {args.new_facts} new facts and 1 correction per session")
+    try:
+        for mode in ("rewrite", "operations"):
+            result = await run_sessions(args, mode, gemini, postgrest, memory)
+            lost = await run_races(args, mode, postgrest, memory)
+            print(
+                f"{mode:>10}: {result['output_tokens']:6.0f} output tokens, "
+                f"{result['time'] * 1000:6.0f}ms per consolidation | "
+                f"rolling job {result['job_bytes'] / 1024:5.1f}KB | "
+                f"write {result['write_bytes'] / 1024:5.1f}KB | "
+                f"sessions lost in {args.races} races: {lost}/{2 * args.races}"
+            )
+    finally:
+        await UserRepository.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
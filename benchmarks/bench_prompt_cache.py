@@ -0,0 +1,131 @@
+"""Time to first token and prompt cache hit rate with and without prompt caching.
+
+Runs PooledGoogleLLMService against the local Gemini stub (benchmarks/gemini_stub.py)
+for a number of turns, once sending the system prompt plus user memory on
+every request and once with the prefix registered as cached content
+(services/prompt_cache_service.py). Reports TTFT, the share of prompt tokens
+served from the cache and the billed input tokens, with cached tokens
+weighted by --cached-price.
+
+Usage:
+    python -m benchmarks.bench_prompt_cache --turns 30 --memory-tokens 3000
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from google.genai.types import HttpOptions
+from loguru import logger
+from pipecat.frames.frames import LLMFullResponseEndFrame, LLMTextFrame
+from pipecat.pipeline.pipeline import Pipeline
+from pipecat.pipeline.runner import PipelineRunner
+from pipecat.pipeline.task import PipelineParams, PipelineTask
+from pipecat.processors.aggregators.openai_llm_context import (
+    OpenAILLMContext,
+    OpenAILLMContextFrame,
+)
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+from pipecat.services.google.llm import GoogleLLMContext
+
+from benchmarks.gemini_stub import GeminiStub
+from services.pooled_google_service import PooledGoogleLLMService
+from services.prompt_cache_service import PromptCacheService, add_prompt_cache, prompt_cache_key
+from services.prompt_service import PromptService, PromptType
+
+MEMORY_LINE = (
+    "- Works as a nurse on rotating night shifts, finds the schedule draining and "
+    "worries about missing time with her younger brother who she helps raise."
+)
+USER_TURN = "I could not sleep again after my shift and I keep replaying an argument with my manager."
+
+
+class ReplySink(FrameProcessor):
+    def __init__(self):
+        super().__init__()
+        self.first_token = asyncio.Event()
+        self.done = asyncio.Event()
+        self.text = ""
+
+    async def process_frame(self, frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+        if isinstance(frame, LLMTextFrame):
+            self.text += frame.text
+            self.first_token.set()
+        elif isinstance(frame, LLMFullResponseEndFrame):
+            self.done.set()
+        await self.push_frame(frame, direction)
+
+
+async def run_session(args, stub: GeminiStub, cached: bool) -> list:
+    memory = "\n".join([MEMORY_LINE] * max(1, args.memory_tokens * 4 // len(MEMORY_LINE)))
+    prompt = f"{PromptService.SYSTEM_PROMPTS[PromptType.DEFAULT]}\n\nWhat you know about the user:\n{memory}"
+
+    llm = PooledGoogleLLMService(
+        api_key="stub",
+        model="gemini-2.5-flash",
+        http_options=HttpOptions(base_url=stub.url),
+    )
+    if cached:
+        add_prompt_cache(
+            llm,
+            prompt,
+            prompt_cache_key(PromptType.DEFAULT.value, memory),
+            service=PromptCacheService(min_tokens=1024),
+        )
+    sink = ReplySink()
+    task = PipelineTask(Pipeline([llm, sink]), params=PipelineParams())
+    runner = asyncio.create_task(PipelineRunner(handle_sigint=False).run(task))
+
+    context = GoogleLLMContext.upgrade_to_google(
+        OpenAILLMContext([{"role": "system", "content": prompt}])
+    )
+    ttfts = []
+    try:
+        for _ in range(args.turns):
+            context.add_messages([{"role": "user", "content": USER_TURN}])
+            sink.first_token.clear()
+            sink.done.clear()
+            sink.text = ""
+            start = time.perf_counter()
+            await task.queue_frame(OpenAILLMContextFrame(context))
+            await sink.first_token.wait()
+            ttfts.append(time.perf_counter() - start)
+            await sink.done.wait()
+            context.add_messages([{"role": "assistant", "content": sink.text}])
+    finally:
+        await task.cancel()
+        await runner
+    return ttfts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--memory-tokens", type=int, default=3000, help="approximate size of the user memory in the prompt")
+    parser.add_argument("--cached-price", type=float, default=0.25, help="price of a cached input token relative to an uncached one")
+    args = parser.parse_args()
+    # pipecat logs every prompt at debug level
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+
+    stub = GeminiStub()
+    stub.start_in_thread()
+
+    for name, cached in (("uncached", False), ("prompt cache", True)):
+        stub.reset()
+        ttfts = asyncio.run(run_session(args, stub, cached))
+        uncached_tokens = stub.prompt_tokens - stub.cached_tokens
+        billed = uncached_tokens + stub.cached_tokens * args.cached_price
+        ttfts.sort()
+        print(
+            f"{name:>12}: ttft p50={ttfts[len(ttfts) // 2] * 1000:6.0f}ms "
+            f"p95={ttfts[int(len(ttfts) * 0.95) - 1] * 1000:6.0f}ms | "
+            f"prompt tokens {stub.prompt_tokens}, hit rate {stub.cached_tokens / max(1, stub.prompt_tokens):5.1%} | "
+            f"billed input tokens {billed:.0f} | caches created {stub.caches_created}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Time from end of speech to the first LLM token, with and without speculation.
+
+Plays user turns into a pipeline made of SpeculativeLLMProcessor (or
+nothing, as the baseline), the user context aggregator, the simulated LLM
+and a sink. Each turn is fed like Deepgram and the VAD deliver it: interim
+transcripts growing word by word while the user speaks, the final
+transcript --final-ms after the end of speech and UserStoppedSpeakingFrame
+once the VAD's stop delay (--vad-stop-ms) has passed. In --diverge of the
+turns the final transcript differs from the last interim, and in --pause
+of the turns the user stops mid-sentence for --pause-ms (shorter than the
+VAD stop delay), so speculations get restarted or thrown away.
+
+Usage:
+    python -m benchmarks.bench_speculative_llm --turns 20
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from loguru import logger
+from pipecat.frames.frames import (
+    InterimTranscriptionFrame,
+    LLMTextFrame,
+    TranscriptionFrame,
+    UserStartedSpeakingFrame,
+    UserStoppedSpeakingFrame,
+)
+from pipecat.pipeline.pipeline import Pipeline
+from pipecat.pipeline.runner import PipelineRunner
+from pipecat.pipeline.task import PipelineParams, PipelineTask
+from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+from pipecat.utils.time import time_now_iso8601
+
+from models.agent_model import SimulatedProfile
+from services.metrics_service import LLM_SPECULATION_WASTED_TOKENS
+from services.prompt_service import PromptService, PromptType
+from services.simulated_providers_service import TRANSCRIPTS, SimulatedLLMService
+from services.speculative_llm_service import SpeculativeLLMProcessor
+
+
+class ReplySink(FrameProcessor):
+    """Records the first token of each LLM response and the full reply."""
+
+    def __init__(self):
+        super().__init__()
+        self.first_token = asyncio.Event()
+        self.first_token_at = 0.0
+        self.text = ""
+
+    async def process_frame(self, frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+        if isinstance(frame, LLMTextFrame):
+            if not self.first_token.is_set():
+                self.first_token_at = time.perf_counter()
+                self.first_token.set()
+            self.text += frame.text
+        await self.push_frame(frame, direction)
+
+
+def wasted_tokens() -> float:
+    return sum(
+        LLM_SPECULATION_WASTED_TOKENS.labels(kind)._value.get()
+        for kind in ("prompt", "completion")
+    )
+
+
+async def play_turn(task: PipelineTask, args, text: str, diverge: bool, pause: bool) -> float:
+    """Feed one user turn and return the end of speech time."""
+    words = text.split()
+    await task.queue_frame(UserStartedSpeakingFrame())
+    for i in range(1, len(words) + 1):
+        await asyncio.sleep(60 / args.words_per_minute)
+        if pause and i == len(words) // 2:
+            await asyncio.sleep(args.pause_ms / 1000)
+        await task.queue_frame(
+            InterimTranscriptionFrame(" ".join(words[:i]).lower(), "", time_now_iso8601())
+        )
+    end_of_speech = time.perf_counter()
+    await asyncio.sleep(args.final_ms / 1000)
+    final = f"{text}, honestly." if diverge else f"{text}."
+    await task.queue_frame(TranscriptionFrame(final, "", time_now_iso8601()))
+    await asyncio.sleep(max(0.0, args.vad_stop_ms - args.final_ms) / 1000)
+    await task.queue_frame(UserStoppedSpeakingFrame())
+    return end_of_speech
+
+
+async def run_session(args, speculative: bool) -> dict:
+    random.seed(args.seed)
+    llm = SimulatedLLMService(profile=SimulatedProfile(jitter=0))
+    context = OpenAILLMContext(
+        [{"role": "system", "content": PromptService.SYSTEM_PROMPTS[PromptType.DEFAULT]}]
+    )
+    aggregator = llm.create_context_aggregator(context).user()
+    sink = ReplySink()
+    processors = [aggregator, llm, sink]
+    speculation = None
+    if speculative:
+        speculation = SpeculativeLLMProcessor(
+            llm, context, stable_ms=args.stable_ms, min_words=args.min_words
+        )
+        processors.insert(0, speculation)
+
+    task = PipelineTask(Pipeline(processors), params=PipelineParams())
+    runner = asyncio.create_task(PipelineRunner(handle_sigint=False).run(task))
+    await asyncio.sleep(0.1)
+
+    latencies = []
+    wasted_before = wasted_tokens()
+    try:
+        for turn in range(args.turns):
+            sink.first_token.clear()
+            sink.text = ""
+            end_of_speech = await play_turn(
+                task,
+                args,
+                TRANSCRIPTS[turn % len(TRANSCRIPTS)],
+                diverge=random.random() < args.diverge,
+                pause=random.random() < args.pause,
+            )
+            await sink.first_token.wait()
+            latencies.append(sink.first_token_at - end_of_speech)
+            # Let the reply finish before the next turn
+            await asyncio.sleep(2)
+            context.add_message({"role": "assistant", "content": sink.text})
+    finally:
+        await task.cancel()
+        await runner
+    return {
+        "latencies": sorted(latencies),
+        "outcomes": speculation.outcomes if speculation else {},
+        "wasted": wasted_tokens() - wasted_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--words-per-minute", type=float, default=150)
+    parser.add_argument("--final-ms", type=float, default=150, help="final transcript delay after the end of speech")
+    parser.add_argument("--vad-stop-ms", type=float, default=800, help="VAD stop delay after the end of speech")
+    parser.add_argument("--diverge", type=float, default=0.2, help="share of turns whose final transcript differs from the last interim")
+    parser.add_argument("--pause", type=float, default=0.2, help="share of turns with a pause mid-sentence")
+    parser.add_argument("--pause-ms", type=float, default=700)
+    parser.add_argument("--stable-ms", type=float, default=500)
+    parser.add_argument("--min-words", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    for name, speculative in (("baseline", False), ("speculative", True)):
+        result = asyncio.run(run_session(args, speculative))
+        latencies = result["latencies"]
+        line = (
+            f"{name:>11}: end of speech -> first token p50={latencies[len(latencies) // 2] * 1000:5.0f}ms "
+            f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:5.0f}ms"
+        )
+        outcomes = result["outcomes"]
+        if outcomes:
+            started = sum(outcomes.values())
+            line += (
+                f" | speculations {started}, hit rate {outcomes['hit'] / max(1, started):.0%} "
+                f"({', '.join(f'{k} {v}' for k, v in outcomes.items())}), "
+                f"wasted tokens {result['wasted']:.0f}"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Cold start of a server replica: import time per module, time to live and time to ready.
+
+First imports server.py with `python -X importtime` in a fresh interpreter
+and lists the modules that take longest to import (cumulative, including
+what they import themselves). Then starts `server.py` --runs times against
+the local PostgREST stub and polls /health (liveness: the port is bound and
+the process works) and /ready (readiness: the warm-up steps are done and
+the node takes sessions) every 10 ms, and reports both from process start,
+with the duration of each warm-up step from /status.
+
+Run it with --cwd pointing at another checkout to compare with an older
+version of the server.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 5
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+from benchmarks.bench_workers import start_server, stop_server
+from benchmarks.postgrest_stub import PostgrestStub
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_times(cwd: str) -> list:
+    """(cumulative seconds, depth, module) for every module imported by server.py."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            modules.append((int(match.group(2)) / 1e6, len(match.group(3)) // 2, match.group(4)))
+    return modules
+
+
+def print_import_times(cwd: str, top: int):
+    modules = import_times(cwd)
+    total = next((t for t, _, name in modules if name == "server"), float("nan"))
+    print(f"import server: {total * 1000:.0f}ms")
+    # Direct imports of server.py, then the heaviest modules anywhere in the tree
+    for seconds, depth, name in sorted((m for m in modules if m[1] == 1), reverse=True)[:top]:
+        print(f"  {seconds * 1000:7.1f}ms  {name}")
+    print("heaviest modules:")
+    for seconds, depth, name in sorted((m for m in modules if m[1] > 1), reverse=True)[:top]:
+        print(f"  {seconds * 1000:7.1f}ms  {name}")
+
+
+async def wait_status(http: aiohttp.ClientSession, url: str, deadline: float) -> float:
+    """Poll url until it answers 200, returns the time it did."""
+    while time.perf_counter() < deadline:
+        try:
+            async with http.get(url, timeout=aiohttp.ClientTimeout(total=1)) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        await asyncio.sleep(0.01)
+    raise RuntimeError(f"{url} did not answer 200 in time")
+
+
+async def measure(args, stub: PostgrestStub) -> dict:
+    base_url = f"http://127.0.0.1:{args.port}"
+    start = time.perf_counter()
+    server = start_server(args.port, 1, stub, 50, cwd=args.cwd, AGENT_POOL_SIZE=str(args.pool_size))
+    try:
+        async with aiohttp.ClientSession() as http:
+            deadline = start + args.timeout
+            live, ready = await asyncio.gather(
+                wait_status(http, base_url + "/health", deadline),
+                wait_status(http, base_url + "/ready", deadline),
+            )
+            async with http.get(base_url + "/status") as response:
+                status = await response.json()
+    finally:
+        stop_server(server)
+    return {
+        "live": live - start,
+        "ready": ready - start,
+        "steps": status.get("startup", {}).get("steps_ms", {}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=7960)
+    parser.add_argument("--pool-size", type=int, default=2, help="AGENT_POOL_SIZE of the server")
+    parser.add_argument("--top", type=int, default=10, help="modules listed per import table")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--cwd", default=os.getcwd(), help="checkout of the server to start")
+    args = parser.parse_args()
+
+    print_import_times(args.cwd, args.top)
+
+    stub = PostgrestStub()
+    stub.start_in_thread()
+    runs = []
+    for _ in range(args.runs):
+        runs.append(asyncio.run(measure(args, stub)))
+        run = runs[-1]
+        steps = " ".join(f"{name}={ms}ms" for name, ms in run["steps"].items())
+        print(f"live {run['live'] * 1000:6.0f}ms | ready {run['ready'] * 1000:6.0f}ms | {steps}", flush=True)
+    print(
+        f"median: live {statistics.median(r['live'] for r in runs) * 1000:.0f}ms, "
+        f"ready {statistics.median(r['ready'] for r in runs) * 1000:.0f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""JWT verification throughput, cold vs warm.
+
+"cold" verifies every token for the first time (full decode + HMAC check),
+"warm" re-verifies tokens that are already in the TokenService cache, which
+is what happens when a client reconnects or renegotiates.
+
+Usage:
+    python -m benchmarks.bench_token_service --tokens 1000 --rounds 20
+"""
+
+import argparse
+import os
+import time
+import uuid
+
+from jose import jwt
+
+SECRET = "benchmark-secret"
+
+
+def mint_token(user_id: str, ttl: int = 3600) -> str:
+    now = int(time.time())
+    return jwt.encode(
+        {"sub": user_id, "aud": "authenticated", "iat": now, "exp": now + ttl},
+        SECRET,
+        algorithm="HS256",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ["JWT_SECRET_KEY"] = SECRET
+    from services.token_service import TokenService
+
+    TokenService.load_secret_key()
+    tokens = [mint_token(str(uuid.uuid4())) for _ in range(args.tokens)]
+
+    start = time.perf_counter()
+    for token in tokens:
+        TokenService().verify_token(token)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        for token in tokens:
+            TokenService().verify_token(token)
+    warm = (time.perf_counter() - start) / args.rounds
+
+    print(f"cold: {args.tokens / cold:,.0f} verifications/s ({cold / args.tokens * 1e6:.1f} us each)")
+    print(f"warm: {args.tokens / warm:,.0f} verifications/s ({warm / args.tokens * 1e6:.1f} us each)")
+    print(f"cache: {TokenService.cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Cost of journaling transcript turns on the event loop, and turns lost when the process is killed.
+
+Hot path: --sessions simulated sessions each finish a turn every
+--turn-ms, for --seconds. Compares the TranscriptJournalService (queue the
+turn, batched writes and fsyncs in the writer task) with writing and
+fsyncing each turn inline on the event loop. Reports the time an append
+takes on the loop, the event loop lag measured next to the sessions, and
+the fsyncs per turn.
+
+Crash: a child process journals turns the same way and reports each one
+to the parent as soon as append returns. The parent kills it with SIGKILL
+after --seconds, recovers the journals and counts the turns that made it
+to disk.
+
+Usage:
+    python -m benchmarks.bench_transcript_journal --sessions 50 --seconds 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from loguru import logger
+
+from services.transcript_journal_service import TranscriptJournalService
+
+TURN = "I had a really long day at work today and I could not stop thinking about the meeting"
+
+
+class InlineJournal:
+    """Baseline: every turn written and fsynced right away, on the event loop."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.files = {}
+        self.fsyncs = 0
+
+    def open_session(self, session_id: str, user_id: str):
+        self.files[session_id] = open(os.path.join(self.directory, f"{session_id}.jsonl"), "ab")
+
+    def append(self, session_id: str, role: str, content: str):
+        f = self.files[session_id]
+        f.write((json.dumps({"role": role, "content": content, "ts": time.time()}) + "\n").encode())
+        f.flush()
+        os.fsync(f.fileno())
+        self.fsyncs += 1
+
+
+async def session(journal, session_id: str, args, deadline: float, append_times: list, on_turn=None):
+    journal.open_session(session_id, f"user-{session_id}")
+    turn = 0
+    # Spread the sessions' turns over the interval
+    await asyncio.sleep(np.random.uniform(0, args.turn_ms / 1000))
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        journal.append(session_id, "user" if turn % 2 == 0 else "assistant", f"{turn} {TURN}")
+        append_times.append(time.perf_counter() - start)
+        turn += 1
+        if on_turn:
+            on_turn(session_id, turn)
+        await asyncio.sleep(args.turn_ms / 1000)
+    return turn
+
+
+async def loop_lag(deadline: float, lags: list):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await asyncio.sleep(0.005)
+        lags.append(time.perf_counter() - start - 0.005)
+
+
+async def run_hot_path(args, journaled: bool) -> dict:
+    directory = tempfile.mkdtemp(prefix="journal-bench-")
+    if journaled:
+        journal = TranscriptJournalService(directory=directory)
+        await journal.start()
+    else:
+        journal = InlineJournal(directory)
+    append_times, lags = [], []
+    deadline = time.perf_counter() + args.seconds
+    turns = await asyncio.gather(
+        loop_lag(deadline, lags),
+        *(session(journal, f"s{i}", args, deadline, append_times) for i in range(args.sessions)),
+    )
+    if journaled:
+        await journal.stop()
+    return {
+        "turns": sum(turns[1:]),
+        "append_p99": np.percentile(append_times, 99),
+        "lag_p99": np.percentile(lags, 99),
+        "lag_max": max(lags),
+        "fsyncs": journal.fsyncs,
+    }
+
+
+async def child(args):
+    """Journal turns and report each one on stdout until killed."""
+    journal = TranscriptJournalService(directory=args.child)
+    await journal.start()
+
+    def on_turn(session_id: str, turn: int):
+        sys.stdout.write(f"{session_id} {turn}\n")
+        sys.stdout.flush()
+
+    await asyncio.gather(
+        *(session(journal, f"s{i}", args, float("inf"), [], on_turn) for i in range(args.sessions))
+    )
+
+
+async def run_crash(args) -> dict:
+    directory = tempfile.mkdtemp(prefix="journal-crash-")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_transcript_journal", "--child", directory,
+         "--sessions", str(args.sessions), "--turn-ms", str(args.turn_ms)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    await asyncio.sleep(args.seconds)
+    process.send_signal(signal.SIGKILL)
+    reported = {}
+    for line in process.stdout.read().splitlines():
+        session_id, turn = line.split()
+        reported[session_id] = int(turn)
+    process.wait()
+
+    recovered = {}
+
+    async def enqueue(user_id, messages, session_id=None):
+        recovered[session_id] = len(messages)
+
+    await TranscriptJournalService(directory=directory).recover(enqueue)
+    lost = [reported[s] - recovered.get(s, 0) for s in reported]
+    return {"reported": sum(reported.values()), "recovered": sum(recovered.values()), "lost_max": max(lost)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--turn-ms", type=float, default=2000, help="time between two turns of a session")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    if args.child:
+        asyncio.run(child(args))
+        return
+
+    for name, journaled in (("inline fsync", False), ("journal", True)):
+        result = asyncio.run(run_hot_path(args, journaled))
+        print(
+            f"{name:>12}: {result['turns']} turns | append p99 {result['append_p99'] * 1000:6.3f}ms | "
+            f"loop lag p99 {result['lag_p99'] * 1000:6.2f}ms max {result['lag_max'] * 1000:6.2f}ms | "
+            f"{result['fsyncs'] / result['turns']:.2f} fsyncs per turn"
+        )
+    result = asyncio.run(run_crash(args))
+    print(
+        f"{'SIGKILL':>12}: {result['recovered']}/{result['reported']} acknowledged turns recovered, "
+        f"at most {result['lost_max']} lost per session"
+    )
+
+
+if __name__ == "__main__":
+    main()
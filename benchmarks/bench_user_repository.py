@@ -0,0 +1,118 @@
+"""Event-loop lag under concurrent user lookups.
+
+Fires N concurrent "offers" (one get_user_info each) against a local
+PostgREST stand-in and samples event-loop lag while they run. The "sync"
+mode reproduces the old behaviour (a new synchronous Supabase client per
+request, called from the coroutine), the "async" mode uses UserRepository.
+
+Usage:
+    python -m benchmarks.bench_user_repository --offers 200 --delay-ms 20
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+from benchmarks.postgrest_stub import PostgrestStub
+
+
+class LagMonitor:
+    """Measures how late a periodic timer fires, i.e. event-loop lag."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(time.perf_counter() - start - self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples) or [0.0]
+        return {
+            "lag_p50_ms": samples[len(samples) // 2] * 1000,
+            "lag_p99_ms": samples[int(len(samples) * 0.99) - 1] * 1000,
+            "lag_max_ms": samples[-1] * 1000,
+        }
+
+
+async def offer_sync(user_id: str):
+    from supabase import create_client
+
+    client = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    client.table("users").select("*").eq("id", user_id).single().execute()
+
+
+async def offer_async(user_id: str):
+    from repositories.user_repository import UserRepository
+
+    await UserRepository().get_user_info(user_id)
+
+
+async def run(mode: str, offers: int) -> dict:
+    offer = offer_sync if mode == "sync" else offer_async
+    monitor = LagMonitor()
+    monitor.start()
+    await asyncio.sleep(0.1)  # baseline samples
+
+    latencies = []
+
+    async def timed_offer():
+        start = time.perf_counter()
+        await offer(str(uuid.uuid4()))
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[timed_offer() for _ in range(offers)])
+    wall = time.perf_counter() - start
+    await monitor.stop()
+
+    return {
+        "mode": mode,
+        "offers": offers,
+        "wall_s": wall,
+        "offer_p50_ms": statistics.median(latencies) * 1000,
+        **monitor.summary(),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--offers", type=int, default=200)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"])
+    args = parser.parse_args()
+
+    stub = PostgrestStub(delay_ms=args.delay_ms)
+    stub.start_in_thread()
+    os.environ["SUPABASE_URL"] = stub.url
+    os.environ["SUPABASE_KEY"] = "benchmark-key"
+
+    try:
+        for mode in args.modes:
+            result = await run(mode, args.offers)
+            print(" ".join(f"{k}={v:.1f}" if isinstance(v, float) else f"{k}={v}" for k, v in result.items()))
+    finally:
+        from repositories.user_repository import UserRepository
+
+        await UserRepository.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,311 @@
+"""Sessions-per-node scaling of the multi-worker server mode.
+
+Starts `server.py --workers N` for each worker count against the local
+PostgREST stub, then ramps up WebRTC clients (aiortc) that stream a tone to
+the agent. Every client renegotiates once to check that the front process
+routes the pc_id back to the worker owning the connection.
+
+For each step the benchmark reports offer latency, /health latency through
+the front process (a proxy for event loop lag in the workers), CPU cores
+used and RSS of the whole process tree. "capacity" is the largest step
+where all offers succeeded and /health p95 stayed under --lag-budget-ms.
+
+Provider keys are dummies unless set in the environment, so without network
+access the per-session load is transport, VAD and pipeline overhead only.
+
+Usage:
+    python -m benchmarks.bench_workers --workers 1 2 4 8 --step 8 --max-sessions 64
+"""
+
+import argparse
+import asyncio
+import fractions
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import aiohttp
+import numpy as np
+from aiortc import MediaStreamTrack, RTCPeerConnection, RTCSessionDescription
+from av import AudioFrame
+
+from benchmarks.bench_token_service import SECRET, mint_token
+from benchmarks.postgrest_stub import PostgrestStub
+
+SAMPLE_RATE = 48000
+FRAME_SAMPLES = 960  # 20 ms
+
+
+class ToneTrack(MediaStreamTrack):
+    """Audio track alternating 1 s of noisy tone and 1 s of silence."""
+
+    kind = "audio"
+
+    def __init__(self):
+        super().__init__()
+        self._pts = 0
+        self._start = None
+        rng = np.random.default_rng()
+        t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+        tone = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.standard_normal(SAMPLE_RATE)
+        self._signal = np.concatenate([tone, np.zeros(SAMPLE_RATE)])
+        self._signal = (self._signal * 32767).astype(np.int16)
+
+    async def recv(self):
+        if self._start is None:
+            self._start = time.monotonic()
+        # Pace frames in real time like a microphone would
+        wait = self._start + self._pts / SAMPLE_RATE - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        offset = self._pts % len(self._signal)
+        samples = np.take(self._signal, range(offset, offset + FRAME_SAMPLES), mode="wrap")
+        frame = AudioFrame.from_ndarray(samples.reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = SAMPLE_RATE
+        frame.pts = self._pts
+        frame.time_base = fractions.Fraction(1, SAMPLE_RATE)
+        self._pts += FRAME_SAMPLES
+        return frame
+
+
+class Client:
+    def __init__(self, base_url: str, token: str, track: MediaStreamTrack = None):
+        self.base_url = base_url
+        self.token = token
+        self.track = track or ToneTrack()
+        self.pc = RTCPeerConnection()
+        self.pc_id = None
+
+    async def _offer(self, http: aiohttp.ClientSession) -> dict:
+        offer = await self.pc.createOffer()
+        await self.pc.setLocalDescription(offer)
+        body = {"sdp": self.pc.localDescription.sdp, "type": self.pc.localDescription.type}
+        if self.pc_id:
+            body["pc_id"] = self.pc_id
+        async with http.post(
+            f"{self.base_url}/api/offer", params={"token": self.token}, json=body
+        ) as response:
+            if response.status != 200:
+                raise RuntimeError(f"offer failed with {response.status}")
+            answer = await response.json()
+        await self.pc.setRemoteDescription(
+            RTCSessionDescription(sdp=answer["sdp"], type=answer["type"])
+        )
+        return answer
+
+    async def connect(self, http: aiohttp.ClientSession) -> float:
+        self.pc.addTrack(self.track)
+        self.pc.createDataChannel("chat")
+        start = time.perf_counter()
+        answer = await self._offer(http)
+        self.pc_id = answer["pc_id"]
+        return time.perf_counter() - start
+
+    async def renegotiate(self, http: aiohttp.ClientSession) -> bool:
+        answer = await self._offer(http)
+        return answer["pc_id"] == self.pc_id
+
+    async def close(self):
+        await self.pc.close()
+
+
+def process_tree(pid: int) -> list:
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(int(entry))
+        except OSError:
+            continue
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, []))
+    return tree
+
+
+def tree_usage(pid: int) -> tuple:
+    """Total CPU seconds and RSS bytes of a process and its descendants."""
+    ticks = os.sysconf("SC_CLK_TCK")
+    page = os.sysconf("SC_PAGE_SIZE")
+    cpu, rss = 0.0, 0
+    for p in process_tree(pid):
+        try:
+            with open(f"/proc/{p}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / ticks
+            rss += int(fields[21]) * page
+        except OSError:
+            continue
+    return cpu, rss
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return float("nan")
+    return float(np.percentile(values, q))
+
+
+async def wait_ready(http: aiohttp.ClientSession, base_url: str, workers: int, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with http.get(f"{base_url}/ready") as response:
+                status = await response.json(content_type=None)
+                if response.status == 200 and status.get("healthy_workers", 1) >= workers:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(1)
+    raise RuntimeError("server did not become ready")
+
+
+async def probe_health(http: aiohttp.ClientSession, base_url: str, duration: float) -> list:
+    latencies = []
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            async with http.get(f"{base_url}/health") as response:
+                await response.read()
+            latencies.append(time.perf_counter() - start)
+        except aiohttp.ClientError:
+            latencies.append(float("inf"))
+        await asyncio.sleep(0.05)
+    return latencies
+
+
+def start_server(
+    port: int, workers: int, stub: PostgrestStub, max_sessions: int, cwd: str = None, **env
+) -> subprocess.Popen:
+    """Start server.py (from `cwd`, e.g. another checkout) against the PostgREST stub. Extra keyword arguments are set as env vars."""
+    data_dir = tempfile.mkdtemp()
+    env = {
+        **os.environ,
+        "SUPABASE_URL": stub.url,
+        "SUPABASE_KEY": "benchmark-key",
+        "JWT_SECRET_KEY": SECRET,
+        "MAX_SESSIONS": str(max_sessions),
+        "AGENT_POOL_SIZE": "2",
+        "MEMORY_ROLLING_ENABLED": "false",
+        "MEMORY_QUEUE_DB": os.path.join(data_dir, "memory_queue.db"),
+        "TTS_CACHE_PATH": os.path.join(data_dir, "tts_cache.bin"),
+        "GREETINGS_DB": os.path.join(data_dir, "greetings.db"),
+        "JOURNAL_DIR": os.path.join(data_dir, "journal"),
+        "WORKER_POLL_INTERVAL": "0.5",
+        **env,
+    }
+    for key in ("OPENAI_API_KEY", "GOOGLE_API_KEY", "DEEPGRAM_API_KEY"):
+        env.setdefault(key, "benchmark-key")
+
+    return subprocess.Popen(
+        [sys.executable, "server.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        env=env,
+        cwd=cwd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def stop_server(server: subprocess.Popen):
+    server.send_signal(signal.SIGINT)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+async def run_workers(workers: int, args, stub: PostgrestStub) -> list:
+    port = args.port
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(port, workers, stub, args.max_sessions)
+    clients: list = []
+    results = []
+    try:
+        async with aiohttp.ClientSession() as http:
+            await wait_ready(http, base_url, workers if workers > 1 else 0)
+            for target in range(args.step, args.max_sessions + 1, args.step):
+                new = [Client(base_url, mint_token(str(uuid.uuid4()))) for _ in range(target - len(clients))]
+                offers = await asyncio.gather(*(c.connect(http) for c in new), return_exceptions=True)
+                failed = sum(1 for o in offers if isinstance(o, Exception))
+                clients.extend(new)
+                affinity = await asyncio.gather(
+                    *(c.renegotiate(http) for c in new if c.pc_id), return_exceptions=True
+                )
+
+                await asyncio.sleep(args.settle)
+                cpu_before, _ = tree_usage(server.pid)
+                health = await probe_health(http, base_url, args.window)
+                cpu_after, rss = tree_usage(server.pid)
+
+                latencies = [o for o in offers if not isinstance(o, Exception)]
+                results.append(
+                    {
+                        "workers": workers,
+                        "sessions": len(clients) - failed,
+                        "failed": failed,
+                        "affinity_ok": sum(1 for a in affinity if a is True),
+                        "affinity_total": len(affinity),
+                        "offer_p50": percentile(latencies, 50),
+                        "offer_p95": percentile(latencies, 95),
+                        "health_p95": percentile(health, 95),
+                        "cpu_cores": (cpu_after - cpu_before) / args.window,
+                        "rss_mb": rss / 2**20,
+                    }
+                )
+                print(format_row(results[-1]), flush=True)
+    finally:
+        await asyncio.gather(*(c.close() for c in clients), return_exceptions=True)
+        stop_server(server)
+    return results
+
+
+def format_row(row: dict) -> str:
+    return (
+        f"workers={row['workers']} sessions={row['sessions']:4d} failed={row['failed']:3d} "
+        f"affinity={row['affinity_ok']}/{row['affinity_total']} "
+        f"offer p50={row['offer_p50'] * 1000:7.1f}ms p95={row['offer_p95'] * 1000:7.1f}ms "
+        f"health p95={row['health_p95'] * 1000:6.1f}ms "
+        f"cpu={row['cpu_cores']:5.2f} cores rss={row['rss_mb']:7.1f}MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--step", type=int, default=8)
+    parser.add_argument("--max-sessions", type=int, default=64)
+    parser.add_argument("--port", type=int, default=7900)
+    parser.add_argument("--settle", type=float, default=3, help="seconds after connecting before measuring")
+    parser.add_argument("--window", type=float, default=5, help="seconds of measurement per step")
+    parser.add_argument("--lag-budget-ms", type=float, default=100)
+    args = parser.parse_args()
+
+    stub = PostgrestStub()
+    stub.start_in_thread()
+
+    summary = []
+    for workers in args.workers:
+        rows = asyncio.run(run_workers(workers, args, stub))
+        ok = [
+            r["sessions"]
+            for r in rows
+            if r["failed"] == 0 and r["health_p95"] * 1000 <= args.lag_budget_ms
+        ]
+        summary.append((workers, max(ok) if ok else 0))
+
+    print("\ncapacity (sessions with all offers accepted and health p95 within budget):")
+    for workers, capacity in summary:
+        print(f"  {workers} worker(s): {capacity} sessions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Local stand-in for the Gemini API used by the LLM benchmarks.
+
+Serves generateContent, streamGenerateContent, models.get and the
+cachedContents endpoints the google-genai SDK calls. Time to first token
+grows with the prompt: uncached prompt tokens cost more prefill time than
+tokens read from a cached content, and usageMetadata reports the cached
+token count like the real API does. Non-streaming replies also take
+output_ms_per_token per output token to decode.
+"""
+
+import asyncio
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Union
+
+from aiohttp import web
+
+
+def count_tokens(content) -> int:
+    """About 4 characters per token over all text parts."""
+    if not content:
+        return 0
+    if isinstance(content, list):
+        return sum(count_tokens(c) for c in content)
+    return sum(len(part.get("text", "")) // 4 for part in content.get("parts", []))
+
+
+def rfc3339(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def parse_ttl(ttl: Optional[str]) -> float:
+    return float(ttl.rstrip("s")) if ttl else 3600
+
+
+class GeminiStub:
+    """Minimal Gemini API server for /v1beta."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 54322,
+        base_ms: float = 300,
+        uncached_ms_per_1k: float = 40,
+        cached_ms_per_1k: float = 8,
+        reply: Union[str, Callable[[dict], str]] = "That sounds really hard. What part of it weighs on you the most right now?",
+        output_ms_per_token: float = 0,
+    ):
+        """
+        Args:
+            reply: The reply text, or a function of the request body returning it.
+            output_ms_per_token: Decode time per output token of generateContent calls.
+        """
+        self.host = host
+        self.port = port
+        self.base_ms = base_ms
+        self.uncached_ms_per_1k = uncached_ms_per_1k
+        self.cached_ms_per_1k = cached_ms_per_1k
+        self.reply = reply
+        self.output_ms_per_token = output_ms_per_token
+        self.caches: dict = {}
+        self.reset()
+        self._runner: Optional[web.AppRunner] = None
+
+    def reset(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+        self.caches_created = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/v1beta/cachedContents", self._create_cache)
+        app.router.add_get("/v1beta/cachedContents", self._list_caches)
+        app.router.add_patch("/v1beta/cachedContents/{id}", self._update_cache)
+        app.router.add_get("/v1beta/models/{model}", self._get_model)
+        app.router.add_post("/v1beta/models/{call}", self._generate)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    def start_in_thread(self):
+        """Serve from a separate thread and event loop."""
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def serve():
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start())
+            started.set()
+            loop.run_forever()
+
+        threading.Thread(target=serve, name="gemini-stub", daemon=True).start()
+        started.wait()
+
+    def _cache_json(self, cache: dict) -> dict:
+        return {
+            "name": cache["name"],
+            "displayName": cache["display_name"],
+            "model": cache["model"],
+            "createTime": rfc3339(cache["created"]),
+            "updateTime": rfc3339(cache["updated"]),
+            "expireTime": rfc3339(cache["expires"]),
+            "usageMetadata": {"totalTokenCount": cache["tokens"]},
+        }
+
+    async def _create_cache(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        now = time.time()
+        name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+        cache = {
+            "name": name,
+            "display_name": body.get("displayName", ""),
+            "model": body.get("model", ""),
+            "created": now,
+            "updated": now,
+            "expires": now + parse_ttl(body.get("ttl")),
+            "tokens": count_tokens(body.get("systemInstruction"))
+            + count_tokens(body.get("contents")),
+        }
+        self.caches[name] = cache
+        self.caches_created += 1
+        return web.json_response(self._cache_json(cache))
+
+    async def _list_caches(self, request: web.Request) -> web.Response:
+        now = time.time()
+        live = [c for c in self.caches.values() if c["expires"] > now]
+        return web.json_response({"cachedContents": [self._cache_json(c) for c in live]})
+
+    async def _update_cache(self, request: web.Request) -> web.Response:
+        cache = self.caches.get(f"cachedContents/{request.match_info['id']}")
+        if cache is None:
+            return web.json_response({"error": {"code": 404, "message": "not found"}}, status=404)
+        body = await request.json()
+        cache["updated"] = time.time()
+        cache["expires"] = time.time() + parse_ttl(body.get("ttl"))
+        return web.json_response(self._cache_json(cache))
+
+    async def _get_model(self, request: web.Request) -> web.Response:
+        model = request.match_info["model"]
+        return web.json_response({"name": f"models/{model}", "displayName": model})
+
+    async def _generate(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        cached = 0
+        if body.get("cachedContent"):
+            cache = self.caches.get(body["cachedContent"])
+            if cache is None or cache["expires"] < time.time():
+                return web.json_response(
+                    {"error": {"code": 403, "message": "CachedContent not found", "status": "PERMISSION_DENIED"}},
+                    status=403,
+                )
+            cached = cache["tokens"]
+        uncached = count_tokens(body.get("systemInstruction")) + count_tokens(body.get("contents"))
+        self.requests += 1
+        self.prompt_tokens += cached + uncached
+        self.cached_tokens += cached
+
+        await asyncio.sleep(
+            (
+                self.base_ms
+                + self.uncached_ms_per_1k * uncached / 1000
+                + self.cached_ms_per_1k * cached / 1000
+            )
+            / 1000
+        )
+        reply = self.reply(body) if callable(self.reply) else self.reply
+        usage = {
+            "promptTokenCount": cached + uncached,
+            "cachedContentTokenCount": cached,
+        }
+        if request.match_info["call"].endswith(":generateContent"):
+            output = max(len(reply) // 4, 1)
+            self.output_tokens += output
+            await asyncio.sleep(self.output_ms_per_token * output / 1000)
+            return web.json_response(
+                {
+                    "candidates": [
+                        {
+                            "content": {"role": "model", "parts": [{"text": reply}]},
+                            "finishReason": "STOP",
+                        }
+                    ],
+                    "usageMetadata": {
+                        **usage,
+                        "candidatesTokenCount": output,
+                        "totalTokenCount": cached + uncached + output,
+                    },
+                    "modelVersion": request.match_info["call"].split(":")[0],
+                }
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        words = reply.split()
+        self.output_tokens += len(words)
+        for i, word in enumerate(words):
+            chunk = {
+                "candidates": [
+                    {"content": {"role": "model", "parts": [{"text": (" " if i else "") + word}]}}
+                ],
+                "modelVersion": request.match_info["call"].split(":")[0],
+            }
+            if i == len(words) - 1:
+                chunk["candidates"][0]["finishReason"] = "STOP"
+                chunk["usageMetadata"] = {
+                    **usage,
+                    "candidatesTokenCount": len(words),
+                    "totalTokenCount": cached + uncached + len(words),
+                }
+            await response.write(f"data: {json.dumps(chunk)}\r\n\r\n".encode())
+            await asyncio.sleep(0.01)
+        await response.write_eof()
+        return response
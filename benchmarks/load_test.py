@@ -0,0 +1,343 @@
+"""Synthetic load test: capacity curve of concurrent calls on one box.
+
+Starts server.py with the simulated LLM/STT/TTS providers (see
+services/simulated_providers_service.py), then ramps up headless WebRTC
+clients. Each client takes turns with the agent: it speaks an utterance,
+waits for the reply to finish (or --turn-gap seconds without one), pauses
+and speaks again. It measures:
+
+- reply latency: end of its utterance until the first audible reply frame
+  arrives (this includes the VAD stop delay, like a real caller hears it)
+- jitter: deviation of the reply audio frame inter-arrival time from the
+  nominal frame duration
+
+Utterances come from --wav files (16-bit PCM, any rate). Without WAVs a
+synthetic voiced signal is used, which Silero VAD detects as speech.
+
+For every step it prints sessions vs p50/p95 latency, jitter, missed
+replies, CPU cores and RSS of the server process tree. "capacity" is the
+largest step whose p95 stays within --degradation of the first step and
+where no reply was missed.
+
+Usage:
+    python -m benchmarks.load_test --step 5 --max-sessions 40 --profile typical
+    python -m benchmarks.load_test --wav samples/*.wav --workers 4
+"""
+
+import argparse
+import asyncio
+import fractions
+import time
+import uuid
+import wave
+from typing import List, Optional
+
+import aiohttp
+import numpy as np
+from aiortc import MediaStreamTrack
+from aiortc.mediastreams import MediaStreamError
+from av import AudioFrame
+
+from benchmarks.bench_token_service import mint_token
+from benchmarks.bench_workers import (
+    Client,
+    percentile,
+    start_server,
+    stop_server,
+    tree_usage,
+    wait_ready,
+)
+from benchmarks.postgrest_stub import PostgrestStub
+
+SAMPLE_RATE = 48000
+FRAME_SAMPLES = 960  # 20 ms
+# Mean absolute sample value above which a received frame counts as speech
+SPEECH_LEVEL = 300
+
+
+def load_wav(path: str) -> np.ndarray:
+    """Load a 16-bit PCM WAV as mono int16 at SAMPLE_RATE."""
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM is supported")
+        channels, rate = wav.getnchannels(), wav.getframerate()
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        positions = np.arange(0, len(samples), rate / SAMPLE_RATE)
+        samples = np.interp(positions, np.arange(len(samples)), samples)
+    return samples.astype(np.int16)
+
+
+def synthetic_utterance(seconds: float, seed: int) -> np.ndarray:
+    """A voiced signal with changing vowel formants, close enough to speech for the VAD."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    f0 = rng.uniform(110, 210) * (1 + 0.1 * np.sin(2 * np.pi * 0.7 * t))
+    pulses = (np.diff(np.floor(np.cumsum(f0 / SAMPLE_RATE)), prepend=0) > 0).astype(float)
+
+    vowels = [(700, 1200, 2600), (300, 2300, 3000), (500, 900, 2500), (400, 1900, 2600)]
+    syllable = int(0.22 * SAMPLE_RATE)
+    out = np.zeros(n)
+    radius = np.exp(-np.pi * 80 / SAMPLE_RATE)
+    for start in range(0, n, syllable):
+        segment = pulses[start : start + syllable]
+        voiced = np.zeros(len(segment))
+        for formant in vowels[rng.integers(len(vowels))]:
+            # Two-pole resonator per formant
+            a1 = -2 * radius * np.cos(2 * np.pi * formant / SAMPLE_RATE)
+            a2 = radius * radius
+            y1 = y2 = 0.0
+            for i, x in enumerate(segment):
+                y = x - a1 * y1 - a2 * y2
+                voiced[i] += y
+                y1, y2 = y, y1
+        envelope = np.sin(np.pi * np.arange(len(segment)) / syllable) ** 0.5
+        out[start : start + syllable] = voiced * envelope
+    out += 0.01 * np.abs(out).max() * rng.standard_normal(n)
+    return (out / np.abs(out).max() * 0.5 * 32767).astype(np.int16)
+
+
+class SpeechTrack(MediaStreamTrack):
+    """
+    Plays utterances in real time, taking turns with the agent.
+
+    After each utterance the track stays silent until the agent's reply has
+    finished (plus `pause`), or until `turn_gap` seconds pass without a reply.
+    """
+
+    kind = "audio"
+
+    def __init__(self, utterances: List[np.ndarray], turn_gap: float, lead_in: float, pause: float):
+        super().__init__()
+        self.utterances = utterances
+        self.turn_gap = turn_gap
+        self.pause = pause
+        self.utterance_ends: List[float] = []
+        self._lead_in = lead_in
+        self._next = 0
+        self._pts = 0
+        self._start: Optional[float] = None
+        self._utterance: Optional[np.ndarray] = None
+        self._position = 0
+        self._next_turn_at = float("inf")
+
+    def hold(self):
+        """The agent started talking: do not speak over it."""
+        self._next_turn_at = float("inf")
+
+    def release(self):
+        """The agent stopped talking: speak again after a short pause."""
+        self._next_turn_at = time.monotonic() + self.pause
+
+    async def recv(self):
+        if self._start is None:
+            self._start = time.monotonic()
+            # Leave room for the greeting before the first utterance
+            self._next_turn_at = self._start + self._lead_in
+        wait = self._start + self._pts / SAMPLE_RATE - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        now = time.monotonic()
+        if self._utterance is None and now >= self._next_turn_at:
+            self._utterance = self.utterances[self._next % len(self.utterances)]
+            self._next += 1
+            self._position = 0
+
+        if self._utterance is None:
+            samples = np.zeros(FRAME_SAMPLES, dtype=np.int16)
+        else:
+            samples = self._utterance[self._position : self._position + FRAME_SAMPLES]
+            samples = np.pad(samples, (0, FRAME_SAMPLES - len(samples)))
+            self._position += FRAME_SAMPLES
+            if self._position >= len(self._utterance):
+                self._utterance = None
+                self.utterance_ends.append(now)
+                self._next_turn_at = now + self.turn_gap
+
+        frame = AudioFrame.from_ndarray(samples.reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = SAMPLE_RATE
+        frame.pts = self._pts
+        frame.time_base = fractions.Fraction(1, SAMPLE_RATE)
+        self._pts += FRAME_SAMPLES
+        return frame
+
+
+class LoadClient(Client):
+    """WebRTC client that talks to the agent and times its replies."""
+
+    def __init__(self, base_url: str, token: str, track: SpeechTrack):
+        super().__init__(base_url, token, track)
+        self.replies: List[tuple] = []  # (onset time, latency)
+        self.gaps: List[tuple] = []  # (arrival time, inter-arrival deviation)
+        self._answered = 0
+        self._receiver: Optional[asyncio.Task] = None
+
+        @self.pc.on("track")
+        def on_track(track):
+            if track.kind == "audio":
+                self._receiver = asyncio.ensure_future(self._receive(track))
+
+    async def _receive(self, track):
+        last_arrival = None
+        last_speech = 0.0
+        speaking = False
+        try:
+            while True:
+                frame = await track.recv()
+                now = time.monotonic()
+                level = np.abs(frame.to_ndarray()).mean()
+                if speaking and last_arrival is not None:
+                    expected = frame.samples / frame.sample_rate
+                    self.gaps.append((now, abs(now - last_arrival - expected)))
+                if level > SPEECH_LEVEL:
+                    if not speaking:
+                        self._on_reply(now)
+                        self.track.hold()
+                    speaking = True
+                    last_speech = now
+                elif speaking and now - last_speech > 0.5:
+                    speaking = False
+                    self.track.release()
+                last_arrival = now
+        except MediaStreamError:
+            pass
+
+    def _on_reply(self, now: float):
+        ends = self.track.utterance_ends
+        # Only the first reply after an utterance counts, the greeting does not
+        if len(ends) > self._answered:
+            self.replies.append((now, now - ends[-1]))
+            self._answered = len(ends)
+
+    def missed(self, since: float, until: float) -> int:
+        """Utterances ended in [since, until - turn_gap] that got no reply within turn_gap."""
+        turn_gap = self.track.turn_gap
+        ends = [e for e in self.track.utterance_ends if since <= e <= until - turn_gap]
+        answered = sum(
+            1 for e in ends if any(0 < onset - e < turn_gap for onset, _ in self.replies)
+        )
+        return len(ends) - answered
+
+    async def close(self):
+        if self._receiver:
+            self._receiver.cancel()
+        await super().close()
+
+
+async def run(args, stub: PostgrestStub, utterances: List[np.ndarray]) -> list:
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = start_server(
+        args.port,
+        args.workers,
+        stub,
+        args.max_sessions,
+        LLM_PROVIDER="simulated",
+        STT_PROVIDER="simulated",
+        TTS_PROVIDER="simulated",
+        SIMULATED_PROFILE=args.profile,
+        # The simulated replies repeat verbatim, only let the greeting hit the TTS cache
+        TTS_CACHE_MIN_REPEATS="0",
+    )
+    clients: List[LoadClient] = []
+    rows = []
+    try:
+        async with aiohttp.ClientSession() as http:
+            await wait_ready(http, base_url, args.workers if args.workers > 1 else 0)
+            for target in range(args.step, args.max_sessions + 1, args.step):
+                new = [
+                    LoadClient(
+                        base_url,
+                        mint_token(str(uuid.uuid4())),
+                        SpeechTrack(utterances, args.turn_gap, args.lead_in, args.pause),
+                    )
+                    for _ in range(target - len(clients))
+                ]
+                results = await asyncio.gather(
+                    *(c.connect(http) for c in new), return_exceptions=True
+                )
+                failed = sum(1 for r in results if isinstance(r, Exception))
+                clients.extend(c for c, r in zip(new, results) if not isinstance(r, Exception))
+
+                # Let the new callers get past the greeting into regular turns
+                await asyncio.sleep(args.lead_in + 2)
+                start = time.monotonic()
+                cpu_before, _ = tree_usage(server.pid)
+                await asyncio.sleep(args.window)
+                cpu_after, rss = tree_usage(server.pid)
+                end = time.monotonic()
+
+                latencies = [
+                    latency
+                    for c in clients
+                    for onset, latency in c.replies
+                    if start <= onset <= end
+                ]
+                jitter = [gap for c in clients for at, gap in c.gaps if start <= at <= end]
+                missed = sum(c.missed(start, end) for c in clients)
+                row = {
+                    "sessions": len(clients),
+                    "failed": failed,
+                    "replies": len(latencies),
+                    "missed": missed,
+                    "p50": percentile(latencies, 50),
+                    "p95": percentile(latencies, 95),
+                    "jitter_p95": percentile(jitter, 95),
+                    "cpu_cores": (cpu_after - cpu_before) / (end - start),
+                    "rss_mb": rss / 2**20,
+                }
+                rows.append(row)
+                print(format_row(row), flush=True)
+    finally:
+        await asyncio.gather(*(c.close() for c in clients), return_exceptions=True)
+        stop_server(server)
+    return rows
+
+
+def format_row(row: dict) -> str:
+    return (
+        f"sessions={row['sessions']:4d} failed={row['failed']:3d} "
+        f"replies={row['replies']:4d} missed={row['missed']:3d} "
+        f"latency p50={row['p50'] * 1000:7.1f}ms p95={row['p95'] * 1000:7.1f}ms "
+        f"jitter p95={row['jitter_p95'] * 1000:6.1f}ms "
+        f"cpu={row['cpu_cores']:5.2f} cores rss={row['rss_mb']:7.1f}MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wav", nargs="*", default=[], help="utterance WAV files")
+    parser.add_argument("--profile", default="typical", help="simulated provider profile: fast, typical, slow")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--step", type=int, default=5)
+    parser.add_argument("--max-sessions", type=int, default=40)
+    parser.add_argument("--turn-gap", type=float, default=8, help="seconds to wait for a reply before speaking again")
+    parser.add_argument("--pause", type=float, default=1, help="silence after a reply before the next utterance, seconds")
+    parser.add_argument("--lead-in", type=float, default=6, help="silence before the first utterance, seconds")
+    parser.add_argument("--window", type=float, default=30, help="measurement window per step, seconds")
+    parser.add_argument("--degradation", type=float, default=0.25, help="allowed p95 increase over the first step")
+    parser.add_argument("--port", type=int, default=7900)
+    args = parser.parse_args()
+
+    if args.wav:
+        utterances = [load_wav(path) for path in args.wav]
+    else:
+        utterances = [synthetic_utterance(seconds, seed) for seed, seconds in enumerate((1.6, 2.2, 1.2, 2.8))]
+
+    stub = PostgrestStub()
+    stub.start_in_thread()
+    rows = asyncio.run(run(args, stub, utterances))
+
+    baseline = rows[0]["p95"] if rows else float("nan")
+    capacity = 0
+    for row in rows:
+        if row["failed"] or row["missed"] or row["p95"] > baseline * (1 + args.degradation):
+            break
+        capacity = row["sessions"]
+    print(f"\ncapacity: {capacity} sessions (p95 within {args.degradation:.0%} of {baseline * 1000:.0f}ms, no missed replies)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Local stand-in for the Supabase PostgREST endpoint used by the benchmarks.
+
+Serves the calls UserRepository makes against the 'users' table with a
+configurable server-side delay, so benchmarks do not need a Supabase project.
+Updates honor the eq, like, is.null and or filters of conditional memory
+writes.
+"""
+
+import asyncio
+import json
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from aiohttp import web
+
+
+def make_user(user_id: str) -> dict:
+    return {
+        "id": user_id,
+        "name": "Load Test",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "gender": "other",
+        "preferences": None,
+        "context": "",
+    }
+
+
+def matches(value: Optional[str], condition: str) -> bool:
+    """Evaluate a PostgREST condition such as "eq.x", "like.ab*" or "not.is.null"."""
+    if condition.startswith("not."):
+        return not matches(value, condition[4:])
+    operator, _, operand = condition.partition(".")
+    if operator == "is":
+        return value is None if operand == "null" else str(value).lower() == operand
+    if value is None:
+        return False
+    if operator == "eq":
+        return value == operand
+    if operator == "like":
+        pattern = "".join(
+            ".*" if c in "*%" else "." if c == "_" else re.escape(c) for c in operand
+        )
+        return re.fullmatch(pattern, value, re.DOTALL) is not None
+    raise ValueError(f"Unsupported filter {condition}")
+
+
+class PostgrestStub:
+    """Minimal PostgREST server for /rest/v1/users."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 54321, delay_ms: float = 20):
+        self.host = host
+        self.port = port
+        self.delay = delay_ms / 1000
+        self.users: dict = {}
+        self.requests = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/rest/v1/users", self._select)
+        app.router.add_patch("/rest/v1/users", self._update)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    def start_in_thread(self):
+        """Serve from a separate thread and event loop.
+
+        Needed when the code under test blocks its own loop, otherwise the
+        stub could not answer the blocking request.
+        """
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def serve():
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start())
+            started.set()
+            loop.run_forever()
+
+        threading.Thread(target=serve, name="postgrest-stub", daemon=True).start()
+        started.wait()
+
+    def _user_id(self, request: web.Request) -> str:
+        # PostgREST filters look like ?id=eq.<value>
+        return request.query.get("id", "eq.unknown").split(".", 1)[1]
+
+    async def _select(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        user_id = self._user_id(request)
+        user = self.users.setdefault(user_id, make_user(user_id))
+        # .single() asks for an object instead of a list
+        if "vnd.pgrst.object" in request.headers.get("Accept", ""):
+            return web.json_response(user)
+        return web.json_response([user])
+
+    async def _update(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        user_id = self._user_id(request)
+        user = self.users.setdefault(user_id, make_user(user_id))
+        for column, condition in request.query.items():
+            if column == "or":
+                # or=(column.condition,column.condition)
+                alternatives = [
+                    alternative.split(".", 1)
+                    for alternative in condition.strip("()").split(",")
+                ]
+                if not any(matches(user.get(c), cond) for c, cond in alternatives):
+                    return web.json_response([])
+            elif column not in ("id", "select") and not matches(user.get(column), condition):
+                return web.json_response([])
+        user.update(json.loads(await request.read()))
+        return web.json_response([user])
@@ -0,0 +1,295 @@
+"""Front process for running server.py with several worker processes.
+
+Every worker is a server.py instance with its own event loop, agent pool
+and session registry, listening on a local port, and owns the
+SmallWebRTCConnection, AgentService and pipeline of its sessions. The front
+process owns the public port and the signaling: it verifies the client's
+token, loads its UserInfo and hands the accepted offer (SDP plus UserInfo)
+to the least loaded worker through the worker's /worker endpoints, which
+only accept requests carrying WORKER_SECRET. WebRTC renegotiations go back
+to the worker that owns the pc_id. Workers that exit, stop answering their
+health checks or drain for recycling are restarted by the WorkerSupervisor.
+
+Start it with `python server.py --workers 4`.
+"""
+
+import asyncio
+import os
+import secrets
+import signal
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, Response
+from jwt.exceptions import InvalidTokenError
+from loguru import logger
+
+from repositories.user_repository import UserRepository
+from services.metrics_service import render_metrics
+from services.token_service import TokenService
+from services.worker_router_service import WorkerRouter, decode_pc_id, encode_pc_id
+from services.worker_supervisor_service import WorkerSupervisor
+
+load_dotenv()
+
+router = WorkerRouter(
+    [url for url in os.getenv("WORKER_URLS", "").split(",") if url]
+)
+
+# Set by serve() when the workers are local processes
+supervisor: Optional[WorkerSupervisor] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    TokenService.load_secret_key()
+    await router.start()
+    if supervisor:
+        await supervisor.start()
+    yield
+    if supervisor:
+        await supervisor.stop()
+    await router.stop()
+    await UserRepository.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+def worker_response(status: int, body: Any, headers: dict) -> JSONResponse:
+    return JSONResponse(status_code=status, content=body, headers=headers)
+
+
+def reject_if_full():
+    if not router.candidates():
+        raise HTTPException(
+            status_code=503,
+            detail="All workers are at capacity, please retry shortly",
+            headers={"Retry-After": os.getenv("SESSION_RETRY_AFTER", "5")},
+        )
+
+
+async def authenticate(request: Request) -> dict:
+    """
+    Verify the token of a new session and load its user.
+
+    Returns:
+        dict: The user id and UserInfo for the worker's /worker endpoints.
+    """
+    token = request.query_params.get("token")
+    if not token:
+        raise HTTPException(
+            status_code=401, detail="Authorization header missing or invalid"
+        )
+    try:
+        decoded_payload = TokenService().verify_token(token)
+    except InvalidTokenError as e:
+        raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
+
+    user_id = decoded_payload.get("sub")
+    try:
+        user_info = await UserRepository().get_user(user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load user: {e}")
+    return {
+        "user_id": user_id,
+        "user_info": user_info.model_dump(mode="json") if user_info else None,
+    }
+
+
+async def place(path: str, data: dict):
+    """
+    Start a new session on the least loaded worker.
+
+    A worker that filled up since the last poll answers 503, in which case
+    the next candidate is tried.
+    """
+    reject_if_full()
+    status, body, headers = 503, {"detail": "No worker available"}, {}
+    for worker in router.candidates():
+        router.reserve(worker)
+        try:
+            status, body, headers = await router.request(
+                worker, "POST", path, json=data
+            )
+        except Exception as e:
+            logger.warning(f"Worker {worker.index} failed to start a session: {e}")
+            worker.healthy = False
+            continue
+        if status != 503:
+            return worker, status, body, headers
+        worker.free_capacity = 0
+    return None, status, body, headers
+
+
+@app.get("/health")
+def read_root():
+    return "Working!"
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics merged across all workers."""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
+@app.get("/ready")
+async def readiness():
+    status = router.readiness()
+    if not status["ready"]:
+        return JSONResponse(
+            status_code=503,
+            content=status,
+            headers={"Retry-After": os.getenv("SESSION_RETRY_AFTER", "5")},
+        )
+    return status
+
+
+@app.get("/")
+async def serve_index():
+    return FileResponse("index.html")
+
+
+@app.post("/api/offer")
+async def offer(request: Request):
+    data = await request.json()
+
+    index, pc_id = decode_pc_id(data.get("pc_id"))
+    worker = router.get(index)
+    if worker:
+        # Renegotiation: only the owning worker holds this connection
+        try:
+            status, body, headers = await router.request(
+                worker, "POST", "/worker/offer", json={**data, "pc_id": pc_id}
+            )
+        except Exception as e:
+            # Recycled or restarted since: the connection is gone with it
+            logger.warning(f"Worker {worker.index} failed to renegotiate {pc_id}: {e}")
+            worker.healthy = False
+            return worker_response(
+                503,
+                {"detail": "The session's worker is unavailable, please reconnect"},
+                {"Retry-After": os.getenv("SESSION_RETRY_AFTER", "5")},
+            )
+        if status == 404:
+            # The connection has closed, start a new session like server.py does
+            worker = None
+
+    if not worker:
+        reject_if_full()
+        user = await authenticate(request)
+        worker, status, body, headers = await place(
+            "/worker/offer", {"sdp": data["sdp"], "type": data["type"], **user}
+        )
+
+    if worker and status == 200 and isinstance(body, dict) and body.get("pc_id"):
+        body["pc_id"] = encode_pc_id(worker.index, body["pc_id"])
+    return worker_response(status, body, headers)
+
+
+@app.post("/connect")
+async def bot_connect(request: Request):
+    reject_if_full()
+    user = await authenticate(request)
+    worker, status, body, headers = await place("/worker/connect", user)
+    if worker and status == 200 and isinstance(body, dict):
+        router.remember_task(f"{body.get('room_url')}_{body.get('token')}", worker)
+    return worker_response(status, body, headers)
+
+
+@app.post("/disconnect/{task_id}")
+async def bot_disconnect(task_id: str):
+    index = router.forget_task(task_id)
+    workers = [router.get(index)] if index is not None else router.workers
+    for worker in workers:
+        try:
+            status, body, headers = await router.request(
+                worker, "POST", f"/disconnect/{task_id}"
+            )
+        except Exception as e:
+            logger.warning(f"Worker {worker.index} unreachable: {e}")
+            continue
+        if status != 404:
+            return worker_response(status, body, headers)
+    raise HTTPException(status_code=404, detail="Task not found")
+
+
+@app.get("/status")
+async def get_status() -> Dict[str, Any]:
+    async def worker_status(worker):
+        try:
+            _, body, _ = await router.request(worker, "GET", "/status")
+            return {**worker.to_dict(), "status": body}
+        except Exception as e:
+            return {**worker.to_dict(), "error": str(e)}
+
+    return {
+        **router.readiness(),
+        "workers": await asyncio.gather(*(worker_status(w) for w in router.workers)),
+        "supervisor": supervisor.stats() if supervisor else None,
+    }
+
+
+def watch_parent(parent_pid: int):
+    """Shut the worker down if the front process goes away without stopping it."""
+    while os.getppid() == parent_pid:
+        time.sleep(1)
+    os.kill(os.getpid(), signal.SIGINT)
+
+
+def run_worker(index: int, host: str, port: int, parent_pid: int):
+    os.environ["WORKER_INDEX"] = str(index)
+    if index > 0:
+        # The workers share the SQLite memory queue; only worker 0 consumes it
+        os.environ["MEMORY_QUEUE_WORKERS"] = "0"
+    threading.Thread(target=watch_parent, args=(parent_pid,), daemon=True).start()
+    uvicorn.run("server:app", host=host, port=port, log_level="info")
+
+
+def serve(host: str, port: int, workers: int):
+    """
+    Run the front process on host:port with `workers` server.py workers.
+
+    Workers listen on WORKER_HOST (127.0.0.1), on the ports right after the
+    public one, and share a WORKER_SECRET generated here unless one is set.
+    To run workers elsewhere, start them with server.py and run
+    `uvicorn front:app` with WORKER_URLS set to their comma separated URLs
+    and the same WORKER_SECRET everywhere; such workers are neither
+    restarted nor recycled by the front process.
+    """
+    global supervisor
+
+    # Inherited by the spawned workers
+    if not os.getenv("WORKER_SECRET"):
+        os.environ["WORKER_SECRET"] = secrets.token_urlsafe(32)
+    router.secret = os.environ["WORKER_SECRET"]
+
+    worker_host = os.getenv("WORKER_HOST", "127.0.0.1")
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Workers write their samples here so /metrics can merge them
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="comfortly-metrics-")
+    ports = [port + 1 + i for i in range(workers)]
+    supervisor = WorkerSupervisor(router, run_worker, worker_host, ports)
+    supervisor.spawn_all()
+
+    router.set_workers(supervisor.urls)
+    try:
+        uvicorn.run(app, host=host, port=port, log_level="info")
+    finally:
+        supervisor.stop_all()
@@ -7,16 +7,19 @@ from pydantic import BaseModel
 class LLMProvider(str, Enum):
     google = "google"
     openai = "openai"
+    simulated = "simulated"
 
 
 class TTSProvider(str, Enum):
     google = "google"
     openai = "openai"
+    simulated = "simulated"
 
 
 class STTProvider(str, Enum):
     google = "google"
     deepgram = "deepgram"
+    simulated = "simulated"
 
 
 class LLMConfig(BaseModel):
@@ -41,8 +44,37 @@ class STTConfig(BaseModel):
     alternative_languages: Optional[List[str]] = None
 
 
+class AudioConfig(BaseModel):
+    """Sample rates of the audio path, shared by the transport and the services.
+
+    The input is converted once, by the transport, to `in_sample_rate`,
+    which the VAD and the STT consume as is. `out_sample_rate` is the TTS
+    output rate, so the output transport never resamples.
+    """
+
+    in_sample_rate: int = 16000
+    out_sample_rate: int = 24000
+    out_10ms_chunks: int = 2
+    stt_passthrough: bool = False
+
+
 class AgentModel(BaseModel):
     llm: LLMConfig
     tts: TTSConfig
     stt: STTConfig
+    audio: AudioConfig = AudioConfig()
     first_message: Optional[str] = None
+
+
+class SimulatedProfile(BaseModel):
+    """Latency and throughput of the simulated providers used for load tests."""
+
+    stt_latency_ms: float = 150
+    stt_ms_per_audio_second: float = 20
+    llm_ttfb_ms: float = 450
+    llm_ms_per_1k_prompt_tokens: float = 30
+    llm_tokens_per_second: float = 80
+    llm_reply_words: int = 24
+    tts_ttfb_ms: float = 200
+    tts_realtime_factor: float = 4.0
+    jitter: float = 0.2
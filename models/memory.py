@@ -0,0 +1,256 @@
+import hashlib
+import re
+import uuid
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+# Every stored memory document starts with its version, see UserRepository.update_user_memory
+MEMORY_DOCUMENT_PREFIX = '{"version":'
+
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+_SENTENCE = re.compile(r"(?<=[.!?;])\s+")
+_MARKUP = "*_#` "
+
+# Free-form lines longer than this are split into sentences
+MAX_FACT_CHARS = 200
+
+
+class FactType(str, Enum):
+    identity = "identity"
+    relationship = "relationship"
+    preference = "preference"
+    goal = "goal"
+    event = "event"
+    wellbeing = "wellbeing"
+    other = "other"
+
+
+FACT_SECTIONS = {
+    FactType.identity: "About them",
+    FactType.relationship: "Relationships",
+    FactType.preference: "Preferences",
+    FactType.goal: "Goals",
+    FactType.event: "Events",
+    FactType.wellbeing: "Wellbeing and concerns",
+    FactType.other: "Other",
+}
+
+
+class MemoryOp(str, Enum):
+    add = "add"
+    update = "update"
+    remove = "remove"
+
+
+class MemoryFact(BaseModel):
+    id: str
+    type: FactType = FactType.other
+    text: str
+    confidence: float = Field(default=0.8, ge=0, le=1)
+    created_at: str
+    updated_at: str
+    # Memory version that last added or changed the fact
+    version: int = 0
+
+
+class MemoryOperation(BaseModel):
+    """One change to a user's memory, as emitted by consolidation.
+
+    `id` names the fact an update or remove applies to. Adds get their id
+    when first applied, so replaying an applied add is a no-op.
+    """
+
+    op: MemoryOp
+    id: Optional[str] = None
+    type: Optional[FactType] = None
+    text: Optional[str] = None
+    confidence: Optional[float] = None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def split_facts(memory: Optional[str]) -> List[str]:
+    """
+    Split a free-form memory into discrete facts.
+
+    Every bullet or line is a fact, prefixed with the heading it falls
+    under ("Relationships: ..."), and long paragraphs are split into
+    sentences. Duplicates are dropped.
+    """
+    facts: List[str] = []
+    seen = set()
+    section = ""
+    for line in (memory or "").splitlines():
+        text = _BULLET.sub("", line).strip(_MARKUP)
+        if not text:
+            continue
+        # "## Preferences", "**Relationships**" or "GOALS:" on a line of its own
+        if (
+            line.lstrip().startswith("#")
+            or (text.endswith(":") and len(text) < 60)
+            or (line.strip().startswith("**") and line.strip().endswith("**"))
+        ):
+            section = text.rstrip(":").strip(_MARKUP)
+            continue
+        sentences = _SENTENCE.split(text) if len(text) > MAX_FACT_CHARS else [text]
+        for sentence in sentences:
+            fact = f"{section}: {sentence}" if section else sentence
+            if _normalize(fact) not in seen:
+                seen.add(_normalize(fact))
+                facts.append(fact)
+    return facts
+
+
+class UserMemory(BaseModel):
+    """A user's memory: typed facts, versioned as a whole.
+
+    Stored as JSON in the users.context column. Each consolidation applies
+    a list of operations and produces the next version; the version leads
+    the document so writes can be made conditional on it.
+    """
+
+    version: int = 0
+    updated_at: Optional[str] = None
+    facts: List[MemoryFact] = []
+
+    @classmethod
+    def parse(cls, context: Optional[str]) -> "UserMemory":
+        """Read a stored memory, either a versioned document or a free-form one from before versioning."""
+        if context and context.startswith(MEMORY_DOCUMENT_PREFIX):
+            return cls.model_validate_json(context)
+        return cls.from_text(context)
+
+    @classmethod
+    def from_text(cls, memory: Optional[str]) -> "UserMemory":
+        """
+        Version 0 of a free-form memory, one untyped fact per line or sentence.
+
+        Fact ids derive from the text, so parsing the same memory twice
+        yields the same ids and operations made against one parse apply to
+        the other.
+        """
+        now = _now()
+        return cls(
+            facts=[
+                MemoryFact(
+                    id=hashlib.sha256(_normalize(text).encode()).hexdigest()[:8],
+                    text=text,
+                    confidence=0.7,
+                    created_at=now,
+                    updated_at=now,
+                )
+                for text in split_facts(memory)
+            ]
+        )
+
+    def serialize(self) -> str:
+        return self.model_dump_json()
+
+    def render(self) -> str:
+        """The memory as plain text grouped by fact type, for prompts."""
+        sections = []
+        for fact_type, title in FACT_SECTIONS.items():
+            lines = [f"- {fact.text}" for fact in self.facts if fact.type == fact_type]
+            if lines:
+                sections.append("\n".join([f"## {title}", *lines]))
+        return "\n\n".join(sections)
+
+    def fact_texts(self) -> List[str]:
+        """One line per fact, prefixed with its type, for retrieval."""
+        return [
+            fact.text if fact.type == FactType.other else f"{FACT_SECTIONS[fact.type]}: {fact.text}"
+            for fact in self.facts
+        ]
+
+    def apply(
+        self, operations: List[MemoryOperation], base_version: Optional[int] = None
+    ) -> Tuple["UserMemory", List[MemoryOperation], int]:
+        """
+        Apply operations all at once, as the next version.
+
+        Operations made against an older version (base_version) are rebased
+        onto this one. A fact changed by another version since then is a
+        conflict: an update still applies (the later session wins), a remove
+        is skipped. Updates of missing facts are skipped too, and adds of a
+        fact already present, by id or text, are no-ops.
+
+        Args:
+            operations (List[MemoryOperation]): The changes, in order.
+            base_version (int): Version the operations were made against, None if this one.
+
+        Returns:
+            tuple: The new memory (this one if nothing applied), the applied
+                operations with the ids given to added facts, and the number
+                of conflicts.
+        """
+        version = self.version + 1
+        now = _now()
+        facts: Dict[str, MemoryFact] = {fact.id: fact for fact in self.facts}
+        texts = {_normalize(fact.text) for fact in self.facts}
+        applied: List[MemoryOperation] = []
+        touched = set()
+        conflicts = 0
+
+        def changed_since_base(fact: MemoryFact) -> bool:
+            return base_version is not None and fact.version > base_version and fact.id not in touched
+
+        for operation in operations:
+            if operation.op == MemoryOp.add:
+                text = (operation.text or "").strip()
+                if not text or operation.id in facts or _normalize(text) in texts:
+                    continue
+                fact = MemoryFact(
+                    id=operation.id or uuid.uuid4().hex[:8],
+                    type=operation.type or FactType.other,
+                    text=text,
+                    confidence=min(max(operation.confidence if operation.confidence is not None else 0.8, 0), 1),
+                    created_at=now,
+                    updated_at=now,
+                    version=version,
+                )
+                facts[fact.id] = fact
+                texts.add(_normalize(text))
+                operation = operation.model_copy(update={"id": fact.id})
+            else:
+                fact = facts.get(operation.id)
+                if fact is None:
+                    if operation.op == MemoryOp.update:
+                        conflicts += 1
+                    continue
+                if changed_since_base(fact):
+                    conflicts += 1
+                    if operation.op == MemoryOp.remove:
+                        continue
+                if operation.op == MemoryOp.remove:
+                    del facts[fact.id]
+                    texts.discard(_normalize(fact.text))
+                else:
+                    update = {"updated_at": now, "version": version}
+                    if operation.text and operation.text.strip():
+                        texts.discard(_normalize(fact.text))
+                        update["text"] = operation.text.strip()
+                        texts.add(_normalize(update["text"]))
+                    if operation.type:
+                        update["type"] = operation.type
+                    if operation.confidence is not None:
+                        update["confidence"] = min(max(operation.confidence, 0), 1)
+                    facts[fact.id] = fact.model_copy(update=update)
+            touched.add(operation.id)
+            applied.append(operation)
+
+        if not applied:
+            return self, [], conflicts
+        return (
+            UserMemory(version=version, updated_at=now, facts=list(facts.values())),
+            applied,
+            conflicts,
+        )
@@ -1,28 +1,115 @@
+import asyncio
 import os
+from typing import TYPE_CHECKING, Optional
 
-from supabase import Client, create_client
+import httpx
+
+from models.memory import MEMORY_DOCUMENT_PREFIX, UserMemory
+from models.user import UserInfo
+from utils.cache import TTLCache
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
 
 
 class UserRepository:
+    """
+    Async access to the 'users' table.
+
+    Every instance shares one long-lived Supabase client per process. The
+    client sits on a pooled keep-alive HTTP connection pool and the number of
+    in-flight requests is bounded so a burst of sessions cannot open an
+    unbounded number of connections.
+
+    Parsed UserInfo objects are kept in a process-wide LRU+TTL cache
+    (USER_CACHE_SIZE entries for USER_CACHE_TTL seconds) that context
+    and memory updates write through to.
+    """
+
+    _client: Optional["AsyncClient"] = None
+    _http_client: Optional[httpx.AsyncClient] = None
+    _client_lock: Optional[asyncio.Lock] = None
+    _semaphore: Optional[asyncio.Semaphore] = None
+    user_cache = TTLCache(
+        max_size=int(os.getenv("USER_CACHE_SIZE", "10000")),
+        ttl=float(os.getenv("USER_CACHE_TTL", "300")),
+    )
+
     def __init__(
         self,
     ):
         """
-        Initialize the UserRepository with Supabase client.
+        Initialize the UserRepository. The shared Supabase client is created
+        lazily on first use and configured from the environment:
 
-        Args:
-            supabase_url (str): The Supabase project URL.
-            supabase_key (str): The Supabase API key.
+            SUPABASE_URL / SUPABASE_KEY: The Supabase project URL and API key.
+            SUPABASE_TIMEOUT: Request timeout in seconds.
+            SUPABASE_MAX_CONNECTIONS: Size of the keep-alive connection pool.
+            SUPABASE_KEEPALIVE_EXPIRY: Seconds an idle connection is kept open.
+            SUPABASE_MAX_CONCURRENCY: Maximum number of in-flight requests.
         """
-        supabase_url = os.getenv(
-            "SUPABASE_URL",
-        )
-        supabase_key = os.getenv(
-            "SUPABASE_KEY",
-        )
-        self.supabase: Client = create_client(supabase_url, supabase_key)
 
-    def get_user_info(self, userId: str):
+    @classmethod
+    async def get_client(cls) -> "AsyncClient":
+        """
+        Return the process-wide Supabase client, creating it on first use.
+
+        Returns:
+            AsyncClient: The shared Supabase client.
+        """
+        if cls._client is not None:
+            return cls._client
+
+        if cls._client_lock is None:
+            cls._client_lock = asyncio.Lock()
+
+        async with cls._client_lock:
+            if cls._client is None:
+                # Imported with the first client, server startup does not need it
+                from supabase import AsyncClientOptions, acreate_client
+
+                supabase_url = os.getenv(
+                    "SUPABASE_URL",
+                )
+                supabase_key = os.getenv(
+                    "SUPABASE_KEY",
+                )
+                timeout = float(os.getenv("SUPABASE_TIMEOUT", "5"))
+                max_connections = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+
+                cls._semaphore = asyncio.Semaphore(
+                    int(os.getenv("SUPABASE_MAX_CONCURRENCY", "20"))
+                )
+                cls._http_client = httpx.AsyncClient(
+                    timeout=httpx.Timeout(timeout),
+                    limits=httpx.Limits(
+                        max_connections=max_connections,
+                        max_keepalive_connections=max_connections,
+                        keepalive_expiry=float(
+                            os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "60")
+                        ),
+                    ),
+                )
+                cls._client = await acreate_client(
+                    supabase_url,
+                    supabase_key,
+                    options=AsyncClientOptions(
+                        postgrest_client_timeout=timeout,
+                        httpx_client=cls._http_client,
+                    ),
+                )
+        return cls._client
+
+    @classmethod
+    async def close(cls):
+        """Close the shared client and its connection pool."""
+        if cls._http_client is not None:
+            await cls._http_client.aclose()
+        cls._client = None
+        cls._http_client = None
+        cls._semaphore = None
+
+    async def get_user_info(self, userId: str):
         """
         Fetch user information from the 'users' table.
 
@@ -32,14 +119,44 @@ class UserRepository:
         Returns:
             dict: The user information if found, otherwise None.
         """
-        response = (
-            self.supabase.table("users").select("*").eq("id", userId).single().execute()
-        )
+        supabase = await self.get_client()
+        async with self._semaphore:
+            response = (
+                await supabase.table("users")
+                .select("*")
+                .eq("id", userId)
+                .single()
+                .execute()
+            )
         if response.data:
             return response.data
         return None
 
-    def update_user_context(self, userId: str, updatedContext: str):
+    async def get_user(self, userId: str) -> Optional[UserInfo]:
+        """
+        Return the user as UserInfo, served from the cache when possible.
+
+        Concurrent misses for the same user share a single database fetch.
+
+        Args:
+            userId (str): The ID of the user to fetch.
+
+        Returns:
+            UserInfo: The user if found, otherwise None.
+        """
+
+        async def load() -> Optional[UserInfo]:
+            user_data = await self.get_user_info(userId)
+            return UserInfo(**user_data) if user_data else None
+
+        return await self.user_cache.get_or_load(userId, load)
+
+    @classmethod
+    def cache_stats(cls) -> dict:
+        """Return hit/miss counters of the user cache."""
+        return cls.user_cache.stats()
+
+    async def update_user_context(self, userId: str, updatedContext: str):
         """
         Update the user's context in the 'users' table.
 
@@ -50,12 +167,54 @@ class UserRepository:
         Returns:
             dict: The updated user information if successful, otherwise None.
         """
-        response = (
-            self.supabase.table("users")
-            .update({"context": updatedContext})
+        supabase = await self.get_client()
+        async with self._semaphore:
+            response = (
+                await supabase.table("users")
+                .update({"context": updatedContext})
+                .eq("id", userId)
+                .execute()
+            )
+        if response.data:
+            self.user_cache.set(userId, UserInfo(**response.data[0]))
+            return response.data[0]
+        self.user_cache.invalidate(userId)
+        return None
+
+    async def update_user_memory(
+        self, userId: str, memory: UserMemory, expected_version: int
+    ) -> Optional[dict]:
+        """
+        Write a new version of the user's memory, if nobody else did first.
+
+        The write only goes through while the stored memory is still at
+        expected_version, which leads every memory document. Version 0 is
+        no memory yet or a free-form one from before versioning.
+
+        Args:
+            userId (str): The ID of the user to update.
+            memory (UserMemory): The new memory.
+            expected_version (int): The version the new memory was built on.
+
+        Returns:
+            dict: The updated user information, or None if the memory changed
+                in between (or the user does not exist).
+        """
+        supabase = await self.get_client()
+        query = (
+            supabase.table("users")
+            .update({"context": memory.serialize()})
             .eq("id", userId)
-            .execute()
         )
+        if expected_version > 0:
+            query = query.like("context", f'{MEMORY_DOCUMENT_PREFIX}{expected_version},*')
+        else:
+            # "_" matches any character, quotes would need escaping inside or=()
+            query = query.or_("context.is.null,context.not.like.{_version_*")
+        async with self._semaphore:
+            response = await query.execute()
         if response.data:
+            self.user_cache.set(userId, UserInfo(**response.data[0]))
             return response.data[0]
+        self.user_cache.invalidate(userId)
         return None
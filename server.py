@@ -1,105 +1,153 @@
 import argparse
 import asyncio
+import hmac
 import logging
 import os
 from contextlib import asynccontextmanager
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
-import aiohttp
 from dotenv import load_dotenv
-from fastapi import BackgroundTasks, FastAPI, HTTPException, Request
+from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from jwt.exceptions import InvalidTokenError
-from pipecat.transports.network.small_webrtc import SmallWebRTCTransport
-from pipecat.transports.network.webrtc_connection import (
-    IceServer,
-    SmallWebRTCConnection,
-)
-from dotenv import load_dotenv
 
 load_dotenv()
-# Import Daily-related modules conditionally
+# Daily is only imported when enabled, and then during the warm-up
 USE_DAILY = os.getenv("USE_DAILY", "").lower() == "true"
 
-if USE_DAILY:
-    from pipecat.transports.services.helpers.daily_rest import (
-        DailyRESTHelper,
-        DailyRoomParams,
-    )
-
-from models.agent_model import (
-    AgentModel,
-    LLMConfig,
-    LLMProvider,
-    STTConfig,
-    STTProvider,
-    TTSConfig,
-    TTSProvider,
-)
-from models.user import Gender, UserInfo
+# Only what is needed to bind the port and answer /health is imported here.
+# pipecat, the provider SDKs and the services built on them are loaded by
+# the warm-up steps once the server is up (see lifespan).
+from models.user import UserInfo
 from repositories.user_repository import UserRepository
-from services.agent_service import AgentService
-from services.providers_service import ProvidersService
+from services.agent_pool_service import AgentPoolService
+from services.connection_pool_service import ConnectionPoolService
+from services.metrics_service import render_metrics
+from services.session_manager_service import CapacityError, SessionManager
+from services.startup_service import StartupService
 from services.token_service import TokenService
-from utils.constants import get_default_agent_model
+from services.transcript_journal_service import TranscriptJournalService
+
+if TYPE_CHECKING:
+    from pipecat.transports.network.webrtc_connection import SmallWebRTCConnection
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Dictionary to track bot tasks: {task_id: asyncio.Task}
-bot_tasks = {}
+# Registry of the agent sessions on this node, keyed by task id (Daily) or pc_id (WebRTC).
+# Only workers started by front.py are restarted, so only they may drain for recycling.
+sessions = SessionManager(recycle_after=None if os.getenv("WORKER_INDEX") else 0)
 
 # Store Daily API helpers
 daily_helpers = {}
 
+# Pre-built agents waiting to be bound to a transport
+agent_pool = AgentPoolService()
 
-# Store connections by pc_id
-pcs_map: Dict[str, SmallWebRTCConnection] = {}
 
+# Background startup after the port is bound, behind the liveness and readiness probes
+startup = StartupService.get_instance()
 
-ice_servers = [
-    IceServer(
-        urls="stun:stun.l.google.com:19302",
-    )
-]
+# ICE server URLs, turned into IceServer objects by SmallWebRTCConnection
+ice_servers = ["stun:stun.l.google.com:19302"]
 
 
-def cleanup():
-    """Cleanup function to cancel all bot tasks.
+def import_session_modules():
+    """Import the agent, pipecat and provider modules a session needs (runs in a thread)."""
+    import services.agent_service  # noqa: F401
+    import services.memory_queue_service  # noqa: F401
+    import services.providers_service  # noqa: F401
 
-    Called during server shutdown.
-    """
-    for task_id, task in bot_tasks.items():
-        if not task.done():
-            task.cancel()
-        logger.info(f"Cancelled bot task {task_id}")
+    if USE_DAILY:
+        import pipecat.transports.services.daily  # noqa: F401
+        import pipecat.transports.services.helpers.daily_rest  # noqa: F401
+    else:
+        import pipecat.transports.network.small_webrtc  # noqa: F401
+
+
+async def warm_up_agents():
+    """Wait for the pooled agents, or prepare one when the pool is off, to load the providers and the VAD model."""
+    if agent_pool.size > 0:
+        await agent_pool.wait_filled()
+        return
+    from services.agent_service import AgentService
+
+    await asyncio.to_thread(AgentService().prepare)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """FastAPI lifespan manager that handles startup and shutdown tasks.
 
-    - Creates aiohttp session
+    Before the port is bound:
+    - Creates the shared keep-alive HTTP sessions (also used by the provider clients)
+    - Loads the JWT secret
+    - Starts the session reaper
+
+    Then, in the background (the server is live but not ready meanwhile):
+    - Imports pipecat and the provider modules
+    - Starts the memory consolidation workers
+    - Queues the transcripts of sessions a crash cut short, then starts the transcript journal
     - Initializes Daily API helper (if USE_DAILY is true)
-    - Cleans up resources on shutdown
+    - Fills the agent pool
+
+    Cleans up resources on shutdown.
     """
-    aiohttp_session = aiohttp.ClientSession()
+    connection_pool = ConnectionPoolService.get_instance()
+    aiohttp_session = await connection_pool.start()
+    TokenService.load_secret_key()
+    await sessions.start()
+
+    async def start_memory_queue():
+        from services.memory_queue_service import MemoryQueueService
+
+        await MemoryQueueService.get_instance().start()
+
+    async def start_journal():
+        from services.memory_queue_service import MemoryQueueService
+
+        journal = TranscriptJournalService.get_instance()
+        await journal.recover(MemoryQueueService.get_instance().enqueue)
+        await journal.start()
+
+    async def start_daily():
+        from pipecat.transports.services.helpers.daily_rest import DailyRESTHelper
 
-    # Initialize Daily API helper only if USE_DAILY is true
-    if USE_DAILY:
         daily_helpers["rest"] = DailyRESTHelper(
             daily_api_key=os.getenv("DAILY_API_KEY", ""),
             daily_api_url=os.getenv("DAILY_API_URL", "https://api.daily.co/v1"),
             aiohttp_session=aiohttp_session,
         )
 
+    async def start_agent_pool():
+        await agent_pool.start()
+        await warm_up_agents()
+
+    startup.start(
+        [
+            ("imports", lambda: asyncio.to_thread(import_session_modules)),
+            ("memory_queue", start_memory_queue),
+            *([("journal", start_journal)] if TranscriptJournalService.enabled() else []),
+            *([("daily", start_daily)] if USE_DAILY else []),
+            ("agent_pool", start_agent_pool),
+        ]
+    )
+
     yield
-    await aiohttp_session.close()
-    coros = [pc.disconnect() for pc in pcs_map.values()]
+    await startup.stop()
+    await agent_pool.stop()
+    await connection_pool.stop()
+    await UserRepository.close()
+    coros = [pc.disconnect() for pc in sessions.connections("webrtc")]
     await asyncio.gather(*coros)
-    pcs_map.clear()
-    cleanup()
+    await sessions.stop()
+    if "journal" in startup.steps:
+        await TranscriptJournalService.get_instance().stop()
+    if "memory_queue" in startup.steps:
+        from services.memory_queue_service import MemoryQueueService
+
+        await MemoryQueueService.get_instance().stop()
 
 
 # Initialize FastAPI app with lifespan manager
@@ -108,9 +156,44 @@ app = FastAPI(lifespan=lifespan)
 
 @app.get("/health")
 def read_root():
+    """Liveness probe: answers as soon as the port is bound, fails if the warm-up failed."""
+    if not startup.live:
+        return JSONResponse(status_code=503, content=startup.stats())
     return "Working!"
 
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics, including the per-turn latency breakdown."""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
+@app.get("/ready")
+async def readiness():
+    """Readiness probe for the load balancer.
+
+    Returns 200 with the free session capacity, or 503 while the node warms
+    up or when it is full.
+    """
+    status = sessions.readiness()
+    if not startup.ready:
+        status = {
+            **status,
+            "ready": False,
+            "free_capacity": 0,
+            "warming_up": startup.live,
+            "live": startup.live,
+        }
+    if not status["ready"]:
+        return JSONResponse(
+            status_code=503,
+            content=status,
+            headers={"Retry-After": str(sessions.retry_after)},
+        )
+    return status
+
+
 # Configure CORS to allow requests from any origin
 app.add_middleware(
     CORSMiddleware,
@@ -136,6 +219,8 @@ async def create_room_and_token() -> tuple[str, str]:
             detail="Daily feature is not enabled. Set USE_DAILY=true to enable it.",
         )
 
+    from pipecat.transports.services.helpers.daily_rest import DailyRoomParams
+
     room = await daily_helpers["rest"].create_room(DailyRoomParams())
     if not room.url:
         raise HTTPException(status_code=500, detail="Failed to create room")
@@ -149,8 +234,24 @@ async def create_room_and_token() -> tuple[str, str]:
     return room.url, token
 
 
+def reject_if_full():
+    """Raise 503 with Retry-After when the node cannot take another session."""
+    if not startup.ready:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is warming up, please retry shortly",
+            headers={"Retry-After": str(sessions.retry_after)},
+        )
+    if not sessions.has_capacity():
+        raise HTTPException(
+            status_code=503,
+            detail="Server is at capacity, please retry shortly",
+            headers={"Retry-After": str(sessions.retry_after)},
+        )
+
+
 async def run_webrtc_agent_service(
-    webrtc_connection: SmallWebRTCConnection, user_info: UserInfo = None
+    webrtc_connection: "SmallWebRTCConnection", user_info: UserInfo = None
 ):
     """Run the agent service for a specific room.
 
@@ -158,14 +259,19 @@ async def run_webrtc_agent_service(
         webrtc_connection: The SmallWebRTCConnection instance
         user_info: Optional user information for personalization
     """
+    from services.providers_service import ProvidersService
+
     try:
         # Get default agent configuration
 
-        # Create and run the agent service
-        agent = AgentService(
-            user_info=user_info,
+        # Claim a prepared agent and bind it to the connection
+        agent = await agent_pool.claim()
+        agent.on_activity = lambda: sessions.touch(webrtc_connection.pc_id)
+        transport = ProvidersService.get_small_webrtc_transport(
+            webrtc_connection,
+            vad_analyzer=agent.vad_analyzer,
+            audio=agent.agent_config.audio,
         )
-        transport = ProvidersService.get_small_webrtc_transport(webrtc_connection)
         await agent.initialize(transport, user_info)
         await agent.run()
 
@@ -188,63 +294,80 @@ async def run_agent_service(room_url: str, token: str, user_info: UserInfo = Non
             detail="Daily feature is not enabled. Set USE_DAILY=true to enable it.",
         )
 
+    from services.providers_service import ProvidersService
+
     try:
         # Get default agent configuration
 
-        # Create and run the agent service
-        agent = AgentService(
-            user_info=user_info,
+        # Claim a prepared agent and bind it to the room
+        agent = await agent_pool.claim()
+        agent.on_activity = lambda: sessions.touch(f"{room_url}_{token}")
+        transport = ProvidersService.get_daily_transport(
+            room_url,
+            token,
+            vad_analyzer=agent.vad_analyzer,
+            audio=agent.agent_config.audio,
         )
-        transport = ProvidersService.get_daily_transport(room_url, token)
         await agent.initialize(transport, user_info)
         await agent.run()
 
     except Exception as e:
         logger.error(f"Error running agent service: {e}")
         raise
-    finally:
-        # Clean up the task from tracking
-        task_id = f"{room_url}_{token}"
-        if task_id in bot_tasks:
-            del bot_tasks[task_id]
 
 
-@app.post("/connect")
-async def bot_connect(request: Request) -> Dict[Any, Any]:
-    """Connect endpoint that creates a room and returns connection credentials.
+def verify_request_token(request: Request) -> dict:
+    """Verify the token query parameter of a session request. Returns the JWT payload."""
+    token = request.query_params.get("token")
+    if not token:
+        raise HTTPException(
+            status_code=401, detail="Authorization header missing or invalid"
+        )
 
-    This endpoint is called by client to establish a connection.
+    try:
+        decoded_payload = TokenService().verify_token(token)
+        logger.info(f"Token verified successfully: {decoded_payload}")
+    except InvalidTokenError as e:
+        raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
+    return decoded_payload
 
-    Returns:
-        Dict[Any, Any]: Authentication bundle containing room_url and token
 
-    Raises:
-        HTTPException: If room creation, token generation, or bot startup fails
+async def load_user(user_id: str) -> Optional[UserInfo]:
+    try:
+        user_info = await UserRepository().get_user(user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load user: {e}")
+    logger.debug(f"Loaded user {user_id}")
+    return user_info
+
+
+def require_front(request: Request):
+    """Only let the front process call the worker endpoints (see front.py).
+
+    The front process shares WORKER_SECRET with its workers and sends it
+    with every request; without it set, the worker endpoints are closed.
     """
-    if not USE_DAILY:
-        raise HTTPException(
-            status_code=500,
-            detail="Daily feature is not enabled. Set USE_DAILY=true to enable it.",
-        )
+    secret = os.getenv("WORKER_SECRET")
+    if not secret or not hmac.compare_digest(
+        request.headers.get("X-Worker-Secret", ""), secret
+    ):
+        raise HTTPException(status_code=403, detail="Only the front process may call this endpoint")
+
 
-    # Initialize TokenService
-    token_service = TokenService()
+def session_user(data: dict) -> Tuple[str, Optional[UserInfo]]:
+    """User id and UserInfo the front process resolved for a session."""
+    user_info = data.get("user_info")
+    return data.get("user_id"), UserInfo.model_validate(user_info) if user_info else None
 
-    # Extract and verify the Authorization token
-    auth_header = request.query_params.get("token")
 
-    if not auth_header:
+async def start_daily_session(user_id: str, user_info: Optional[UserInfo]) -> Dict[str, str]:
+    """Create a Daily room and start an agent in it for an authenticated user."""
+    if not USE_DAILY:
         raise HTTPException(
-            status_code=401, detail="Authorization header missing or invalid"
+            status_code=500,
+            detail="Daily feature is not enabled. Set USE_DAILY=true to enable it.",
         )
 
-    token = auth_header
-    try:
-        decoded_payload = token_service.verify_token(token)
-        logger.info(f"Token verified successfully: {decoded_payload}")
-    except InvalidTokenError as e:
-        raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
-
     logger.info("Creating room for RTVI connection")
     room_url, token = await create_room_and_token()
     logger.info(f"Room URL: {room_url}")
@@ -252,13 +375,16 @@ async def bot_connect(request: Request) -> Dict[Any, Any]:
     # Start the agent service as an asyncio task
     try:
         task_id = f"{room_url}_{token}"
-        user_data = UserRepository().get_user_info(decoded_payload.get("sub"))
-        print(f"User info: {user_data}")
-
-        user_info = UserInfo(**user_data)
+        sessions.register(task_id, "daily", user_id)
         task = asyncio.create_task(run_agent_service(room_url, token, user_info))
-        bot_tasks[task_id] = task
+        sessions.attach_task(task_id, task)
         logger.info(f"Started agent service task {task_id}")
+    except CapacityError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(sessions.retry_after)},
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to start agent service: {e}"
@@ -268,6 +394,36 @@ async def bot_connect(request: Request) -> Dict[Any, Any]:
     return {"room_url": room_url, "token": token}
 
 
+@app.post("/connect")
+async def bot_connect(request: Request) -> Dict[Any, Any]:
+    """Connect endpoint that creates a room and returns connection credentials.
+
+    This endpoint is called by client to establish a connection.
+
+    Returns:
+        Dict[Any, Any]: Authentication bundle containing room_url and token
+
+    Raises:
+        HTTPException: If room creation, token generation, or bot startup fails
+    """
+    if not USE_DAILY:
+        raise HTTPException(
+            status_code=500,
+            detail="Daily feature is not enabled. Set USE_DAILY=true to enable it.",
+        )
+
+    reject_if_full()
+    user_id = verify_request_token(request).get("sub")
+    return await start_daily_session(user_id, await load_user(user_id))
+
+
+@app.post("/worker/connect", dependencies=[Depends(require_front)])
+async def worker_connect(request: Request) -> Dict[Any, Any]:
+    """/connect for a user the front process authenticated and loaded."""
+    reject_if_full()
+    return await start_daily_session(*session_user(await request.json()))
+
+
 @app.get("/")
 async def serve_index():
     return FileResponse("index.html")
@@ -283,15 +439,11 @@ async def bot_disconnect(task_id: str) -> Dict[str, str]:
     Returns:
         Dict[str, str]: Status message
     """
-    if task_id not in bot_tasks:
+    if not sessions.cancel(task_id):
         raise HTTPException(status_code=404, detail="Task not found")
 
-    task = bot_tasks[task_id]
-    if not task.done():
-        task.cancel()
-        logger.info(f"Cancelled bot task {task_id}")
-
-    del bot_tasks[task_id]
+    logger.info(f"Cancelled bot task {task_id}")
+    sessions.remove(task_id)
     return {"status": "disconnected", "task_id": task_id}
 
 
@@ -302,80 +454,117 @@ async def get_status() -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: Status information
     """
-    active_tasks = []
-    completed_tasks = []
-
-    for task_id, task in bot_tasks.items():
-        if task.done():
-            completed_tasks.append(
-                {
-                    "task_id": task_id,
-                    "status": "completed",
-                    "exception": str(task.exception()) if task.exception() else None,
-                }
-            )
-        else:
-            active_tasks.append({"task_id": task_id, "status": "running"})
-
+    status = {
+        **sessions.status(),
+        "startup": startup.stats(),
+        "agent_pool": agent_pool.stats(),
+        "user_cache": UserRepository.cache_stats(),
+        "token_cache": TokenService.cache_stats(),
+        "connection_pool": ConnectionPoolService.get_instance().stats(),
+    }
+    if TranscriptJournalService.enabled():
+        status["journal"] = TranscriptJournalService.get_instance().stats()
+    if not startup.ready:
+        return status
+
+    from services.hedging_service import ProviderHealthService
+    from services.memory_queue_service import MemoryQueueService
+    from services.memory_retrieval_service import MemoryRetrievalService
+    from services.tts_cache_service import TTSCacheService
+
+    if MemoryRetrievalService.enabled():
+        status["memory_index"] = MemoryRetrievalService.get_instance().stats()
     return {
-        "active_tasks": active_tasks,
-        "completed_tasks": completed_tasks,
-        "total_tasks": len(bot_tasks),
+        **status,
+        "memory_queue": await MemoryQueueService.get_instance().stats(),
+        "tts_cache": await asyncio.to_thread(TTSCacheService.cache_stats),
+        "providers": ProviderHealthService.get_instance().stats(),
     }
 
 
+async def renegotiate(pc_id: Optional[str], data: dict) -> Optional[dict]:
+    """Renegotiate the connection of a live session. Returns the answer, None if there is no such connection."""
+    session = sessions.get(pc_id) if pc_id else None
+    if not (session and session.connection):
+        return None
+    pipecat_connection = session.connection
+    logger.info(f"Reusing existing connection for pc_id: {pc_id}")
+    sessions.touch(pc_id)
+    await pipecat_connection.renegotiate(sdp=data["sdp"], type=data["type"])
+    return pipecat_connection.get_answer()
+
+
+async def start_webrtc_session(data: dict, user_id: str, user_info: Optional[UserInfo]) -> dict:
+    """Accept a WebRTC offer and start an agent on the connection for an authenticated user."""
+    from pipecat.transports.network.webrtc_connection import SmallWebRTCConnection
+
+    pipecat_connection = SmallWebRTCConnection(ice_servers)
+    await pipecat_connection.initialize(sdp=data["sdp"], type=data["type"])
+
+    @pipecat_connection.event_handler("closed")
+    async def handle_disconnected(webrtc_connection: SmallWebRTCConnection):
+        logger.info(
+            f"Discarding peer connection for pc_id: {webrtc_connection.pc_id}"
+        )
+        session = sessions.get(webrtc_connection.pc_id)
+        if session:
+            session.connection = None
+
+    try:
+        sessions.register(
+            pipecat_connection.pc_id,
+            "webrtc",
+            user_id,
+            connection=pipecat_connection,
+        )
+    except CapacityError as e:
+        await pipecat_connection.disconnect()
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(sessions.retry_after)},
+        )
+    task = asyncio.create_task(
+        run_webrtc_agent_service(
+            webrtc_connection=pipecat_connection, user_info=user_info
+        )
+    )
+    sessions.attach_task(pipecat_connection.pc_id, task)
+
+    return pipecat_connection.get_answer()
+
+
 @app.post("/api/offer")
 async def offer(request: Request, background_tasks: BackgroundTasks):
     data = await request.json()
-    pc_id = data.get("pc_id")
 
-    if pc_id and pc_id in pcs_map:
-        pipecat_connection = pcs_map[pc_id]
-        logger.info(f"Reusing existing connection for pc_id: {pc_id}")
-        await pipecat_connection.renegotiate(sdp=request["sdp"], type=request["type"])
-    else:
-        # Initialize TokenService
-        token_service = TokenService()
-
-        # Extract and verify the Authorization token
-        auth_header = request.query_params.get("token")
-
-        if not auth_header:
-            raise HTTPException(
-                status_code=401, detail="Authorization header missing or invalid"
-            )
-
-        token = auth_header
-        try:
-            decoded_payload = token_service.verify_token(token)
-            logger.info(f"Token verified successfully: {decoded_payload}")
-        except InvalidTokenError as e:
-            raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
-
-        pipecat_connection = SmallWebRTCConnection(ice_servers)
-        await pipecat_connection.initialize(sdp=data["sdp"], type=data["type"])
-
-        @pipecat_connection.event_handler("closed")
-        async def handle_disconnected(webrtc_connection: SmallWebRTCConnection):
-            logger.info(
-                f"Discarding peer connection for pc_id: {webrtc_connection.pc_id}"
-            )
-            pcs_map.pop(webrtc_connection.pc_id, None)
-
-        user_data = UserRepository().get_user_info(decoded_payload.get("sub"))
-        user_info = UserInfo(**user_data)
-        task = asyncio.create_task(
-            run_webrtc_agent_service(
-                webrtc_connection=pipecat_connection, user_info=user_info
-            )
-        )
-        background_tasks.add_task(task)
+    answer = await renegotiate(data.get("pc_id"), data)
+    if answer:
+        return answer
+
+    reject_if_full()
+    user_id = verify_request_token(request).get("sub")
+    return await start_webrtc_session(data, user_id, await load_user(user_id))
 
-    answer = pipecat_connection.get_answer()
-    # Updating the peer connection inside the map
-    pcs_map[answer["pc_id"]] = pipecat_connection
 
-    return answer
+@app.post("/worker/offer", dependencies=[Depends(require_front)])
+async def worker_offer(request: Request):
+    """
+    /api/offer for an offer the front process accepted.
+
+    New sessions come with the user the front process authenticated and
+    loaded. A renegotiation of a connection this worker no longer holds
+    answers 404, so the front process can start a new session instead.
+    """
+    data = await request.json()
+    if data.get("pc_id"):
+        answer = await renegotiate(data["pc_id"], data)
+        if not answer:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return answer
+
+    reject_if_full()
+    return await start_webrtc_session(data, *session_user(data))
 
 
 if __name__ == "__main__":
@@ -389,9 +578,21 @@ if __name__ == "__main__":
     parser.add_argument("--host", type=str, default=default_host, help="Host address")
     parser.add_argument("--port", type=int, default=default_port, help="Port number")
     parser.add_argument("--reload", action="store_true", help="Reload code on change")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("SERVER_WORKERS", "1")),
+        help="Worker processes behind a front process (see front.py)",
+    )
 
     config = parser.parse_args()
 
+    if config.workers > 1:
+        from front import serve
+
+        serve(config.host, config.port, config.workers)
+        raise SystemExit(0)
+
     # Start the FastAPI server
     import uvicorn
 
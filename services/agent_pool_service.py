@@ -0,0 +1,172 @@
+import asyncio
+import os
+import time
+from enum import Enum
+from typing import TYPE_CHECKING, List, Optional
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    # Imported on the first build, it pulls in pipecat and the provider SDKs
+    from services.agent_service import AgentService
+
+
+class RefillPolicy(str, Enum):
+    eager = "eager"  # rebuild right after every claim
+    idle = "idle"  # rebuild once no claim happened for `refill_delay` seconds
+    none = "none"  # never rebuild, the pool drains and falls back to cold starts
+
+
+class AgentPoolService:
+    """Pool of pre-built AgentService instances.
+
+    Building an agent (provider services, VAD model, context aggregator) takes
+    seconds. The pool does that work ahead of time so a new session only has
+    to bind the transport and the user, which is fast.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        refill_policy: Optional[RefillPolicy] = None,
+        refill_delay: Optional[float] = None,
+        max_age: Optional[float] = None,
+    ):
+        """
+        Initialize the pool. Unset arguments are read from the environment.
+
+        Args:
+            size (int): Number of prepared agents to keep around (AGENT_POOL_SIZE).
+            refill_policy (RefillPolicy): When to rebuild claimed agents (AGENT_POOL_REFILL).
+            refill_delay (float): Quiet period in seconds for the idle policy (AGENT_POOL_REFILL_DELAY).
+            max_age (float): Seconds after which a prepared agent is rebuilt (AGENT_POOL_MAX_AGE).
+        """
+        self.size = (
+            size if size is not None else int(os.getenv("AGENT_POOL_SIZE", "2"))
+        )
+        self.refill_policy = RefillPolicy(
+            refill_policy or os.getenv("AGENT_POOL_REFILL", RefillPolicy.eager.value)
+        )
+        self.refill_delay = (
+            refill_delay
+            if refill_delay is not None
+            else float(os.getenv("AGENT_POOL_REFILL_DELAY", "5"))
+        )
+        self.max_age = (
+            max_age
+            if max_age is not None
+            else float(os.getenv("AGENT_POOL_MAX_AGE", "600"))
+        )
+
+        # Ready agents with the time they were prepared, oldest first
+        self._ready: List[tuple[float, "AgentService"]] = []
+        self._building = 0
+        self._last_claim = 0.0
+        self._refill_task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._filled = asyncio.Event()
+        self.hits = 0
+        self.misses = 0
+
+    async def start(self):
+        """Start the background refill loop and fill the pool."""
+        if self.size <= 0:
+            logger.info("Agent pool disabled")
+            return
+        self._refill_task = asyncio.create_task(self._refill_loop())
+        self._wakeup.set()
+
+    async def stop(self):
+        """Stop refilling and drop all prepared agents."""
+        if self._refill_task:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+        self._ready.clear()
+
+    async def wait_filled(self):
+        """Wait for the initial fill, returns right away when the pool is disabled."""
+        if self._refill_task:
+            await self._filled.wait()
+
+    async def claim(self) -> "AgentService":
+        """Return a prepared agent, building one on the spot if the pool is empty."""
+        self._last_claim = time.monotonic()
+        now = time.monotonic()
+        while self._ready:
+            prepared_at, agent = self._ready.pop(0)
+            if now - prepared_at <= self.max_age:
+                self.hits += 1
+                self._wakeup.set()
+                return agent
+
+        self.misses += 1
+        self._wakeup.set()
+        logger.info("Agent pool empty, preparing agent on demand")
+        return await self._build()
+
+    def stats(self) -> dict:
+        """Return the current pool state."""
+        return {
+            "size": self.size,
+            "ready": len(self._ready),
+            "building": self._building,
+            "refill_policy": self.refill_policy.value,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    async def _build(self) -> "AgentService":
+        """Prepare an agent off the event loop."""
+        from services.agent_service import AgentService
+
+        agent = AgentService()
+        await asyncio.to_thread(agent.prepare)
+        return agent
+
+    async def _refill_loop(self):
+        """Keep the pool at its target size according to the refill policy."""
+        initial_fill = True
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.max_age)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            # Drop agents that sat in the pool for too long
+            now = time.monotonic()
+            self._ready = [
+                (prepared_at, agent)
+                for prepared_at, agent in self._ready
+                if now - prepared_at <= self.max_age
+            ]
+
+            if not initial_fill:
+                if self.refill_policy == RefillPolicy.none:
+                    continue
+                if self.refill_policy == RefillPolicy.idle:
+                    # Wait until claims have been quiet for refill_delay seconds
+                    while time.monotonic() - self._last_claim < self.refill_delay:
+                        await asyncio.sleep(
+                            self.refill_delay - (time.monotonic() - self._last_claim)
+                        )
+
+            while len(self._ready) + self._building < self.size:
+                self._building += 1
+                try:
+                    agent = await self._build()
+                except Exception as e:
+                    logger.error(f"Failed to prepare pooled agent: {e}")
+                    await asyncio.sleep(self.refill_delay)
+                    break
+                finally:
+                    self._building -= 1
+                self._ready.append((time.monotonic(), agent))
+
+            initial_fill = False
+            self._filled.set()
+            logger.info(f"Agent pool ready: {len(self._ready)}/{self.size}")
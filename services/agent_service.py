@@ -1,43 +1,65 @@
 import asyncio
 import os
+import uuid
 from typing import Optional, Union
 
 import aiohttp
 from loguru import logger
-from pipecat.audio.vad.silero import SileroVADAnalyzer
 from pipecat.frames.frames import Frame, TTSSpeakFrame
 from pipecat.pipeline.pipeline import Pipeline
 from pipecat.pipeline.runner import PipelineRunner
 from pipecat.pipeline.task import PipelineParams, PipelineTask
 from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext
 from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
-from pipecat.services.google.llm import GoogleLLMService, LLMSearchResponseFrame
-from pipecat.transports.base_transport import TransportParams
-from pipecat.transports.network.small_webrtc import SmallWebRTCTransport
-import platform
-# Import Daily and RTVI modules conditionally
+from pipecat.processors.transcript_processor import TranscriptProcessor
+
+# Daily and RTVI modules are imported on first use, and only with USE_DAILY
 USE_DAILY = os.getenv("USE_DAILY", "").lower() == "true"
-if USE_DAILY:
-    from pipecat.processors.frameworks.rtvi import RTVIConfig, RTVIProcessor
-    from pipecat.services.google.rtvi import GoogleRTVIObserver
-    from pipecat.transports.services.daily import DailyParams, DailyTransport
 
 from models.agent_model import AgentModel, LLMProvider, STTProvider, TTSProvider
 from models.user import UserInfo
-from repositories.user_repository import UserRepository
+from services.connection_pool_service import ConnectionPoolService
+from services.context_window_service import ContextWindowProcessor
+from services.greeting_service import GreetingService
+from services.latency_observer_service import TurnLatencyObserver
+from services.memory_queue_service import MemoryQueueService
+from services.memory_retrieval_service import (
+    MemoryRetrievalProcessor,
+    MemoryRetrievalService,
+    is_memory_message,
+)
+from services.prompt_cache_service import prompt_cache_key
 from services.prompt_service import PromptService, PromptType
+from services.rolling_memory_service import RollingMemoryConsolidator
+from services.speculative_llm_service import SpeculativeLLMProcessor
+from services.transcript_journal_service import TranscriptJournalService
 from services.providers_service import Providers, ProvidersService
-from services.user_memory_service import UserMemoryService
 from utils.constants import get_default_agent_model
 
 
+def is_daily_transport(transport) -> bool:
+    """True for a DailyTransport, without importing Daily when it is disabled."""
+    if not USE_DAILY:
+        return False
+    from pipecat.transports.services.daily import DailyTransport
+
+    return isinstance(transport, DailyTransport)
+
+
 class LLMSearchLoggerProcessor(FrameProcessor):
-    """Processor to log LLM search responses."""
+    """Processor to log LLM search responses (Gemini grounding)."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Importing it loads every Google service, so only sessions using Gemini do
+        from pipecat.services.google.frames import LLMSearchResponseFrame
+
+        self._search_frame = LLMSearchResponseFrame
 
     async def process_frame(self, frame: Frame, direction: FrameDirection):
         await super().process_frame(frame, direction)
 
-        if isinstance(frame, LLMSearchResponseFrame):
+        if isinstance(frame, self._search_frame):
             logger.info(f"LLM Search Response: {frame}")
 
         await self.push_frame(frame)
@@ -52,71 +74,170 @@ class AgentService:
     ):
 
         self.user_info = user_info
+        self.session_id = uuid.uuid4().hex
+        # Called whenever a turn finishes, e.g. to keep the session from being reaped as idle
+        self.on_activity = None
+        self._memory_queued = False
+        # Opening line, personalized when one was prepared for the user's memory
+        self.greeting: Optional[str] = None
+        self.context_window: Optional[ContextWindowProcessor] = None
+        self.journal: Optional[TranscriptJournalService] = None
         self.task: Optional[PipelineTask] = None
         self.runner: Optional[PipelineRunner] = None
+        self.prepared = False
+        self._warm_up_task: Optional[asyncio.Task] = None
 
-    async def initialize(self, transport, user_info: Optional[UserInfo] = None):
-        """Initialize the agent with all necessary components."""
-        logger.info("Initializing Comfortly Agent...")
-
-        # Create transport
+    def prepare(self):
+        """Build the transport-independent parts of the agent.
 
-        # Create services
+        This creates the STT/TTS/LLM services, the VAD analyzer and the
+        context aggregator. It does not depend on the user or the transport,
+        so it can run ahead of time (see AgentPoolService).
+        """
         # Use the default prompt type for now, can be customized based on user_info later
         self.prompt = PromptService.SYSTEM_PROMPTS[PromptType.DEFAULT]
 
         default_config = get_default_agent_model(prompt=self.prompt)
         self.agent_config = default_config
 
-        stt = ProvidersService.get_stt_service(
+        self.stt = ProvidersService.get_stt_service(
             provider=default_config.stt.provider,
             model_id=default_config.stt.model_id,
             language=default_config.stt.language,
             alternative_languages=default_config.stt.alternative_languages,
+            sample_rate=default_config.audio.in_sample_rate,
+            audio_passthrough=default_config.audio.stt_passthrough,
         )
-        tts = ProvidersService.get_tts_service(
+        self.tts = ProvidersService.get_tts_service(
             provider=default_config.tts.provider,
             model_id=default_config.tts.model_id,
             voice_id=default_config.tts.voice_id,
             voice_instructions=default_config.tts.voice_instructions,
+            cached_phrases=[default_config.first_message],
+            sample_rate=default_config.audio.out_sample_rate,
         )
-        llm = ProvidersService.get_llm_service(
+        self.llm = ProvidersService.get_llm_service(
             provider=default_config.llm.provider,
             model_id=default_config.llm.model_id,
             temperature=default_config.llm.temperature,
             max_tokens=default_config.llm.max_tokens,
+            cached_prefix=self.prompt,
+            prompt_cache_key=prompt_cache_key(PromptType.DEFAULT.value),
         )
+        self.vad_analyzer = ProvidersService.get_vad_analyzer()
+
         # Create context with system prompt
         system_prompt = self.prompt
         context = ProvidersService.create_context(
             default_config.llm.provider,
             OpenAILLMContext([{"role": "system", "content": system_prompt}]),
         )
-        context_aggregator = llm.create_context_aggregator(context)
+        context_aggregator = self.llm.create_context_aggregator(context)
         self.context = context
         self.context_aggregator = context_aggregator
+        self.prepared = True
+
+    async def initialize(self, transport, user_info: Optional[UserInfo] = None):
+        """Initialize the agent with all necessary components.
+
+        If the agent was not prepared ahead of time it is prepared here.
+        """
+        logger.info("Initializing Comfortly Agent...")
+
+        if user_info:
+            self.user_info = user_info
+
+        if not self.prepared:
+            self.prepare()
+
+        # Open the provider connections while the transport is connecting
+        if os.getenv("CONNECTION_WARMUP_ENABLED", "true").lower() == "true":
+            self._warm_up_task = asyncio.create_task(
+                ConnectionPoolService.get_instance().warm_up(self.llm, self.tts)
+            )
+        try:
+            await self._build_pipeline(transport)
+        except BaseException:
+            self._cancel_warm_up()
+            raise
+
+        logger.info("Agent initialized successfully")
+
+    def _cancel_warm_up(self):
+        if self._warm_up_task and not self._warm_up_task.done():
+            self._warm_up_task.cancel()
+        self._warm_up_task = None
+
+    async def _build_pipeline(self, transport):
+        """Create the processors, pipeline, task and runner of the session."""
+        self.greeting = self.agent_config.first_message
+        if self.user_info:
+            try:
+                self.greeting = (
+                    await GreetingService.get_instance().get_greeting(
+                        self.user_info.id, self.user_info.context
+                    )
+                    or self.greeting
+                )
+            except Exception as e:
+                logger.warning(f"Failed to load personalized greeting: {e}")
+
+        stt, tts, llm = self.stt, self.tts, self.llm
+        context_aggregator = self.context_aggregator
 
         # Create processors
-        llm_search_logger = LLMSearchLoggerProcessor()
+        llm_search_logger = None
+        if self.agent_config.llm.provider == LLMProvider.google:
+            llm_search_logger = LLMSearchLoggerProcessor()
+        transcript = TranscriptProcessor()
+        self._setup_transcript_handlers(transcript)
+
+        # Bound the context sent to the LLM for long calls
+        self.context_window = None
+        if os.getenv("LLM_CONTEXT_WINDOW_ENABLED", "true").lower() == "true":
+            self.context_window = ContextWindowProcessor()
+
+        # Inject the facts of the user's memory relevant to each turn
+        memory_retrieval = None
+        if self.user_info and self.user_info.context and MemoryRetrievalService.enabled():
+            try:
+                store = await MemoryRetrievalService.get_instance().get_store(
+                    self.user_info.id, self.user_info.context
+                )
+                memory_retrieval = MemoryRetrievalProcessor(store)
+            except Exception as e:
+                logger.warning(f"Failed to load the memory index: {e}")
+
+        # Start the reply on stable interim transcripts, before the turn ends
+        speculation = None
+        if os.getenv("LLM_SPECULATION_ENABLED", "false").lower() == "true":
+            speculation = SpeculativeLLMProcessor(
+                llm,
+                self.context,
+                prepare_context=memory_retrieval.inject if memory_retrieval else None,
+            )
 
         # Initialize pipeline components
         pipeline_components = [
             transport.input(),
             stt,
+            transcript.user(),
+            *([speculation] if speculation else []),
             context_aggregator.user(),
+            *([self.context_window] if self.context_window else []),
+            *([memory_retrieval] if memory_retrieval else []),
             llm,
-            llm_search_logger,
+            *([llm_search_logger] if llm_search_logger else []),
             tts,
             transport.output(),
+            transcript.assistant(),
             context_aggregator.assistant(),
         ]
 
         rtvi = None
-        if (
-            USE_DAILY
-            and "DailyTransport" in globals()
-            and isinstance(transport, DailyTransport)
-        ):
+        if is_daily_transport(transport):
+            from pipecat.processors.frameworks.rtvi import RTVIConfig, RTVIProcessor
+
             rtvi = RTVIProcessor(config=RTVIConfig(config=[]))
             # Insert rtvi after stt in the pipeline components
             pipeline_components.insert(2, rtvi)
@@ -128,13 +249,26 @@ class AgentService:
         self.pipeline = pipeline
 
         # Create task with appropriate observers based on configuration
-        observers = []
+        observers = [
+            TurnLatencyObserver(
+                self.agent_config,
+                transport.input(),
+                stt,
+                llm,
+                tts,
+                transport.output(),
+            )
+        ]
         if USE_DAILY and rtvi and self.agent_config.llm.provider == LLMProvider.google:
-            observers = [GoogleRTVIObserver(rtvi)]
+            from pipecat.services.google.rtvi import GoogleRTVIObserver
+
+            observers.append(GoogleRTVIObserver(rtvi))
 
         self.task = PipelineTask(
             self.pipeline,
             params=PipelineParams(
+                audio_in_sample_rate=self.agent_config.audio.in_sample_rate,
+                audio_out_sample_rate=self.agent_config.audio.out_sample_rate,
                 enable_metrics=True,
                 enable_usage_metrics=True,
             ),
@@ -149,8 +283,6 @@ class AgentService:
             handle_sigint=False
         )
 
-        logger.info("Agent initialized successfully")
-
     def _setup_event_handlers(
         self,
         transport,
@@ -158,18 +290,13 @@ class AgentService:
     ):
         """Set up event handlers for the agent."""
         # Check if we're using Daily transport and if it's available
-        if (
-            USE_DAILY
-            and "DailyTransport" in globals()
-            and isinstance(transport, DailyTransport)
-            and rtvi
-        ):
+        if is_daily_transport(transport) and rtvi:
             # Set up Daily-specific event handlers
             @rtvi.event_handler("on_client_ready")
             async def on_client_ready(rtvi):
                 await rtvi.set_bot_ready()
                 await self.task.queue_frames(
-                    [TTSSpeakFrame(text=self.agent_config.first_message)]
+                    [TTSSpeakFrame(text=self.greeting)]
                 )
                 logger.info("Client ready, conversation started")
 
@@ -184,41 +311,96 @@ class AgentService:
                 logger.info(
                     f"Participant left: {participant.get('id', 'unknown')}, reason: {reason}"
                 )
-                messages = self.context.get_messages_for_persistent_storage()
-                user_mem_service = UserMemoryService()
-                memory = user_mem_service.create_user_memory(
-                    messages, self.user_info.context
-                )
-                UserRepository().update_user_context(
-                    userId=self.user_info.id, updatedContext=memory
-                )
+                await self._queue_memory_consolidation()
                 await self.task.cancel()
 
         else:
             print("Using SmallWebRTCTransport or no Daily transport available")
             # Set up WebRTC event handlers
-            @transport.event_handler("on_client_ready")
-            async def on_client_ready(rtvi):
+            # SmallWebRTCTransport only emits on_client_connected/on_client_disconnected
+            @transport.event_handler("on_client_connected")
+            async def on_client_connected(transport, webrtc_connection):
                 await self.task.queue_frames(
                     [self.context_aggregator.user().get_context_frame()]
                 )
                 await self.task.queue_frames(
-                    [TTSSpeakFrame(text=self.agent_config.first_message)]
+                    [TTSSpeakFrame(text=self.greeting)]
                 )
                 logger.info("Client ready, conversation started")
 
-            @transport.event_handler("on_disconnected")
-            async def on_disconnected(transport, reason):
-                logger.info(f"Transport disconnected: {reason}")
-                messages = self.context.get_messages_for_persistent_storage()
-                user_mem_service = UserMemoryService()
-                memory = user_mem_service.create_user_memory(
-                    messages, self.user_info.context
+            @transport.event_handler("on_client_disconnected")
+            async def on_disconnected(transport, webrtc_connection):
+                logger.info(f"Transport disconnected: {webrtc_connection.pc_id}")
+                await self._queue_memory_consolidation()
+                await self.task.cancel()
+
+    def _setup_transcript_handlers(self, transcript: TranscriptProcessor):
+        """React to finalized turns: journaling, rolling memory folds and activity tracking."""
+        self.memory_consolidator = None
+        if (
+            self.user_info
+            and os.getenv("MEMORY_ROLLING_ENABLED", "true").lower() == "true"
+        ):
+            self.memory_consolidator = RollingMemoryConsolidator(self.user_info.context)
+
+        # Keeps the turns on disk until the consolidation is queued, in case the process dies first
+        self.journal = None
+        if self.user_info and TranscriptJournalService.enabled():
+            self.journal = TranscriptJournalService.get_instance()
+            self.journal.open_session(self.session_id, self.user_info.id)
+
+        @transcript.event_handler("on_transcript_update")
+        async def on_transcript_update(processor, frame):
+            if self.on_activity:
+                self.on_activity()
+            if self.journal:
+                for message in frame.messages:
+                    self.journal.append(self.session_id, message.role, message.content)
+            if self.memory_consolidator:
+                for message in frame.messages:
+                    self.memory_consolidator.add_message(message.role, message.content)
+
+    async def _queue_memory_consolidation(self):
+        """Hand the session transcript to the durable memory queue."""
+        if not self.user_info or self._memory_queued:
+            return
+        self._memory_queued = True
+        try:
+            memory_queue = MemoryQueueService.get_instance()
+            if self.memory_consolidator:
+                if not self.memory_consolidator.has_changes:
+                    self._close_journal()
+                    return
+                operations, tail = await self.memory_consolidator.finish()
+                await memory_queue.enqueue(
+                    self.user_info.id,
+                    tail,
+                    operations=operations,
+                    base_version=self.memory_consolidator.base_version,
+                    session_id=self.session_id,
+                    first_turn=self.memory_consolidator.consolidated,
                 )
-                UserRepository().update_user_context(
-                    userId=self.user_info.id, updatedContext=memory
+            else:
+                if self.context_window:
+                    messages = self.context_window.history(self.context)
+                else:
+                    messages = [
+                        m
+                        for m in self.context.get_messages_for_persistent_storage()
+                        if not is_memory_message(m)
+                    ]
+                await memory_queue.enqueue(
+                    self.user_info.id, messages, session_id=self.session_id
                 )
-                await self.task.cancel()
+            self._close_journal()
+        except Exception as e:
+            # The journal stays and is recovered on the next start
+            logger.error(f"Failed to queue memory consolidation: {e}")
+
+    def _close_journal(self):
+        if self.journal:
+            self.journal.close_session(self.session_id)
+            self.journal = None
 
     async def run(self):
         """Run the agent."""
@@ -229,14 +411,20 @@ class AgentService:
 
         try:
             await self.runner.run(self.task)
+        except asyncio.CancelledError:
+            # Cancelled by the server (idle reaper, /disconnect): keep the turns so far
+            await self._queue_memory_consolidation()
+            raise
         except Exception as e:
             logger.error(f"Error running agent: {e}")
             raise
         finally:
+            self._cancel_warm_up()
             logger.info("Agent stopped")
 
     async def stop(self):
         """Stop the agent."""
+        self._cancel_warm_up()
         if self.task:
             await self.task.cancel()
             logger.info("Agent stopped")
@@ -260,7 +448,13 @@ class AgentService:
         # Get the appropriate transport
         from services.providers_service import ProvidersService
 
-        transport = ProvidersService.get_daily_transport(room_url, token)
+        agent.prepare()
+        transport = ProvidersService.get_daily_transport(
+            room_url,
+            token,
+            vad_analyzer=agent.vad_analyzer,
+            audio=agent.agent_config.audio,
+        )
 
         await agent.initialize(transport, user_info)
         await agent.run()
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import ssl
+import time
+from typing import Optional
+
+import aiohttp
+import certifi
+import httpx
+from loguru import logger
+
+
+
+class ConnectionPoolService:
+    """
+    Per-process keep-alive HTTP sessions shared by all agent sessions.
+
+    Provider clients are normally created per session, each with its own
+    connection pool, so every session pays DNS, TCP and TLS on its first
+    request. Instead the Gemini clients share the aiohttp session created in
+    the server's lifespan and the OpenAI clients (LLM and TTS) share one
+    httpx client, both keeping idle connections open for `keepalive`
+    seconds. `warm_up` opens the connections of a session's providers ahead
+    of its first turn.
+
+    Without a running pool (benchmarks, scripts) services keep creating
+    their own clients.
+    """
+
+    _instance: Optional["ConnectionPoolService"] = None
+
+    def __init__(self, keepalive: Optional[float] = None, limit: Optional[int] = None):
+        """
+        Args:
+            keepalive (float): Seconds idle connections are kept open (HTTP_KEEPALIVE_SECONDS).
+            limit (int): Maximum connections per pool (HTTP_POOL_LIMIT).
+        """
+        self.keepalive = keepalive or float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+        self.limit = limit or int(os.getenv("HTTP_POOL_LIMIT", "100"))
+        self.aiohttp_session: Optional[aiohttp.ClientSession] = None
+        self.httpx_client: Optional[httpx.AsyncClient] = None
+        self._ssl_context: Optional[ssl.SSLContext] = None
+        self.warmups = 0
+        self.warmup_failures = 0
+        self.last_warmup_ms: Optional[float] = None
+
+    @classmethod
+    def get_instance(cls) -> "ConnectionPoolService":
+        """Return the process-wide connection pool."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    async def start(self) -> aiohttp.ClientSession:
+        """Create the shared sessions. Returns the aiohttp session."""
+        self._ssl_context = ssl.create_default_context(
+            cafile=os.getenv("SSL_CERT_FILE", certifi.where()),
+            capath=os.getenv("SSL_CERT_DIR"),
+        )
+        self.aiohttp_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.limit,
+                keepalive_timeout=self.keepalive,
+                ttl_dns_cache=300,
+            )
+        )
+        self.httpx_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.limit,
+                max_keepalive_connections=self.limit,
+                keepalive_expiry=self.keepalive,
+            ),
+            # The OpenAI SDK defaults, long enough for streamed replies
+            timeout=httpx.Timeout(timeout=600, connect=5),
+            follow_redirects=True,
+        )
+        return self.aiohttp_session
+
+    async def stop(self):
+        if self.aiohttp_session:
+            await self.aiohttp_session.close()
+            self.aiohttp_session = None
+        if self.httpx_client:
+            await self.httpx_client.aclose()
+            self.httpx_client = None
+
+    def gemini_http_options(self, http_options=None):
+        """HttpOptions for a genai.Client that uses the shared aiohttp session."""
+        if self.aiohttp_session is None:
+            return http_options
+        from google.genai.types import HttpOptions
+
+        http_options = http_options or HttpOptions()
+        # Pooled connections are keyed by SSL context too, and each client
+        # would otherwise create its own
+        async_client_args = {"ssl": self._ssl_context, **(http_options.async_client_args or {})}
+        return http_options.model_copy(
+            update={"aiohttp_client": self.aiohttp_session, "async_client_args": async_client_args}
+        )
+
+    def openai_client(self, api_key: Optional[str], base_url: Optional[str] = None):
+        """An AsyncOpenAI client on the shared httpx client, None without a pool."""
+        if self.httpx_client is None:
+            return None
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=self.httpx_client)
+
+    async def warm_up(self, *services):
+        """
+        Open the connections of a session's LLM and TTS ahead of the first turn.
+
+        Every service with a `warm_up` method (see pooled_google_service,
+        pooled_openai_service, and the hedged services, which warm up both
+        of theirs) sends a cheap metadata request, which leaves a connection
+        in the shared pool. Other services are skipped. The STT needs nothing here: the
+        Deepgram websocket is opened when the pipeline starts, while the
+        transport is still connecting, and kept alive by pipecat.
+        """
+        warmups = []
+        for service in services:
+            if hasattr(service, "warm_up"):
+                warmups.append(service.warm_up())
+            else:
+                logger.debug(f"No connection warm-up for {type(service).__name__}")
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*warmups, return_exceptions=True)
+        self.warmups += 1
+        self.last_warmup_ms = round((time.perf_counter() - start) * 1000)
+        for result in results:
+            if isinstance(result, Exception):
+                self.warmup_failures += 1
+                logger.warning(f"Connection warm-up failed: {result}")
+        logger.debug(f"Provider connections warmed up in {self.last_warmup_ms}ms")
+
+    def stats(self) -> dict:
+        return {
+            "running": self.aiohttp_session is not None,
+            "keepalive_seconds": self.keepalive,
+            "warmups": self.warmups,
+            "warmup_failures": self.warmup_failures,
+            "last_warmup_ms": self.last_warmup_ms,
+        }
@@ -0,0 +1,155 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from loguru import logger
+from pipecat.frames.frames import Frame
+from pipecat.processors.aggregators.openai_llm_context import (
+    OpenAILLMContext,
+    OpenAILLMContextFrame,
+)
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from services.memory_retrieval_service import MEMORY_HEADER
+from services.user_memory_service import UserMemoryService
+from utils.transcript import estimate_tokens, message_role, message_text
+
+SUMMARY_HEADER = "Summary of the conversation so far (older turns are not shown):"
+
+Summarizer = Callable[[List[dict], str], Awaitable[str]]
+
+
+class ContextWindowProcessor(FrameProcessor):
+    """
+    Keeps the LLM context within a token budget for the whole call.
+
+    Sits between the user context aggregator and the LLM. Once the
+    conversation exceeds `token_budget`, everything but the last `keep_turns`
+    user turns is summarized in the background. The next context sent to the
+    LLM then carries the running summary as the first message after the
+    system prompt and only the recent turns verbatim, so the prompt (and time
+    to first token) stops growing with session length. The system prompt
+    itself is never touched, which keeps it cacheable by the provider. The
+    LLM call never waits for a summary: until one is ready the full context
+    is sent.
+
+    Folded messages are kept in `archived`, `history()` returns the full
+    conversation for memory consolidation.
+    """
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        keep_turns: Optional[int] = None,
+        model: Optional[str] = None,
+        summarizer: Optional[Summarizer] = None,
+        **kwargs,
+    ):
+        """
+        Args:
+            token_budget (int): Conversation tokens that trigger a summary (LLM_CONTEXT_TOKEN_BUDGET).
+            keep_turns (int): Recent user turns always kept verbatim (LLM_CONTEXT_KEEP_TURNS).
+            model (str): Model used for summaries (LLM_CONTEXT_SUMMARY_MODEL).
+            summarizer (Summarizer): Coroutine function (messages, previous summary) -> summary.
+        """
+        super().__init__(**kwargs)
+        self.token_budget = token_budget or int(
+            os.getenv("LLM_CONTEXT_TOKEN_BUDGET", "3000")
+        )
+        self.keep_turns = keep_turns or int(os.getenv("LLM_CONTEXT_KEEP_TURNS", "6"))
+        self.model = model or os.getenv("LLM_CONTEXT_SUMMARY_MODEL", "gemini-2.5-flash")
+        self.summarizer = summarizer or self._summarize
+        self.summary = ""
+        self.archived: List[dict] = []
+        self.folds = 0
+        self._fold_task: Optional[asyncio.Task] = None
+        self._memory_service: Optional[UserMemoryService] = None
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, OpenAILLMContextFrame):
+            self._manage(frame.context)
+
+        await self.push_frame(frame, direction)
+
+    def history(self, context: OpenAILLMContext) -> List[dict]:
+        """The whole conversation, including the turns folded into the summary."""
+        return self.archived + self._split(context)[1]
+
+    @staticmethod
+    def _split(context: OpenAILLMContext) -> Tuple[Optional[str], List[dict]]:
+        """Return the system prompt and the conversation in the standard format."""
+        messages = context.get_messages_for_persistent_storage()
+        # Google contexts keep the system prompt outside of the messages
+        system = getattr(context, "system_message", None)
+        if messages and message_role(messages[0]) == "system":
+            system = messages.pop(0).get("content")
+        if messages and message_text(messages[0]).startswith(SUMMARY_HEADER):
+            messages.pop(0)
+        # Memory facts are injected again for every turn by MemoryRetrievalProcessor
+        return system, [m for m in messages if not message_text(m).startswith(MEMORY_HEADER)]
+
+    def _manage(self, context: OpenAILLMContext):
+        system, conversation = self._split(context)
+
+        if self._fold_task and self._fold_task.done():
+            result = None if self._fold_task.cancelled() else self._fold_task.result()
+            self._fold_task = None
+            if result:
+                folded, self.summary = result
+                self.archived.extend(conversation[:folded])
+                conversation = conversation[folded:]
+                self.folds += 1
+                summary = {"role": "user", "content": f"{SUMMARY_HEADER}\n{self.summary}"}
+                context.set_messages(
+                    ([{"role": "system", "content": system}] if system else [])
+                    + [summary]
+                    + conversation
+                )
+                logger.debug(
+                    f"Context window: folded {folded} messages, "
+                    f"{estimate_tokens(conversation)} conversation tokens left"
+                )
+
+        if self._fold_task or estimate_tokens(conversation) <= self.token_budget:
+            return
+        cut = self._cut_index(conversation)
+        if cut > 0:
+            self._fold_task = asyncio.create_task(
+                self._fold(conversation[:cut], self.summary)
+            )
+
+    def _cut_index(self, conversation: List[dict]) -> int:
+        """Index of the first message of the last `keep_turns` user turns."""
+        user_turns = [
+            i for i, message in enumerate(conversation) if message_role(message) == "user"
+        ]
+        if len(user_turns) <= self.keep_turns:
+            return 0
+        return user_turns[-self.keep_turns]
+
+    async def _fold(self, messages: List[dict], previous: str) -> Optional[Tuple[int, str]]:
+        try:
+            summary = await self.summarizer(messages, previous)
+            return len(messages), summary
+        except Exception as e:
+            # The messages stay in the context and are retried on the next turn
+            logger.warning(f"Context summary failed: {e}")
+            return None
+
+    async def _summarize(self, messages: List[dict], previous: str) -> str:
+        if self._memory_service is None:
+            self._memory_service = UserMemoryService()
+        return await asyncio.to_thread(
+            self._memory_service.summarize_conversation,
+            messages,
+            previous,
+            raise_errors=True,
+            model=self.model,
+        )
+
+    async def cleanup(self):
+        await super().cleanup()
+        if self._fold_task:
+            self._fold_task.cancel()
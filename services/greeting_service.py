@@ -0,0 +1,144 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from loguru import logger
+
+from models.memory import UserMemory
+from services.providers_service import ProvidersService
+from services.rolling_memory_service import memory_hash
+from services.tts_cache_service import presynthesize
+from services.user_memory_service import UserMemoryService
+from utils.constants import get_default_agent_model
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS greetings (
+    user_id TEXT PRIMARY KEY,
+    memory_hash TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+class GreetingService:
+    """
+    Personalized opening lines, prepared when a session's memory is consolidated.
+
+    The greeting is written from the user's updated memory and its audio is
+    synthesized into the TTS cache right away, so the next session can open
+    with it without waiting on the LLM or the TTS provider. Greetings are
+    keyed by user and memory version (memory_hash): once the memory changes
+    without a new greeting, sessions fall back to the default first message.
+    """
+
+    _instance: Optional["GreetingService"] = None
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Args:
+            db_path (str): SQLite file holding the greetings (GREETINGS_DB).
+        """
+        self.db_path = db_path or os.getenv("GREETINGS_DB", "data/greetings.db")
+        self.enabled = os.getenv("GREETING_PERSONALIZED", "true").lower() == "true"
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "GreetingService":
+        """Return the process-wide greeting store."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def _get(self, user_id: str, version: str) -> Optional[str]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT text FROM greetings WHERE user_id = ? AND memory_hash = ?",
+                (user_id, version),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, user_id: str, version: str, text: str):
+        with self._db_lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO greetings (user_id, memory_hash, text, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (user_id, version, text, time.time()),
+            )
+
+    async def get_greeting(self, user_id: str, memory: Optional[str]) -> Optional[str]:
+        """
+        Return the greeting prepared for this exact memory, if any.
+
+        Args:
+            user_id (str): The user starting a session.
+            memory (str): The memory the session starts with.
+
+        Returns:
+            str: The greeting, or None if none matches the memory version.
+        """
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self._get, user_id, memory_hash(memory))
+
+    async def prepare(
+        self, user_id: str, memory: str, user_name: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Write the greeting for the user's next session and cache its audio.
+
+        Args:
+            user_id (str): The user whose memory was just updated.
+            memory (str): The updated memory, as stored for the user.
+            user_name (str): The user's name, if known.
+
+        Returns:
+            str: The greeting, or None if disabled or generation failed.
+        """
+        user_memory = UserMemory.parse(memory)
+        if not self.enabled or not user_memory.facts:
+            return None
+        text = await asyncio.to_thread(
+            UserMemoryService().create_greeting, user_memory.render(), user_name
+        )
+        if not text:
+            return None
+
+        if os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true":
+            await self._presynthesize(user_id, text)
+
+        await asyncio.to_thread(self._set, user_id, memory_hash(memory), text)
+        logger.info(f"Prepared personalized greeting for user {user_id}")
+        return text
+
+    async def _presynthesize(self, user_id: str, text: str):
+        # Synthesize with the voice the sessions use, so the greeting is a cache hit
+        config = get_default_agent_model(prompt="")
+        tts_config = config.tts
+        tts = ProvidersService.get_tts_service(
+            provider=tts_config.provider,
+            model_id=tts_config.model_id,
+            voice_id=tts_config.voice_id,
+            voice_instructions=tts_config.voice_instructions,
+            sample_rate=config.audio.out_sample_rate,
+        )
+        try:
+            await presynthesize(
+                tts,
+                text,
+                provider=tts_config.provider.value,
+                model_id=tts_config.model_id,
+                voice_id=tts_config.voice_id,
+                voice_instructions=tts_config.voice_instructions,
+            )
+        except Exception as e:
+            # The greeting still works, it is just synthesized live
+            logger.warning(f"Failed to pre-synthesize the greeting for user {user_id}: {e}")
@@ -0,0 +1,596 @@
+import asyncio
+import contextvars
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from loguru import logger
+from pipecat.frames.frames import (
+    CancelFrame,
+    EndFrame,
+    ErrorFrame,
+    Frame,
+    LLMFullResponseEndFrame,
+    LLMFullResponseStartFrame,
+    LLMMessagesFrame,
+    LLMTextFrame,
+    LLMUpdateSettingsFrame,
+    MetricsFrame,
+    StartFrame,
+    TTSAudioRawFrame,
+)
+from pipecat.metrics.metrics import ProcessingMetricsData, TTFBMetricsData
+from pipecat.processors.aggregators.openai_llm_context import (
+    OpenAILLMContext,
+    OpenAILLMContextFrame,
+)
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor, FrameProcessorSetup
+from pipecat.services.llm_service import LLMService
+from pipecat.services.tts_service import TTSService
+
+from services.metrics_service import (
+    CIRCUIT_BREAKER_TRANSITIONS,
+    HEDGE_EVENTS,
+    PROVIDER_FIRST_RESPONSE_SECONDS,
+)
+from utils.transcript import message_role, message_text
+
+Item = Tuple[Frame, FrameDirection]
+Producer = Callable[["Attempt"], Awaitable[None]]
+
+# Set inside an attempt, whose frames the children push to their collector
+_current_attempt: ContextVar[Optional["Attempt"]] = ContextVar("hedge_attempt", default=None)
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker.
+
+    Opens after `failures` consecutive failures. After `cooldown` seconds one
+    trial request is let through (half-open); its outcome closes the breaker
+    again or reopens it.
+    """
+
+    def __init__(self, kind: str, provider: str, failures: int, cooldown: float):
+        self.kind = kind
+        self.provider = provider
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+
+    def _transition(self, state: str):
+        if state != self.state:
+            logger.info(f"Circuit breaker {self.kind}/{self.provider}: {self.state} -> {state}")
+            self.state = state
+            CIRCUIT_BREAKER_TRANSITIONS.labels(self.kind, self.provider, state).inc()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent to the provider now."""
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+            self._transition("half_open")
+            self._trial_running = False
+        if self.state == "half_open":
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+        return self.state == "closed"
+
+    def record_cancelled(self):
+        # A trial that lost a race tells nothing, let the next request try
+        self._trial_running = False
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self._trial_running = False
+        self._transition("closed")
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._trial_running = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failures:
+            self.opened_at = time.monotonic()
+            self._transition("open")
+
+
+@dataclass
+class ProviderHealth:
+    kind: str
+    provider: str
+    breaker: CircuitBreaker
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=200))
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class ProviderHealthService:
+    """
+    Process-wide latency and failure tracking of the LLM and TTS providers.
+
+    For every service kind and provider (keyed "provider:model") it keeps
+    the recent times to first token (LLM) or first audio (TTS), counting a
+    cancelled loser of a race as the time it was waited for, and a circuit
+    breaker. The hedging deadline of a provider is a percentile of its own
+    recent latencies, so only its slow tail is hedged; until enough samples
+    exist a fixed default is used.
+    """
+
+    _instance: Optional["ProviderHealthService"] = None
+
+    DEFAULT_DEADLINE_MS = {"llm": 1500, "tts": 1000}
+
+    def __init__(
+        self,
+        percentile: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        breaker_failures: Optional[int] = None,
+        breaker_cooldown: Optional[float] = None,
+    ):
+        """
+        Args:
+            percentile (float): Latency percentile used as hedging deadline (HEDGE_PERCENTILE).
+            min_samples (int): Samples needed before the percentile is trusted (HEDGE_MIN_SAMPLES),
+                until then LLM_HEDGE_DEADLINE_MS / TTS_HEDGE_DEADLINE_MS apply.
+            breaker_failures (int): Consecutive failures that open a provider's breaker
+                (HEDGE_BREAKER_FAILURES).
+            breaker_cooldown (float): Seconds before an open breaker lets a trial through
+                (HEDGE_BREAKER_COOLDOWN).
+        """
+        self.percentile = percentile or float(os.getenv("HEDGE_PERCENTILE", "95"))
+        self.min_samples = min_samples or int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+        self.breaker_failures = breaker_failures or int(os.getenv("HEDGE_BREAKER_FAILURES", "3"))
+        self.breaker_cooldown = breaker_cooldown or float(
+            os.getenv("HEDGE_BREAKER_COOLDOWN", "30")
+        )
+        self._providers: Dict[Tuple[str, str], ProviderHealth] = {}
+
+    @classmethod
+    def get_instance(cls) -> "ProviderHealthService":
+        """Return the process-wide provider health registry."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def get(self, kind: str, provider: str) -> ProviderHealth:
+        health = self._providers.get((kind, provider))
+        if health is None:
+            health = ProviderHealth(
+                kind,
+                provider,
+                CircuitBreaker(kind, provider, self.breaker_failures, self.breaker_cooldown),
+            )
+            self._providers[(kind, provider)] = health
+        return health
+
+    def deadline(self, kind: str, provider: str) -> float:
+        """Seconds to wait for the provider's first output before hedging."""
+        health = self.get(kind, provider)
+        if len(health.latencies) < self.min_samples:
+            default = self.DEFAULT_DEADLINE_MS[kind]
+            return float(os.getenv(f"{kind.upper()}_HEDGE_DEADLINE_MS", default)) / 1000
+        return max(0.1, health.percentile(self.percentile))
+
+    def record_latency(self, kind: str, provider: str, seconds: float):
+        self.get(kind, provider).latencies.append(seconds)
+        PROVIDER_FIRST_RESPONSE_SECONDS.labels(kind, provider).observe(seconds)
+
+    def stats(self) -> dict:
+        return {
+            f"{kind}/{provider}": {
+                "breaker": health.breaker.state,
+                "samples": len(health.latencies),
+                "p50_ms": round((health.percentile(50) or 0) * 1000),
+                "p95_ms": round((health.percentile(95) or 0) * 1000),
+                "deadline_ms": round(self.deadline(kind, provider) * 1000),
+            }
+            for (kind, provider), health in self._providers.items()
+        }
+
+
+class Attempt:
+    """One request to one provider, with its frames collected in a queue."""
+
+    def __init__(self, provider: str, produce: Producer, is_output: Callable[[Frame], bool]):
+        self.provider = provider
+        self.is_output = is_output
+        self.items: asyncio.Queue = asyncio.Queue()
+        self.settled = asyncio.Event()
+        self.has_output = False
+        self.failed = False
+        self.started_at = time.monotonic()
+        self.first_output_at: Optional[float] = None
+        # A fresh context, so collectors of the caller (e.g. a speculation)
+        # do not capture the frames of the attempt
+        self.task = asyncio.create_task(self._run(produce), context=contextvars.Context())
+
+    def emit(self, frame: Frame, direction: FrameDirection = FrameDirection.DOWNSTREAM):
+        if isinstance(frame, ErrorFrame):
+            self.failed = True
+        elif not self.has_output and self.is_output(frame):
+            self.has_output = True
+            self.first_output_at = time.monotonic()
+            self.settled.set()
+        self.items.put_nowait((frame, direction))
+
+    async def _run(self, produce: Producer):
+        try:
+            await produce(self)
+        except Exception as e:
+            logger.warning(f"Request to {self.provider} failed: {e}")
+            self.failed = True
+        finally:
+            if not self.has_output:
+                self.failed = True
+            self.items.put_nowait(None)
+            self.settled.set()
+
+
+async def _first_output(attempts: List[Attempt], timeout: Optional[float]) -> Optional[Attempt]:
+    """The first attempt to produce output, None on timeout or if all ended without any."""
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    waiters = {
+        asyncio.ensure_future(attempt.settled.wait()): attempt
+        for attempt in attempts
+        if attempt.has_output or not attempt.settled.is_set()
+    }
+    try:
+        while waiters:
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                return None
+            done, _ = await asyncio.wait(
+                waiters, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                return None
+            for waiter in done:
+                attempt = waiters.pop(waiter)
+                if attempt.has_output:
+                    return attempt
+        return None
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+
+
+async def hedge(
+    kind: str,
+    primary: Tuple[str, Producer],
+    secondary: Optional[Tuple[str, Producer]],
+    is_output: Callable[[Frame], bool],
+    health: Optional[ProviderHealthService] = None,
+) -> AsyncGenerator[Item, None]:
+    """
+    Run a request on the primary provider, hedged on the secondary.
+
+    If the primary has not produced output within its deadline, or failed
+    before, the same request is sent to the secondary and whichever produces
+    output first is kept; the other is cancelled. A provider whose breaker
+    is open is skipped in favour of the other one.
+
+    Args:
+        kind (str): "llm" or "tts".
+        primary (tuple): Provider name and producer, a coroutine function that
+            emits the frames of the response through the Attempt it is given.
+        secondary (tuple): Same for the secondary provider, None to only track the primary.
+        is_output (callable): Whether a frame is the first useful output (token, audio).
+        health (ProviderHealthService): Defaults to the process-wide registry.
+
+    Yields:
+        tuple: The frames of the winning response and their direction.
+    """
+    health = health or ProviderHealthService.get_instance()
+    first, second = primary, secondary
+    if second and not health.get(kind, first[0]).breaker.allow():
+        if health.get(kind, second[0]).breaker.allow():
+            HEDGE_EVENTS.labels(kind, second[0], "failover").inc()
+            first, second = second, None
+        else:
+            # Both are failing, keep trying the primary
+            second = None
+
+    attempts = [Attempt(first[0], first[1], is_output)]
+    try:
+        winner = await _first_output(attempts, health.deadline(kind, first[0]))
+        if winner is None and second and health.get(kind, second[0]).breaker.allow():
+            event = "failover" if attempts[0].failed else "hedged"
+            HEDGE_EVENTS.labels(kind, second[0], event).inc()
+            attempts.append(Attempt(second[0], second[1], is_output))
+        if winner is None:
+            winner = await _first_output(attempts, None)
+
+        now = time.monotonic()
+        for attempt in attempts:
+            breaker = health.get(kind, attempt.provider).breaker
+            if attempt is winner:
+                breaker.record_success()
+                health.record_latency(
+                    kind, attempt.provider, attempt.first_output_at - attempt.started_at
+                )
+            elif attempt.failed:
+                breaker.record_failure()
+            else:
+                attempt.task.cancel()
+                breaker.record_cancelled()
+                # A loser outlasted the race: its latency is at least the time
+                # waited so far. Leaving it out would pull the percentile, and
+                # with it the deadline, below the provider's real tail.
+                health.record_latency(
+                    kind, attempt.provider, (attempt.first_output_at or now) - attempt.started_at
+                )
+        if winner is not None and winner is not attempts[0]:
+            HEDGE_EVENTS.labels(kind, winner.provider, "won").inc()
+
+        # Nobody produced output: pass the primary's frames on, errors included
+        source = winner or attempts[0]
+        while True:
+            item = await source.items.get()
+            if item is None:
+                break
+            yield item
+    finally:
+        for attempt in attempts:
+            attempt.task.cancel()
+
+
+
+
+def _name(provider: str, service) -> str:
+    """Health and metrics key of a service, the same provider may be hedged with another model."""
+    return f"{provider}:{service.model_name}" if service.model_name else provider
+
+
+def _convert_context(context: OpenAILLMContext, provider: str) -> OpenAILLMContext:
+    """A copy of the context in the format of another provider."""
+    from services.providers_service import ProvidersService
+
+    messages = context.get_messages_for_persistent_storage()
+    system = getattr(context, "system_message", None)
+    if system:
+        # Google contexts repeat a lone system prompt as the first user message
+        if messages and message_role(messages[0]) == "user" and message_text(messages[0]) == system:
+            messages = messages[1:]
+        messages = [{"role": "system", "content": system}] + messages
+    return ProvidersService.create_context(provider, OpenAILLMContext(messages))
+
+
+def _is_timing(frame: Frame) -> bool:
+    """TTFB and processing metrics, which the hedged service measures itself."""
+    return isinstance(frame, MetricsFrame) and all(
+        isinstance(data, (TTFBMetricsData, ProcessingMetricsData)) for data in frame.data
+    )
+
+
+class _AttemptCollector(FrameProcessor):
+    """
+    Linked on both sides of a hedged service's child, in place of a pipeline.
+
+    The frames the child pushes while it runs an attempt are handed to that
+    attempt. Outside of attempts (e.g. the StartFrame) they are dropped,
+    except errors, which the hedged service pushes upstream.
+    """
+
+    def __init__(self, owner: FrameProcessor, child: FrameProcessor):
+        super().__init__(name=f"{owner}::{child}")
+        self._owner = owner
+        child.link(self)
+        self.link(child)
+
+    async def queue_frame(
+        self,
+        frame: Frame,
+        direction: FrameDirection = FrameDirection.DOWNSTREAM,
+        callback=None,
+    ):
+        attempt = _current_attempt.get()
+        if attempt is not None:
+            if not isinstance(
+                frame, (LLMFullResponseStartFrame, LLMFullResponseEndFrame)
+            ) and not _is_timing(frame):
+                attempt.emit(frame, direction)
+        elif isinstance(frame, ErrorFrame):
+            await self._owner.push_frame(frame, FrameDirection.UPSTREAM)
+
+
+class _HedgedLifecycle:
+    """Set up, start, stop and clean up the children together with the hedged service.
+
+    The children are not part of the pipeline, they get the task manager,
+    clock and StartFrame (e.g. the sample rate) of the hedged service.
+    """
+
+    def _adopt(self, primary, secondary):
+        self.primary = primary
+        self.secondary = secondary
+        self._children = (primary, secondary)
+        self._collectors = [_AttemptCollector(self, child) for child in self._children]
+        self.set_model_name(primary.model_name)
+
+    def can_generate_metrics(self) -> bool:
+        return True
+
+    async def setup(self, setup: FrameProcessorSetup):
+        await super().setup(setup)
+        for child in self._children:
+            await child.setup(setup)
+
+    async def start(self, frame: StartFrame):
+        await super().start(frame)
+        for child in self._children:
+            await child.process_frame(frame, FrameDirection.DOWNSTREAM)
+
+    async def stop(self, frame: EndFrame):
+        await super().stop(frame)
+        for child in self._children:
+            await child.stop(frame)
+
+    async def cancel(self, frame: CancelFrame):
+        await super().cancel(frame)
+        for child in self._children:
+            await child.cancel(frame)
+
+    async def cleanup(self):
+        await super().cleanup()
+        for child in self._children:
+            await child.cleanup()
+
+    async def warm_up(self):
+        """Warm up the connections of both children (see ConnectionPoolService.warm_up)."""
+        await asyncio.gather(
+            *(child.warm_up() for child in self._children if hasattr(child, "warm_up"))
+        )
+
+
+class HedgedLLMService(_HedgedLifecycle, LLMService):
+    """
+    An LLM service whose requests are hedged on a second one.
+
+    It sits in the pipeline in place of the primary and owns both services:
+    every context is raced as described in `hedge`, both services' frames
+    are collected, and only the winner's are pushed. Contexts are converted
+    when the secondary is another provider. Wrappers of the children (e.g.
+    the prompt cache) apply to their own requests, wrappers of this service
+    (e.g. the speculative processor) to the raced response.
+    """
+
+    def __init__(
+        self,
+        primary: LLMService,
+        provider: str,
+        secondary: LLMService,
+        secondary_provider: str,
+        **kwargs,
+    ):
+        """
+        Args:
+            primary (LLMService): The service used unless it is slow or failing.
+            provider (str): Its provider name.
+            secondary (LLMService): The service it is hedged on.
+            secondary_provider (str): Its provider name.
+        """
+        super().__init__(**kwargs)
+        self.provider = provider
+        self.secondary_provider = secondary_provider
+        self._adopt(primary, secondary)
+
+    def create_context_aggregator(self, context: OpenAILLMContext, **kwargs):
+        # Contexts are kept in the primary's format
+        return self.primary.create_context_aggregator(context, **kwargs)
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        from services.providers_service import ProvidersService
+
+        await super().process_frame(frame, direction)
+
+        context = None
+        if isinstance(frame, OpenAILLMContextFrame):
+            context = frame.context
+        elif isinstance(frame, LLMMessagesFrame):
+            context = OpenAILLMContext.from_messages(frame.messages)
+        elif isinstance(frame, LLMUpdateSettingsFrame):
+            for child in self._children:
+                await child.process_frame(frame, direction)
+        else:
+            await self.push_frame(frame, direction)
+
+        if context:
+            context = ProvidersService.create_context(self.provider, context)
+            try:
+                await self.push_frame(LLMFullResponseStartFrame())
+                await self.start_processing_metrics()
+                await self._process_context(context)
+            finally:
+                await self.stop_processing_metrics()
+                await self.push_frame(LLMFullResponseEndFrame())
+
+    async def _process_context(self, context: OpenAILLMContext):
+        from services.providers_service import LLMProvider
+
+        secondary_context = (
+            context
+            if LLMProvider(self.secondary_provider) == LLMProvider(self.provider)
+            else _convert_context(context, self.secondary_provider)
+        )
+
+        def producer(service, service_context, provider):
+            async def produce(attempt: Attempt):
+                _current_attempt.set(attempt)
+                await service._process_context(service_context)
+
+            return _name(provider, service), produce
+
+        await self.start_ttfb_metrics()
+        async for frame, direction in hedge(
+            "llm",
+            producer(self.primary, context, self.provider),
+            producer(self.secondary, secondary_context, self.secondary_provider),
+            lambda frame: isinstance(frame, LLMTextFrame),
+        ):
+            if isinstance(frame, LLMTextFrame):
+                await self.stop_ttfb_metrics()
+            await self.push_frame(frame, direction)
+
+
+class HedgedTTSService(_HedgedLifecycle, TTSService):
+    """
+    A TTS service whose syntheses are hedged on a second one.
+
+    It sits in the pipeline in place of the primary and owns both services:
+    it aggregates the text like any TTS service, and every phrase is raced
+    as described in `hedge` between the children's run_tts. Wrappers of the
+    primary (e.g. the TTS cache) apply to its own syntheses only.
+    """
+
+    def __init__(
+        self,
+        primary: TTSService,
+        provider: str,
+        secondary: TTSService,
+        secondary_provider: str,
+        **kwargs,
+    ):
+        """
+        Args:
+            primary (TTSService): The service used unless it is slow or failing.
+            provider (str): Its provider name.
+            secondary (TTSService): The service it is hedged on.
+            secondary_provider (str): Its provider name.
+            **kwargs: TTSService arguments, e.g. the sample rate.
+        """
+        super().__init__(**kwargs)
+        self.provider = provider
+        self.secondary_provider = secondary_provider
+        self._adopt(primary, secondary)
+
+    async def run_tts(self, text: str) -> AsyncGenerator[Frame, None]:
+        def producer(service, provider):
+            async def produce(attempt: Attempt):
+                _current_attempt.set(attempt)
+                async for frame in service.run_tts(text):
+                    if frame is not None:
+                        attempt.emit(frame)
+
+            return _name(provider, service), produce
+
+        await self.start_ttfb_metrics()
+        async for frame, _ in hedge(
+            "tts",
+            producer(self.primary, self.provider),
+            producer(self.secondary, self.secondary_provider),
+            lambda frame: isinstance(frame, TTSAudioRawFrame),
+        ):
+            if isinstance(frame, TTSAudioRawFrame):
+                await self.stop_ttfb_metrics()
+            yield frame
+        await self.start_tts_usage_metrics(text)
@@ -0,0 +1,168 @@
+from typing import Optional, Tuple
+
+from loguru import logger
+from pipecat.frames.frames import (
+    BotStartedSpeakingFrame,
+    LLMFullResponseStartFrame,
+    LLMTextFrame,
+    MetricsFrame,
+    TranscriptionFrame,
+    TTSAudioRawFrame,
+    TTSStartedFrame,
+    UserStartedSpeakingFrame,
+    VADUserStartedSpeakingFrame,
+    VADUserStoppedSpeakingFrame,
+)
+from pipecat.metrics.metrics import TTFBMetricsData
+from pipecat.observers.base_observer import BaseObserver, FramePushed
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from models.agent_model import AgentModel
+from services.metrics_service import (
+    SERVICE_TTFB_SECONDS,
+    TURN_MILESTONE_SECONDS,
+    TURN_STAGE_SECONDS,
+    TURNS_TOTAL,
+    VOICE_TO_VOICE_SECONDS,
+)
+
+
+def _seconds(start_ns: int, end_ns: int) -> float:
+    return max(0.0, (end_ns - start_ns) / 1e9)
+
+
+class TurnLatencyObserver(BaseObserver):
+    """
+    Breaks the voice-to-voice latency of each turn down by stage.
+
+    A turn starts when the VAD reports the end of the user's speech and ends
+    when the first audio frame of the reply leaves transport.output(). In
+    between it timestamps the final STT transcript, the first LLM token and
+    the first TTS audio, and records them as histograms labeled with the
+    provider and model of the service responsible for each stage.
+    """
+
+    def __init__(
+        self,
+        agent_config: AgentModel,
+        transport_input: FrameProcessor,
+        stt: FrameProcessor,
+        llm: FrameProcessor,
+        tts: FrameProcessor,
+        transport_output: FrameProcessor,
+    ):
+        super().__init__()
+        self._input = transport_input
+        self._stt = stt
+        self._llm = llm
+        self._tts = tts
+        self._output = transport_output
+        self._labels = {
+            stt: ("stt", agent_config.stt.provider.value, agent_config.stt.model_id or stt.model_name),
+            llm: ("llm", agent_config.llm.provider.value, agent_config.llm.model_id or llm.model_name),
+            tts: ("tts", agent_config.tts.provider.value, agent_config.tts.model_id or tts.model_name),
+        }
+        self._reset()
+
+    def _reset(self):
+        self._end_of_speech: Optional[int] = None
+        # Final transcripts can arrive before the VAD decides the user stopped
+        self._transcript_at: Optional[int] = None
+        self._llm_started_at: Optional[int] = None
+        self._first_token_at: Optional[int] = None
+        self._tts_started_at: Optional[int] = None
+        self._first_audio_at: Optional[int] = None
+
+    def _label(self, service: FrameProcessor) -> Tuple[str, str]:
+        _, provider, model = self._labels[service]
+        return provider, model or "default"
+
+    def _milestone(self, name: str, service: FrameProcessor, timestamp: int):
+        provider, model = self._label(service)
+        TURN_MILESTONE_SECONDS.labels(name, provider, model).observe(
+            _seconds(self._end_of_speech, timestamp)
+        )
+
+    def _stage(self, name: str, service: FrameProcessor, start: int, end: int):
+        provider, model = self._label(service)
+        TURN_STAGE_SECONDS.labels(name, provider, model).observe(_seconds(start, end))
+
+    async def on_push_frame(self, data: FramePushed):
+        frame, source, timestamp = data.frame, data.source, data.timestamp
+
+        if isinstance(frame, MetricsFrame) and source in self._labels:
+            for metric in frame.data:
+                if isinstance(metric, TTFBMetricsData) and metric.value > 0:
+                    service, provider, model = self._labels[source]
+                    SERVICE_TTFB_SECONDS.labels(
+                        service, provider, metric.model or model or "default"
+                    ).observe(metric.value)
+            return
+
+        if source is self._input:
+            if isinstance(frame, (VADUserStartedSpeakingFrame, UserStartedSpeakingFrame)):
+                if self._end_of_speech is not None:
+                    # The user kept talking before the reply started
+                    TURNS_TOTAL.labels("abandoned").inc()
+                self._reset()
+            elif isinstance(frame, VADUserStoppedSpeakingFrame):
+                transcript_at = self._transcript_at
+                self._reset()
+                self._end_of_speech = timestamp
+                if transcript_at is not None:
+                    self._on_transcript(timestamp)
+            return
+
+        if source is self._stt and isinstance(frame, TranscriptionFrame):
+            if self._end_of_speech is None:
+                self._transcript_at = timestamp
+            elif self._transcript_at is None:
+                self._on_transcript(timestamp)
+            return
+
+        if self._end_of_speech is None:
+            return
+
+        if source is self._llm:
+            if isinstance(frame, LLMFullResponseStartFrame) and self._llm_started_at is None:
+                self._llm_started_at = timestamp
+            elif isinstance(frame, LLMTextFrame) and self._first_token_at is None:
+                self._first_token_at = timestamp
+                self._milestone("llm_first_token", self._llm, timestamp)
+                if self._llm_started_at is not None:
+                    self._stage("llm", self._llm, self._llm_started_at, timestamp)
+        elif source is self._tts:
+            if isinstance(frame, TTSStartedFrame) and self._tts_started_at is None:
+                self._tts_started_at = timestamp
+            elif isinstance(frame, TTSAudioRawFrame) and self._first_audio_at is None:
+                self._first_audio_at = timestamp
+                self._milestone("tts_first_audio", self._tts, timestamp)
+                if self._tts_started_at is not None:
+                    self._stage("tts", self._tts, self._tts_started_at, timestamp)
+        elif (
+            source is self._output
+            and isinstance(frame, BotStartedSpeakingFrame)
+            and data.direction == FrameDirection.DOWNSTREAM
+        ):
+            self._on_first_output(timestamp)
+
+    def _on_transcript(self, timestamp: int):
+        self._transcript_at = timestamp
+        self._milestone("stt_final", self._stt, timestamp)
+        self._stage("stt", self._stt, self._end_of_speech, timestamp)
+
+    def _on_first_output(self, timestamp: int):
+        self._milestone("output_first_audio", self._tts, timestamp)
+        if self._first_audio_at is not None:
+            self._stage("output", self._tts, self._first_audio_at, timestamp)
+
+        stt_provider, _ = self._label(self._stt)
+        llm_provider, llm_model = self._label(self._llm)
+        tts_provider, tts_model = self._label(self._tts)
+        latency = _seconds(self._end_of_speech, timestamp)
+        VOICE_TO_VOICE_SECONDS.labels(
+            stt_provider, llm_provider, llm_model, tts_provider, tts_model
+        ).observe(latency)
+        TURNS_TOTAL.labels("answered").inc()
+        logger.debug(f"Voice-to-voice latency: {latency:.3f}s")
+        self._reset()
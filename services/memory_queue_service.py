@@ -0,0 +1,462 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, List, Optional
+
+from loguru import logger
+
+from models.memory import MemoryOperation, UserMemory
+from models.user import UserInfo
+from repositories.user_repository import UserRepository
+from services.greeting_service import GreetingService
+from services.memory_retrieval_service import MemoryRetrievalService
+from services.user_memory_service import UserMemoryService
+from utils.transcript import compact_messages
+
+# Job states
+PENDING = "pending"
+RUNNING = "running"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS memory_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    enqueued_at REAL NOT NULL,
+    next_run_at REAL NOT NULL,
+    started_at REAL
+);
+CREATE INDEX IF NOT EXISTS memory_jobs_status ON memory_jobs (status, next_run_at);
+CREATE INDEX IF NOT EXISTS memory_jobs_user ON memory_jobs (user_id, id);
+CREATE TABLE IF NOT EXISTS memory_session_watermarks (
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    consolidated INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (user_id, session_id)
+);
+CREATE INDEX IF NOT EXISTS memory_session_watermarks_updated ON memory_session_watermarks (updated_at);
+"""
+
+# The oldest unfinished job of a user is the only one that may run, which
+# keeps consolidations of the same user in order.
+CLAIM_QUERY = """
+SELECT j.id, j.user_id, j.payload, j.attempts, j.enqueued_at
+FROM memory_jobs j
+WHERE j.status = 'pending'
+  AND j.next_run_at <= ?
+  AND j.id = (
+      SELECT MIN(id) FROM memory_jobs
+      WHERE user_id = j.user_id AND status IN ('pending', 'running')
+  )
+ORDER BY j.id
+LIMIT 1
+"""
+
+
+async def consolidate_user_memory(user_id: str, payload: dict):
+    """
+    Default job handler: apply a session's changes to the user's memory.
+
+    The session transcript is turned into add, update and remove operations,
+    and jobs from rolling consolidation carry the operations for most of the
+    session already. They are applied to the stored memory as one new
+    version, written only if no other session wrote one in between;
+    otherwise the memory is read again and the operations are rebased onto
+    it, up to MEMORY_WRITE_ATTEMPTS times before the job is retried.
+    """
+    user_repository = UserRepository()
+    messages = payload["messages"]
+    operations = [
+        MemoryOperation.model_validate(operation)
+        for operation in payload.get("operations", [])
+    ]
+    base_version = payload.get("base_version")
+
+    attempts = int(os.getenv("MEMORY_WRITE_ATTEMPTS", "5"))
+    generated: Optional[List[MemoryOperation]] = None
+    for attempt in range(1, attempts + 1):
+        user_info = await user_repository.get_user(user_id)
+        if user_info is None:
+            logger.warning(f"User {user_id} not found, memory not consolidated")
+            return
+        current = UserMemory.parse(user_info.context)
+        if base_version is None:
+            base_version = current.version
+
+        session_memory, applied, conflicts = current.apply(operations, base_version)
+        if messages and generated is None:
+            # Generated once against this session's view of the memory, so
+            # a retry after a conflict only repeats the cheap part
+            generated = await asyncio.to_thread(
+                UserMemoryService().create_memory_operations,
+                messages,
+                session_memory,
+                raise_errors=True,
+            )
+        memory, applied, conflicts = current.apply(
+            applied + (generated or []), base_version
+        )
+        if memory is current:
+            logger.info(f"Memory of user {user_id} unchanged")
+            return
+
+        if await user_repository.update_user_memory(user_id, memory, current.version):
+            logger.info(
+                f"Memory of user {user_id} is now version {memory.version}: "
+                f"{len(applied)} operations, {conflicts} conflicts"
+            )
+            serialized = memory.serialize()
+            await prepare_greeting(user_id, serialized, user_info)
+            await prepare_memory_index(user_id, serialized)
+            return
+        logger.info(
+            f"Memory of user {user_id} changed during consolidation "
+            f"(attempt {attempt}/{attempts}), rebasing"
+        )
+    raise RuntimeError(
+        f"Memory of user {user_id} kept changing, gave up after {attempts} attempts"
+    )
+
+
+async def prepare_greeting(
+    user_id: str, memory: str, user_info: Optional[UserInfo] = None
+):
+    """Prepare the next session's greeting. Failures never fail the consolidation."""
+    try:
+        await GreetingService.get_instance().prepare(
+            user_id, memory, user_info.name if user_info else None
+        )
+    except Exception as e:
+        logger.warning(f"Failed to prepare greeting for user {user_id}: {e}")
+
+
+async def prepare_memory_index(user_id: str, memory: str):
+    """Index the facts of the new memory for the next session. Failures never fail the consolidation."""
+    if not MemoryRetrievalService.enabled():
+        return
+    try:
+        await MemoryRetrievalService.get_instance().prepare(user_id, memory)
+    except Exception as e:
+        logger.warning(f"Failed to index the memory of user {user_id}: {e}")
+
+
+class MemoryQueueService:
+    """
+    Durable queue for post-session memory consolidation.
+
+    Jobs are stored in SQLite before the session is torn down, so a crash or a
+    restart does not lose the transcript. A pool of async workers processes
+    them with bounded concurrency, retries failures with exponential backoff
+    and never runs two jobs of the same user at once.
+    """
+
+    _instance: Optional["MemoryQueueService"] = None
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        workers: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        backoff: Optional[float] = None,
+        max_backoff: Optional[float] = None,
+        watermark_ttl: Optional[float] = None,
+        handler: Callable[[str, dict], Awaitable[Any]] = consolidate_user_memory,
+    ):
+        """
+        Initialize the queue. Unset arguments are read from the environment.
+
+        Args:
+            db_path (str): SQLite file holding the jobs (MEMORY_QUEUE_DB).
+            workers (int): Number of concurrent consolidations (MEMORY_QUEUE_WORKERS).
+                With 0 the process only enqueues and another process consumes the jobs.
+            max_attempts (int): Attempts before a job is marked failed (MEMORY_QUEUE_MAX_ATTEMPTS).
+            backoff (float): Base retry delay in seconds, doubled per attempt (MEMORY_QUEUE_BACKOFF).
+            max_backoff (float): Upper bound of the retry delay (MEMORY_QUEUE_MAX_BACKOFF).
+            watermark_ttl (float): Seconds a session's watermark is kept after
+                its last update (MEMORY_QUEUE_WATERMARK_TTL).
+            handler (Callable): Coroutine function processing one job.
+        """
+        self.db_path = db_path or os.getenv("MEMORY_QUEUE_DB", "data/memory_queue.db")
+        self.workers = (
+            workers
+            if workers is not None
+            else int(os.getenv("MEMORY_QUEUE_WORKERS", "2"))
+        )
+        self.max_attempts = max_attempts or int(
+            os.getenv("MEMORY_QUEUE_MAX_ATTEMPTS", "5")
+        )
+        self.backoff = backoff or float(os.getenv("MEMORY_QUEUE_BACKOFF", "5"))
+        self.max_backoff = max_backoff or float(
+            os.getenv("MEMORY_QUEUE_MAX_BACKOFF", "300")
+        )
+        # Outlives any retry or journal recovery of the session's jobs
+        self.watermark_ttl = watermark_ttl or float(
+            os.getenv("MEMORY_QUEUE_WATERMARK_TTL", "604800")
+        )
+        self.handler = handler
+
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+        self._watermarks_pruned_at = 0.0
+
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+        # Metrics
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self.last_latency = 0.0
+        self.avg_latency = 0.0
+
+    @classmethod
+    def get_instance(cls) -> "MemoryQueueService":
+        """Return the process-wide queue."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    async def start(self):
+        """Requeue jobs interrupted by a previous shutdown and start the workers."""
+        if self.workers == 0:
+            logger.info("Memory queue started in enqueue-only mode")
+            return
+        await self._execute(
+            "UPDATE memory_jobs SET status = ? WHERE status = ?", (PENDING, RUNNING)
+        )
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        self._wakeup.set()
+        logger.info(f"Memory queue started with {self.workers} workers")
+
+    async def stop(self):
+        """Stop the workers. Unfinished jobs are picked up again on the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(
+        self,
+        user_id: str,
+        messages: list,
+        operations: Optional[List[MemoryOperation]] = None,
+        base_version: Optional[int] = None,
+        session_id: Optional[str] = None,
+        first_turn: int = 0,
+    ) -> Optional[int]:
+        """
+        Persist a consolidation job.
+
+        Messages are compacted to user and assistant turns first. When a
+        session id is given, turns at or below the user's consolidation
+        watermark for that session are dropped, and the watermark moves past
+        this job's turns once it succeeds.
+
+        Args:
+            user_id (str): The user the transcript belongs to.
+            messages (list): The session transcript, or its unconsolidated tail.
+            operations (List[MemoryOperation]): Memory operations from rolling consolidation, if any.
+            base_version (int): Version of the memory the operations were made against.
+            session_id (str): The session the messages belong to.
+            first_turn (int): Index of messages[0] within the session.
+
+        Returns:
+            int: The job id, or None if there was nothing left to consolidate.
+        """
+        now = time.time()
+        last_turn = first_turn + len(messages)
+        if session_id:
+            watermark = await self.get_watermark(user_id, session_id)
+            if watermark >= last_turn:
+                # Everything in this job was consolidated by an earlier one
+                return None
+            if watermark > first_turn:
+                messages = messages[watermark - first_turn :]
+                first_turn = min(watermark, last_turn)
+        messages = compact_messages(messages)
+        if not messages and not operations:
+            return None
+
+        job = {"messages": messages}
+        if operations:
+            job["operations"] = [
+                operation.model_dump(mode="json", exclude_none=True)
+                for operation in operations
+            ]
+        if base_version is not None:
+            job["base_version"] = base_version
+        if session_id:
+            job.update(session_id=session_id, last_turn=last_turn)
+        payload = json.dumps(job, default=str)
+        job_id = await self._execute(
+            "INSERT INTO memory_jobs (user_id, payload, status, enqueued_at, next_run_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (user_id, payload, PENDING, now, now),
+        )
+        self._wakeup.set()
+        logger.info(f"Queued memory consolidation job {job_id} for user {user_id}")
+        return job_id
+
+    async def get_watermark(self, user_id: str, session_id: str) -> int:
+        """Return how many turns of the session were already consolidated."""
+        rows = await self._fetchall(
+            "SELECT consolidated FROM memory_session_watermarks WHERE user_id = ? AND session_id = ?",
+            (user_id, session_id),
+        )
+        return rows[0][0] if rows else 0
+
+    async def _advance_watermark(self, user_id: str, session_id: str, turn: int):
+        now = time.time()
+        await self._execute(
+            "INSERT INTO memory_session_watermarks (user_id, session_id, consolidated, updated_at) "
+            "VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(user_id, session_id) DO UPDATE SET "
+            "consolidated = MAX(consolidated, excluded.consolidated), "
+            "updated_at = excluded.updated_at",
+            (user_id, session_id, turn, now),
+        )
+        # Prune at most once a minute
+        if now - self._watermarks_pruned_at > 60:
+            self._watermarks_pruned_at = now
+            await self._execute(
+                "DELETE FROM memory_session_watermarks WHERE updated_at < ?",
+                (now - self.watermark_ttl,),
+            )
+
+    async def stats(self) -> dict:
+        """Return queue depth and processing metrics."""
+        counts = dict(
+            await self._fetchall(
+                "SELECT status, COUNT(*) FROM memory_jobs GROUP BY status"
+            )
+        )
+        oldest = await self._fetchall(
+            "SELECT MIN(enqueued_at) FROM memory_jobs WHERE status = ?", (PENDING,)
+        )
+        oldest_enqueued_at = oldest[0][0] if oldest else None
+        return {
+            "depth": counts.get(PENDING, 0),
+            "running": counts.get(RUNNING, 0),
+            "dead": counts.get(FAILED, 0),
+            "oldest_pending_age": (
+                time.time() - oldest_enqueued_at if oldest_enqueued_at else 0.0
+            ),
+            "processed": self.processed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "last_latency": self.last_latency,
+            "avg_latency": self.avg_latency,
+        }
+
+    async def _worker(self, index: int):
+        """Claim and process jobs until cancelled."""
+        while True:
+            self._wakeup.clear()
+            job = await asyncio.to_thread(self._claim)
+            if job is None:
+                try:
+                    # Wake up on new jobs, or periodically for retries coming due
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id, user_id, payload, attempts, enqueued_at = job
+            payload = json.loads(payload)
+            if payload.get("session_id") and await self.get_watermark(
+                user_id, payload["session_id"]
+            ) >= payload["last_turn"]:
+                # A job of the same session covering these turns finished after
+                # this one was queued, e.g. a journal recovered after a crash
+                await self._execute("DELETE FROM memory_jobs WHERE id = ?", (job_id,))
+                logger.info(f"Memory consolidation job {job_id} already covered, dropped")
+                continue
+            try:
+                await self.handler(user_id, payload)
+            except Exception as e:
+                await self._retry_or_fail(job_id, user_id, attempts, e)
+            else:
+                if payload.get("session_id"):
+                    await self._advance_watermark(
+                        user_id, payload["session_id"], payload["last_turn"]
+                    )
+                await self._execute("DELETE FROM memory_jobs WHERE id = ?", (job_id,))
+                self._record_latency(time.time() - enqueued_at)
+                logger.info(f"Memory consolidation job {job_id} for user {user_id} done")
+            # Let workers blocked on this user pick up the next job
+            self._wakeup.set()
+
+    async def _retry_or_fail(self, job_id: int, user_id: str, attempts: int, error: Exception):
+        if attempts >= self.max_attempts:
+            self.failed += 1
+            await self._execute(
+                "UPDATE memory_jobs SET status = ?, last_error = ? WHERE id = ?",
+                (FAILED, str(error), job_id),
+            )
+            logger.error(
+                f"Memory consolidation job {job_id} for user {user_id} failed after {attempts} attempts: {error}"
+            )
+            return
+
+        self.retried += 1
+        delay = min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+        await self._execute(
+            "UPDATE memory_jobs SET status = ?, last_error = ?, next_run_at = ? WHERE id = ?",
+            (PENDING, str(error), time.time() + delay, job_id),
+        )
+        logger.warning(
+            f"Memory consolidation job {job_id} for user {user_id} failed, retrying in {delay:.1f}s: {error}"
+        )
+
+    def _record_latency(self, latency: float):
+        self.processed += 1
+        self.last_latency = latency
+        # Exponential moving average, seeded with the first sample
+        if self.processed == 1:
+            self.avg_latency = latency
+        else:
+            self.avg_latency += 0.1 * (latency - self.avg_latency)
+
+    def _claim(self) -> Optional[tuple]:
+        """Atomically move the next runnable job to the running state."""
+        with self._db_lock:
+            row = self._db.execute(CLAIM_QUERY, (time.time(),)).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE memory_jobs SET status = ?, attempts = attempts + 1, started_at = ? WHERE id = ?",
+                (RUNNING, time.time(), row[0]),
+            )
+            self._db.commit()
+            return row[0], row[1], row[2], row[3] + 1, row[4]
+
+    async def _execute(self, query: str, params: tuple = ()) -> int:
+        def execute():
+            with self._db_lock:
+                cursor = self._db.execute(query, params)
+                self._db.commit()
+                return cursor.lastrowid
+
+        return await asyncio.to_thread(execute)
+
+    async def _fetchall(self, query: str, params: tuple = ()) -> list:
+        def fetchall():
+            with self._db_lock:
+                return self._db.execute(query, params).fetchall()
+
+        return await asyncio.to_thread(fetchall)
@@ -0,0 +1,327 @@
+import asyncio
+import importlib
+import json
+import os
+import re
+import tempfile
+import time
+import zlib
+from typing import List, Optional, Protocol, Tuple
+
+import numpy as np
+from loguru import logger
+from pipecat.frames.frames import Frame
+from pipecat.processors.aggregators.openai_llm_context import (
+    OpenAILLMContext,
+    OpenAILLMContextFrame,
+)
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from models.memory import UserMemory
+from services.metrics_service import MEMORY_RETRIEVAL_SECONDS
+from services.rolling_memory_service import memory_hash
+from utils.cache import TTLCache
+from utils.transcript import message_role, message_text
+
+MEMORY_HEADER = "What you remember about the user that may be relevant to what they just said:"
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOPWORDS = frozenset(
+    """a about after again all also am an and any are as at be because been before being
+    but by can could did do does doing don't for from had has have having he her here hers
+    him his how i i'm if in into is it it's its just me more most my no not now of on once
+    only or other our out over own same she should so some such than that the their them
+    then there these they this those through to too under until up very was we were what
+    when where which while who why will with would you your user user's
+    today yesterday tomorrow really got get going gonna yeah okay ok oh um uh well thing things""".split()
+)
+
+
+class Embedder(Protocol):
+    """Turns texts into L2-normalized vectors, one row per text."""
+
+    # Identifies the vectors on disk: an index built by another embedder is rebuilt
+    name: str
+
+    def embed(self, texts: List[str]) -> np.ndarray: ...
+
+
+class HashingEmbedder:
+    """
+    Offline embedder: signed feature hashing of stemmed words and word pairs.
+
+    Needs no model or network and embeds an utterance in tens of
+    microseconds, so retrieval can run on the event loop for every turn.
+    It only matches shared words (up to a crude stem), which covers most of
+    what a user says about people, places and events they mentioned before.
+    """
+
+    def __init__(self, dim: Optional[int] = None):
+        """
+        Args:
+            dim (int): Size of the vectors (MEMORY_EMBEDDING_DIM).
+        """
+        self.dim = dim or int(os.getenv("MEMORY_EMBEDDING_DIM", "2048"))
+        self.name = f"hashing-v1-{self.dim}"
+
+    @staticmethod
+    def _stem(word: str) -> str:
+        for suffix, replacement in (("ies", "y"), ("ing", ""), ("ed", ""), ("es", ""), ("s", ""), ("ly", "")):
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                return word[: -len(suffix)] + replacement
+        return word
+
+    def _features(self, text: str) -> List[Tuple[str, float]]:
+        words = [self._stem(w) for w in _TOKEN.findall(text.lower()) if w not in STOPWORDS]
+        return [(word, 1.0) for word in words] + [
+            (f"{a} {b}", 0.5) for a, b in zip(words, words[1:])
+        ]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                h = zlib.crc32(feature.encode())
+                # The top bit picks the sign, so colliding features tend to cancel out
+                vectors[row, h % self.dim] += weight if h & 0x80000000 else -weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+def load_embedder(spec: Optional[str] = None) -> Embedder:
+    """
+    Return the embedder named by spec (MEMORY_EMBEDDER).
+
+    Args:
+        spec (str): "hashing", or "package.module:factory" for a callable returning an Embedder.
+    """
+    spec = spec or os.getenv("MEMORY_EMBEDDER", "hashing")
+    if spec == "hashing":
+        return HashingEmbedder()
+    module, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module), attribute)()
+
+
+class MemoryVectorStore:
+    """The facts of one version of a user's memory and their vectors, searched by cosine similarity."""
+
+    def __init__(self, facts: List[str], vectors: np.ndarray, version: str, embedder: str):
+        self.facts = facts
+        self.vectors = vectors
+        self.version = version
+        self.embedder = embedder
+
+    @classmethod
+    def build(cls, memory: Optional[str], embedder: Embedder) -> "MemoryVectorStore":
+        facts = UserMemory.parse(memory).fact_texts()
+        vectors = embedder.embed(facts) if facts else np.zeros((0, 0), dtype=np.float32)
+        return cls(facts, vectors.astype(np.float32), memory_hash(memory), embedder.name)
+
+    def search(self, query: np.ndarray, k: int, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """Return up to k (fact, score) pairs scoring at least min_score, best first."""
+        if not self.facts:
+            return []
+        scores = self.vectors @ query
+        top = np.argpartition(-scores, k)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [(self.facts[i], float(scores[i])) for i in top if scores[i] >= min_score]
+
+    def save(self, path: str):
+        """Write the store atomically, without pickling."""
+        meta = json.dumps({"facts": self.facts, "version": self.version, "embedder": self.embedder})
+        # Unique per writer: workers indexing the same user at once must not share it
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path) or ".",
+            prefix=f"{os.path.basename(path)}.",
+            suffix=".tmp",
+            delete=False,
+        ) as f:
+            try:
+                np.savez(f, vectors=self.vectors, meta=np.array(meta))
+            except BaseException:
+                f.close()
+                os.unlink(f.name)
+                raise
+        os.replace(f.name, path)
+
+    @classmethod
+    def load(cls, path: str) -> "MemoryVectorStore":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(meta["facts"], data["vectors"], meta["version"], meta["embedder"])
+
+
+class MemoryRetrievalService:
+    """
+    Per-user vector stores of memory facts, and the top-k lookup done on every turn.
+
+    A user's memory is split into facts and embedded once per memory
+    version: right after consolidation (`prepare`), or on the first session
+    that finds no index for the current version. Indexes are saved as
+    `<user_id>.npz` under MEMORY_INDEX_DIR, shared by the workers, and kept
+    in an in-process LRU cache.
+    """
+
+    _instance: Optional["MemoryRetrievalService"] = None
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        embedder: Optional[Embedder] = None,
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None,
+        cache_size: Optional[int] = None,
+    ):
+        """
+        Args:
+            directory (str): Directory of the saved indexes (MEMORY_INDEX_DIR).
+            embedder (Embedder): Embedder of facts and utterances (MEMORY_EMBEDDER).
+            top_k (int): Facts injected per turn at most (MEMORY_RETRIEVAL_TOP_K).
+            min_score (float): Cosine similarity a fact needs to be injected (MEMORY_RETRIEVAL_MIN_SCORE).
+            cache_size (int): Indexes kept in memory (MEMORY_INDEX_CACHE_SIZE).
+        """
+        self.directory = directory or os.getenv("MEMORY_INDEX_DIR", "data/memory_index")
+        self.embedder = embedder or load_embedder()
+        self.top_k = top_k or int(os.getenv("MEMORY_RETRIEVAL_TOP_K", "5"))
+        self.min_score = (
+            min_score
+            if min_score is not None
+            else float(os.getenv("MEMORY_RETRIEVAL_MIN_SCORE", "0.1"))
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        self._stores = TTLCache(
+            max_size=cache_size or int(os.getenv("MEMORY_INDEX_CACHE_SIZE", "200")),
+            ttl=3600,
+        )
+        self.builds = 0
+        self.retrievals = 0
+
+    @classmethod
+    def get_instance(cls) -> "MemoryRetrievalService":
+        """Return the process-wide memory index."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def enabled() -> bool:
+        return os.getenv("MEMORY_RETRIEVAL_ENABLED", "true").lower() == "true"
+
+    def _path(self, user_id: str) -> str:
+        return os.path.join(self.directory, f"{os.path.basename(user_id)}.npz")
+
+    async def get_store(self, user_id: str, memory: Optional[str]) -> MemoryVectorStore:
+        """Return the index of this exact memory, loading or building it if needed."""
+        version = memory_hash(memory)
+        return await self._stores.get_or_load(
+            (user_id, version),
+            lambda: asyncio.to_thread(self._load_or_build, user_id, memory, version),
+        )
+
+    async def prepare(self, user_id: str, memory: str):
+        """Build the index of a freshly consolidated memory ahead of the next session."""
+        await self.get_store(user_id, memory)
+
+    def _load_or_build(self, user_id: str, memory: Optional[str], version: str) -> MemoryVectorStore:
+        path = self._path(user_id)
+        try:
+            store = MemoryVectorStore.load(path)
+            if store.version == version and store.embedder == self.embedder.name:
+                return store
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Rebuilding unreadable memory index of user {user_id}: {e}")
+        store = MemoryVectorStore.build(memory, self.embedder)
+        store.save(path)
+        self.builds += 1
+        logger.debug(f"Built memory index of user {user_id}: {len(store.facts)} facts")
+        return store
+
+    def retrieve(self, store: MemoryVectorStore, text: str, k: Optional[int] = None) -> List[str]:
+        """Return the facts of the store most relevant to text, best first."""
+        start = time.perf_counter()
+        facts = []
+        if store.facts and text:
+            query = self.embedder.embed([text])[0]
+            facts = [fact for fact, _ in store.search(query, k or self.top_k, self.min_score)]
+        MEMORY_RETRIEVAL_SECONDS.observe(time.perf_counter() - start)
+        self.retrievals += 1
+        return facts
+
+    def stats(self) -> dict:
+        return {
+            "embedder": self.embedder.name,
+            "builds": self.builds,
+            "retrievals": self.retrievals,
+            "cache": self._stores.stats(),
+        }
+
+
+def is_memory_message(message) -> bool:
+    """True for the message carrying the injected memory facts."""
+    return message_text(message).startswith(MEMORY_HEADER)
+
+
+class MemoryRetrievalProcessor(FrameProcessor):
+    """
+    Injects the memory facts relevant to the latest user turn into the LLM context.
+
+    Sits right before the LLM (after the context window). On every context
+    frame the facts of the user's memory closest to the last user message
+    are put in a single message just before it, replacing the one injected
+    for the previous turn, or dropped when nothing is relevant. The system
+    prompt and the rest of the conversation are left as they are, so the
+    provider's prompt cache keeps matching up to the previous turn.
+
+    Injected messages are never part of the conversation history:
+    ContextWindowProcessor and memory consolidation skip them.
+    """
+
+    def __init__(
+        self,
+        store: MemoryVectorStore,
+        service: Optional[MemoryRetrievalService] = None,
+        **kwargs,
+    ):
+        """
+        Args:
+            store (MemoryVectorStore): The index of the session user's memory.
+            service (MemoryRetrievalService): Defaults to the process-wide instance.
+        """
+        super().__init__(**kwargs)
+        self.store = store
+        self.service = service or MemoryRetrievalService.get_instance()
+        self.last_facts: List[str] = []
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, OpenAILLMContextFrame):
+            self.inject(frame.context)
+
+        await self.push_frame(frame, direction)
+
+    def inject(self, context: OpenAILLMContext):
+        """Replace the injected facts of the context with those relevant to its last user message."""
+        messages = [m for m in context.messages if not is_memory_message(m)]
+        last_user = next(
+            (i for i in range(len(messages) - 1, -1, -1) if message_role(messages[i]) == "user"),
+            None,
+        )
+        facts = []
+        if last_user is not None:
+            facts = self.service.retrieve(self.store, message_text(messages[last_user]))
+        self.last_facts = facts
+        if not facts and len(messages) == len(context.messages):
+            return
+
+        if facts:
+            memory = "\n".join([MEMORY_HEADER, *(f"- {fact}" for fact in facts)])
+            messages.insert(last_user, context.from_standard_message({"role": "user", "content": memory}))
+        # Google contexts keep the system prompt outside of the messages and reset it on set_messages
+        system = getattr(context, "system_message", None)
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        context.set_messages(messages)
@@ -0,0 +1,103 @@
+import os
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+TURN_MILESTONE_SECONDS = Histogram(
+    "agent_turn_milestone_seconds",
+    "Time from VAD end of speech until each milestone of the reply",
+    ["milestone", "provider", "model"],
+    buckets=LATENCY_BUCKETS,
+)
+TURN_STAGE_SECONDS = Histogram(
+    "agent_turn_stage_seconds",
+    "Time spent in each stage of a turn",
+    ["stage", "provider", "model"],
+    buckets=LATENCY_BUCKETS,
+)
+VOICE_TO_VOICE_SECONDS = Histogram(
+    "agent_voice_to_voice_seconds",
+    "Time from VAD end of speech until the first reply audio leaves the transport",
+    ["stt_provider", "llm_provider", "llm_model", "tts_provider", "tts_model"],
+    buckets=LATENCY_BUCKETS,
+)
+SERVICE_TTFB_SECONDS = Histogram(
+    "agent_service_ttfb_seconds",
+    "Time to first byte reported by the pipecat services",
+    ["service", "provider", "model"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_PROMPT_TOKENS = Counter(
+    "agent_llm_prompt_tokens_total",
+    "Prompt tokens sent to the LLM, by whether the provider served them from its prompt cache",
+    ["provider", "model", "cache"],
+)
+PROMPT_CACHE_EVENTS = Counter(
+    "agent_prompt_cache_events_total",
+    "Lifecycle events of provider-side prompt caches",
+    ["provider", "event"],
+)
+LLM_SPECULATIONS = Counter(
+    "agent_llm_speculations_total",
+    "Speculative LLM generations started on interim transcripts, by outcome",
+    ["outcome"],
+)
+LLM_SPECULATION_WASTED_TOKENS = Counter(
+    "agent_llm_speculation_wasted_tokens_total",
+    "Estimated tokens of speculative generations that were discarded",
+    ["kind"],
+)
+PROVIDER_FIRST_RESPONSE_SECONDS = Histogram(
+    "agent_provider_first_response_seconds",
+    "Time from request to first token (LLM) or first audio (TTS), per provider",
+    ["service", "provider"],
+    buckets=LATENCY_BUCKETS,
+)
+HEDGE_EVENTS = Counter(
+    "agent_hedge_events_total",
+    "Requests sent to the secondary provider (hedged, failover) and races it won",
+    ["service", "provider", "event"],
+)
+CIRCUIT_BREAKER_TRANSITIONS = Counter(
+    "agent_circuit_breaker_transitions_total",
+    "Circuit breaker state changes per provider",
+    ["service", "provider", "state"],
+)
+MEMORY_RETRIEVAL_SECONDS = Histogram(
+    "agent_memory_retrieval_seconds",
+    "Time to pick the memory facts injected for a user turn",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025),
+)
+TURNS_TOTAL = Counter(
+    "agent_turns_total",
+    "User turns by outcome",
+    ["outcome"],
+)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format.
+
+    In multi-worker mode (PROMETHEUS_MULTIPROC_DIR set) the samples of every
+    worker process are merged.
+
+    Returns:
+        tuple: The payload and its content type.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,39 @@
+from pipecat.services.google.llm import GoogleLLMService
+from pipecat.services.google.tts import GoogleTTSService
+
+from services.connection_pool_service import ConnectionPoolService
+
+# pipecat keeps the provider clients in private attributes. These subclasses,
+# and those of pooled_openai_service, are the only place that touches them:
+# they put the clients on the shared connection pool and know the cheap
+# request that opens a connection ahead of the first turn (`warm_up`, see
+# ConnectionPoolService.warm_up). Without a running pool they behave like
+# their pipecat base class.
+
+
+class PooledGoogleLLMService(GoogleLLMService):
+    """GoogleLLMService whose genai client uses the shared aiohttp session."""
+
+    def __init__(self, *, http_options=None, **kwargs):
+        super().__init__(
+            http_options=ConnectionPoolService.get_instance().gemini_http_options(http_options),
+            **kwargs,
+        )
+
+    @property
+    def client(self):
+        """The genai client, wrapped by the prompt cache (see add_prompt_cache)."""
+        return self._client
+
+    async def warm_up(self):
+        await self._client.aio.models.get(model=self.model_name)
+
+
+class PooledGoogleTTSService(GoogleTTSService):
+    """GoogleTTSService that can open its gRPC channel ahead of the first turn.
+
+    The channel is not an HTTP connection and is not shared between sessions.
+    """
+
+    async def warm_up(self):
+        await self._client.list_voices(language_code=self._settings.get("language"))
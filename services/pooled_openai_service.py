@@ -0,0 +1,34 @@
+from typing import Optional
+
+from pipecat.services.openai.llm import OpenAILLMService
+from pipecat.services.openai.tts import OpenAITTSService
+
+from services.connection_pool_service import ConnectionPoolService
+
+# See pooled_google_service: the only place touching the private clients.
+
+
+class PooledOpenAILLMService(OpenAILLMService):
+    """OpenAILLMService whose client uses the shared httpx client."""
+
+    def create_client(self, api_key=None, base_url=None, **kwargs):
+        return ConnectionPoolService.get_instance().openai_client(
+            api_key, base_url
+        ) or super().create_client(api_key=api_key, base_url=base_url, **kwargs)
+
+    async def warm_up(self):
+        await self._client.models.retrieve(self.model_name)
+
+
+class PooledOpenAITTSService(OpenAITTSService):
+    """OpenAITTSService whose client uses the shared httpx client."""
+
+    def __init__(self, *, api_key: Optional[str] = None, base_url: Optional[str] = None, **kwargs):
+        super().__init__(api_key=api_key, base_url=base_url, **kwargs)
+        # Unlike the LLM service it has no create_client hook
+        client = ConnectionPoolService.get_instance().openai_client(api_key, base_url)
+        if client is not None:
+            self._client = client
+
+    async def warm_up(self):
+        await self._client.models.retrieve(self.model_name)
@@ -0,0 +1,285 @@
+import asyncio
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from google.genai import errors as genai_errors
+from google.genai import types
+from loguru import logger
+
+from services.metrics_service import LLM_PROMPT_TOKENS, PROMPT_CACHE_EVENTS
+from services.rolling_memory_service import memory_hash
+from utils.transcript import estimate_tokens
+
+
+def prompt_cache_key(prompt_type: str, memory: Optional[str] = None) -> str:
+    """Key of a stable prompt prefix: the prompt type and the memory version in it."""
+    return f"{prompt_type}-{memory_hash(memory)}"
+
+
+@dataclass
+class GeminiCacheEntry:
+    name: str
+    expires_at: float
+
+
+class PromptCacheService:
+    """
+    Provider-side caching of the stable prompt prefix.
+
+    The system prompt (plus the user memory, once it is part of the prompt)
+    is identical on every turn. For Gemini it is registered as cached content
+    and requests reference it instead of re-sending it. OpenAI caches
+    prefixes automatically; its requests only carry a prompt_cache_key
+    (see ProvidersService) so turns sharing the prefix reach the same cache.
+
+    Gemini caches are keyed by model, prefix key and a hash of the prefix
+    text, shared by all sessions of the process, adopted from a previous run
+    or another worker when one with the same display name still exists, and
+    their TTL is extended while in use. Unused caches expire on their own.
+    """
+
+    _instance: Optional["PromptCacheService"] = None
+
+    def __init__(
+        self,
+        ttl: Optional[int] = None,
+        min_tokens: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ):
+        """
+        Args:
+            ttl (int): Lifetime of a Gemini cache in seconds, extended while used (PROMPT_CACHE_TTL).
+            min_tokens (int): Smaller prefixes are not cached, Gemini rejects them (PROMPT_CACHE_MIN_TOKENS).
+            retry_after (float): Seconds before retrying a prefix whose cache could not be created
+                (PROMPT_CACHE_RETRY_AFTER).
+        """
+        self.ttl = ttl or int(os.getenv("PROMPT_CACHE_TTL", "3600"))
+        self.min_tokens = min_tokens or int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))
+        self.retry_after = retry_after or float(os.getenv("PROMPT_CACHE_RETRY_AFTER", "60"))
+        self._entries: Dict[str, GeminiCacheEntry] = {}
+        self._failed_until: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @classmethod
+    def get_instance(cls) -> "PromptCacheService":
+        """Return the process-wide prompt cache registry."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def _display_name(model: str, key: str, prefix: str, with_message: bool) -> str:
+        digest = hashlib.sha256(prefix.encode()).hexdigest()[:12]
+        kind = "sm" if with_message else "s"
+        return f"comfortly-{model.split('/')[-1]}-{key}-{digest}-{kind}"
+
+    async def get_gemini_cache(
+        self, client, model: str, prefix: str, key: str, with_message: bool = False
+    ) -> Optional[str]:
+        """
+        Return the name of the cached content holding `prefix`, creating it if needed.
+
+        Args:
+            client: The genai.Client of the LLM service.
+            model (str): Model the cache is used with.
+            prefix (str): The system instruction to cache.
+            key (str): See prompt_cache_key.
+            with_message (bool): Also cache `prefix` as the first user message,
+                which is how pipecat starts a Google context that only had a
+                system message.
+
+        Returns:
+            str: The cached content name, or None to send the prefix uncached.
+        """
+        if estimate_tokens([prefix]) < self.min_tokens:
+            return None
+        display_name = self._display_name(model, key, prefix, with_message)
+        entry = self._entries.get(display_name)
+        if entry and entry.expires_at - time.time() > self.ttl / 4:
+            return entry.name
+        if self._failed_until.get(display_name, 0) > time.time():
+            return None
+
+        lock = self._locks.setdefault(display_name, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(display_name)
+            if entry and entry.expires_at - time.time() > self.ttl / 4:
+                return entry.name
+            try:
+                if entry:
+                    cached = await client.aio.caches.update(
+                        name=entry.name,
+                        config=types.UpdateCachedContentConfig(ttl=f"{self.ttl}s"),
+                    )
+                    event = "refreshed"
+                else:
+                    cached = await self._find(client, display_name)
+                    event = "adopted"
+                    if cached is None:
+                        cached = await client.aio.caches.create(
+                            model=model,
+                            config=types.CreateCachedContentConfig(
+                                display_name=display_name,
+                                system_instruction=prefix,
+                                contents=(
+                                    [prefix_message(prefix)] if with_message else None
+                                ),
+                                ttl=f"{self.ttl}s",
+                            ),
+                        )
+                        event = "created"
+            except Exception as e:
+                logger.warning(f"Failed to prepare Gemini prompt cache {display_name}: {e}")
+                PROMPT_CACHE_EVENTS.labels("google", "failed").inc()
+                self._entries.pop(display_name, None)
+                self._failed_until[display_name] = time.time() + self.retry_after
+                return None
+
+            PROMPT_CACHE_EVENTS.labels("google", event).inc()
+            expires_at = (
+                cached.expire_time.timestamp()
+                if cached.expire_time
+                else time.time() + self.ttl
+            )
+            self._entries[display_name] = GeminiCacheEntry(cached.name, expires_at)
+            logger.debug(f"Gemini prompt cache {display_name} {event}: {cached.name}")
+            return cached.name
+
+    async def _find(self, client, display_name: str):
+        """Look for a live cache with this display name, e.g. from another worker."""
+        pager = await client.aio.caches.list()
+        async for cached in pager:
+            if (
+                cached.display_name == display_name
+                and cached.expire_time
+                and cached.expire_time.timestamp() - time.time() > self.ttl / 4
+            ):
+                return cached
+        return None
+
+    def invalidate(self, model: str, key: str, prefix: str, with_message: bool = False):
+        """Forget a cache the provider no longer knows about."""
+        display_name = self._display_name(model, key, prefix, with_message)
+        if self._entries.pop(display_name, None):
+            PROMPT_CACHE_EVENTS.labels("google", "expired").inc()
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "gemini_caches": len(self._entries),
+            "gemini_caches_live": sum(
+                1 for entry in self._entries.values() if entry.expires_at > now
+            ),
+        }
+
+
+def prefix_message(prefix: str) -> types.Content:
+    return types.Content(role="user", parts=[types.Part(text=prefix)])
+
+
+def _is_prefix_message(content, prefix: str) -> bool:
+    return (
+        isinstance(content, types.Content)
+        and content.role == "user"
+        and len(content.parts or []) == 1
+        and content.parts[0].text == prefix
+    )
+
+
+def record_prompt_tokens(provider: str, model: str, prompt_tokens: int, cached_tokens: int):
+    LLM_PROMPT_TOKENS.labels(provider, model, "hit").inc(cached_tokens)
+    LLM_PROMPT_TOKENS.labels(provider, model, "miss").inc(max(0, prompt_tokens - cached_tokens))
+
+
+def add_prompt_cache(
+    llm,
+    prefix: str,
+    key: str,
+    service: Optional[PromptCacheService] = None,
+):
+    """
+    Cache the stable prompt prefix of a Gemini LLM service on the provider side.
+
+    The service's client is wrapped, so pipecat's request building stays
+    untouched: when a request's system instruction is `prefix`, it is
+    replaced by a reference to the cached content, together with a leading
+    user message repeating it if there is one. If the provider no longer
+    knows the cache, the request is retried uncached. The prompt tokens of
+    every response are counted as cache hits or misses
+    (agent_llm_prompt_tokens_total).
+
+    Gemini only caches prefixes of PROMPT_CACHE_MIN_TOKENS or more, smaller
+    ones are always sent uncached.
+
+    Args:
+        llm: A PooledGoogleLLMService instance.
+        prefix (str): The system prompt, including the user memory if any.
+        key (str): See prompt_cache_key.
+        service (PromptCacheService): Defaults to the process-wide registry.
+
+    Returns:
+        The same service instance.
+    """
+    service = service or PromptCacheService.get_instance()
+    client = llm.client
+    models = client.aio.models
+    generate_content_stream = models.generate_content_stream
+
+    async def cached_generate_content_stream(*, model, contents, config=None):
+        name = None
+        with_message = bool(contents) and _is_prefix_message(contents[0], prefix)
+        if (
+            config is not None
+            and config.system_instruction == prefix
+            and not config.tools
+            and not config.tool_config
+        ):
+            name = await service.get_gemini_cache(
+                client, model, prefix, key, with_message
+            )
+        response = None
+        if name:
+            # Cached content carries the system instruction, the request must not
+            cached_config = config.model_copy(
+                update={
+                    "system_instruction": None,
+                    "tools": None,
+                    "tool_config": None,
+                    "cached_content": name,
+                }
+            )
+            try:
+                response = await generate_content_stream(
+                    model=model,
+                    contents=contents[1:] if with_message else contents,
+                    config=cached_config,
+                )
+            except genai_errors.ClientError as e:
+                logger.warning(f"Gemini prompt cache {name} rejected, sending uncached: {e}")
+                service.invalidate(model, key, prefix, with_message)
+        if response is None:
+            response = await generate_content_stream(
+                model=model, contents=contents, config=config
+            )
+        return _count_gemini_usage(response, model)
+
+    models.generate_content_stream = cached_generate_content_stream
+    return llm
+
+
+async def _count_gemini_usage(response, model: str):
+    usage = None
+    async for chunk in response:
+        if chunk.usage_metadata:
+            usage = chunk.usage_metadata
+        yield chunk
+    if usage:
+        record_prompt_tokens(
+            "google",
+            model,
+            usage.prompt_token_count or 0,
+            usage.cached_content_token_count or 0,
+        )
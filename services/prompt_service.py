@@ -29,6 +29,7 @@
 #             prompt += user_context
 #         return prompt
 
+from models.memory import UserMemory
 from models.user import UserInfo
 from enum import Enum
 from typing import Optional, Dict, Any
@@ -270,8 +271,9 @@ class PromptService:
             if user_info.preferences:
                 user_context += f"- Communication preferences: {user_info.preferences}\n"
             
-            if user_info.context:
-                user_context += f"- Background context: {user_info.context}\n"
+            memory = UserMemory.parse(user_info.context).render()
+            if memory:
+                user_context += f"- Background context:\n{memory}\n"
             
             # Add personalization instructions
             user_context += (
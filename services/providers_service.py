@@ -2,17 +2,21 @@ import os
 from enum import Enum
 
 from loguru import logger
-from pipecat.audio.vad.silero import SileroVADAnalyzer
-from pipecat.services.openai.llm import OpenAILLMContext
+from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext
 from pipecat.transports.base_transport import TransportParams
-from pipecat.transports.network.small_webrtc import SmallWebRTCTransport
 
-# Import Daily modules conditionally
+# Provider SDKs and transports are imported when the first service using
+# them is created, so a process only loads what its configuration needs
 USE_DAILY = os.getenv("USE_DAILY", "").lower() == "true"
-if USE_DAILY:
-    from pipecat.transports.services.daily import DailyParams, DailyTransport
 
-from models.agent_model import AgentModel, LLMProvider, STTProvider, TTSProvider
+from models.agent_model import (
+    AgentModel,
+    AudioConfig,
+    LLMProvider,
+    STTProvider,
+    TTSProvider,
+)
+from utils.constants import DEFAULT_LLM_MODELS, DEFAULT_TTS_VOICES
 
 
 class Providers(Enum):
@@ -26,11 +30,11 @@ class ProvidersService:
     def getProviders(provider_type: Providers):
         """Return available providers for the given type."""
         if provider_type == Providers.LLM:
-            return ["google", "openai"]
+            return ["google", "openai", "simulated"]
         elif provider_type == Providers.TTS:
-            return ["google", "openai"]
+            return ["google", "openai", "simulated"]
         elif provider_type == Providers.STT:
-            return ["google", "deepgram"]
+            return ["google", "deepgram", "simulated"]
         return []
 
     @staticmethod
@@ -39,27 +43,97 @@ class ProvidersService:
         model_id: str,
         temperature: float = None,
         max_tokens: int = None,
+        cached_prefix: str = None,
+        prompt_cache_key: str = None,
     ):
-        """Create LLM service based on configuration"""
+        """Create LLM service based on configuration.
 
+        With `prompt_cache_key`, and unless PROMPT_CACHE_ENABLED=false,
+        OpenAI requests carry it as prompt_cache_key. Gemini caches
+        `cached_prefix` (the system prompt) as cached content only with
+        PROMPT_CACHE_GEMINI_ENABLED=true, it needs a prefix of at least
+        PROMPT_CACHE_MIN_TOKENS (see PromptCacheService).
+
+        With LLM_HEDGE_PROVIDER set, slow or failing requests are hedged on
+        that provider (LLM_HEDGE_MODEL): the returned HedgedLLMService owns
+        both services, each with its own prompt cache.
+        """
+        if os.getenv("PROMPT_CACHE_ENABLED", "true").lower() != "true":
+            prompt_cache_key = None
+        llm = ProvidersService._create_llm_service(
+            provider, model_id, temperature, max_tokens, prompt_cache_key
+        )
+        ProvidersService._add_prompt_cache(llm, provider, cached_prefix, prompt_cache_key)
+
+        hedge_provider = os.getenv("LLM_HEDGE_PROVIDER")
+        if hedge_provider:
+            from services.hedging_service import HedgedLLMService
+
+            hedge_provider = LLMProvider(hedge_provider)
+            secondary = ProvidersService._create_llm_service(
+                hedge_provider,
+                os.getenv("LLM_HEDGE_MODEL")
+                or (model_id if hedge_provider == provider else DEFAULT_LLM_MODELS[hedge_provider]),
+                temperature,
+                max_tokens,
+                prompt_cache_key,
+            )
+            ProvidersService._add_prompt_cache(
+                secondary, hedge_provider, cached_prefix, prompt_cache_key
+            )
+            llm = HedgedLLMService(
+                llm, LLMProvider(provider).value, secondary, hedge_provider.value
+            )
+        return llm
+
+    @staticmethod
+    def _add_prompt_cache(
+        llm, provider: LLMProvider, cached_prefix: str, prompt_cache_key: str
+    ):
+        if (
+            cached_prefix
+            and prompt_cache_key
+            and provider == LLMProvider.google
+            and os.getenv("PROMPT_CACHE_GEMINI_ENABLED", "false").lower() == "true"
+        ):
+            from services.prompt_cache_service import add_prompt_cache
+
+            add_prompt_cache(llm, cached_prefix, prompt_cache_key)
+
+    @staticmethod
+    def _create_llm_service(
+        provider: LLMProvider,
+        model_id: str,
+        temperature: float = None,
+        max_tokens: int = None,
+        prompt_cache_key: str = None,
+    ):
         if provider == LLMProvider.google:
-            from pipecat.services.google.llm import GoogleLLMService
+            from services.pooled_google_service import PooledGoogleLLMService
 
-            return GoogleLLMService(
+            return PooledGoogleLLMService(
                 model=model_id,
                 api_key=os.getenv("GOOGLE_API_KEY"),
                 temperature=temperature,
                 max_tokens=max_tokens,
             )
 
+        elif provider == LLMProvider.simulated:
+            from services.simulated_providers_service import SimulatedLLMService
+
+            return SimulatedLLMService(model=model_id)
+
         elif provider == LLMProvider.openai:
-            from pipecat.services.openai.llm import OpenAILLMService
+            from services.pooled_openai_service import PooledOpenAILLMService
 
-            return OpenAILLMService(
+            return PooledOpenAILLMService(
                 model=model_id,
                 api_key=os.getenv("OPENAI_API_KEY"),
                 temperature=temperature,
                 max_tokens=max_tokens,
+                params=PooledOpenAILLMService.InputParams(
+                    extra={"prompt_cache_key": prompt_cache_key} if prompt_cache_key else {}
+                ),
             )
 
         logger.warning(f"Unrecognized LLM provider {name}, using Google")
@@ -78,8 +152,21 @@ class ProvidersService:
         model_id: str = None,
         language: str = "en-US",
         alternative_languages: list = None,
+        sample_rate: int = None,
+        audio_passthrough: bool = False,
     ):
-        """Create STT service based on configuration"""
+        """Create STT service based on configuration.
+
+        Without `audio_passthrough` the input audio stops at the STT instead
+        of going through the rest of the pipeline, which does not use it.
+        """
+        if provider == STTProvider.simulated:
+            from services.simulated_providers_service import SimulatedSTTService
+
+            return SimulatedSTTService(
+                sample_rate=sample_rate, audio_passthrough=audio_passthrough
+            )
+
         from deepgram.clients.live import LiveOptions
         from pipecat.services.deepgram.stt import DeepgramSTTService
 
@@ -89,11 +176,14 @@ class ProvidersService:
             return GoogleSTTService(
                 credentials=os.getenv("GOOGLE_APPLICATION_CREDENTIALS"),
                 params=GoogleSTTService.InputParams(languages=alternative_languages),
+                sample_rate=sample_rate,
+                audio_passthrough=audio_passthrough,
             )
 
         return DeepgramSTTService(
             api_key=os.getenv("DEEPGRAM_API_KEY"),
-            audio_passthrough=True,
+            sample_rate=sample_rate,
+            audio_passthrough=audio_passthrough,
             live_options=LiveOptions(
                 filler_words=True,
                 smart_format=True,
@@ -111,31 +201,103 @@ class ProvidersService:
         model_id: str = None,
         voice_id: str = None,
         voice_instructions: str = None,
+        cached_phrases: list = None,
+        sample_rate: int = None,
     ):
-        """Create TTS service based on configuration"""
-        from pipecat.services.openai.tts import OpenAITTSService
+        """Create TTS service based on configuration.
+
+        `sample_rate` is the output rate of the pipeline (AudioConfig), which
+        providers that synthesize at any rate produce directly.
+
+        Unless TTS_CACHE_ENABLED=false, repeated phrases and `cached_phrases`
+        (e.g. the greeting) are served from the persistent TTS cache.
+
+        With TTS_HEDGE_PROVIDER set, slow or failing syntheses are hedged on
+        that provider (TTS_HEDGE_MODEL, TTS_HEDGE_VOICE): the returned
+        HedgedTTSService owns both services. Only the primary is cached, its
+        cache hits win every race and audio in the secondary's voice is
+        never stored.
+        """
+        tts = ProvidersService._create_tts_service(
+            provider, model_id, voice_id, voice_instructions, sample_rate
+        )
+        if tts and os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true":
+            from services.tts_cache_service import add_tts_cache
+
+            add_tts_cache(
+                tts,
+                provider=TTSProvider(provider).value,
+                model_id=model_id,
+                voice_id=voice_id,
+                voice_instructions=voice_instructions,
+                pinned=cached_phrases,
+            )
+
+        hedge_provider = os.getenv("TTS_HEDGE_PROVIDER")
+        if tts and hedge_provider:
+            from services.hedging_service import HedgedTTSService
+
+            hedge_provider = TTSProvider(hedge_provider)
+            same = hedge_provider == provider
+            secondary = ProvidersService._create_tts_service(
+                hedge_provider,
+                os.getenv("TTS_HEDGE_MODEL")
+                or (model_id if same else DEFAULT_TTS_VOICES[hedge_provider][0]),
+                os.getenv("TTS_HEDGE_VOICE")
+                or (voice_id if same else DEFAULT_TTS_VOICES[hedge_provider][1]),
+                voice_instructions,
+                sample_rate,
+            )
+            tts = HedgedTTSService(
+                tts,
+                TTSProvider(provider).value,
+                secondary,
+                hedge_provider.value,
+                sample_rate=sample_rate,
+            )
+        return tts
+
+    @staticmethod
+    def _create_tts_service(
+        provider: TTSProvider,
+        model_id: str = None,
+        voice_id: str = None,
+        voice_instructions: str = None,
+        sample_rate: int = None,
+    ):
+        from services.pooled_openai_service import PooledOpenAITTSService
+
+        if provider == TTSProvider.simulated:
+            from services.simulated_providers_service import SimulatedTTSService
+
+            return SimulatedTTSService(sample_rate=sample_rate)
 
         if provider == TTSProvider.openai:
-            return OpenAITTSService(
+            # Always labelled with the rate OpenAI produces, the output
+            # transport resamples when the pipeline runs at another one
+            return PooledOpenAITTSService(
                 model=model_id or "gpt-4o-mini-tts",
                 api_key=os.getenv("OPENAI_API_KEY"),
                 instructions=voice_instructions,
                 voice_id=voice_id,
+                sample_rate=PooledOpenAITTSService.OPENAI_SAMPLE_RATE,
             )
 
         else:
 
-            from pipecat.services.google.tts import GoogleTTSService
             from pipecat.services.openai.tts import OpenAITTSService
 
+            from services.pooled_google_service import PooledGoogleTTSService
+
             # If a voice_id is provided like "en-IN-Chirp-HD-F", extract language code ("en-IN")
             extracted_language = None
             if voice_id and "-" in voice_id:
                 extracted_language = "-".join(voice_id.split("-")[:2])
 
-                return GoogleTTSService(
+                return PooledGoogleTTSService(
                     voice_id=voice_id,
-                    params=GoogleTTSService.InputParams(
+                    sample_rate=sample_rate,
+                    params=PooledGoogleTTSService.InputParams(
                         language=extracted_language,
                         google_style="calm",
                     ),
@@ -153,19 +315,50 @@ class ProvidersService:
         return context
 
     @staticmethod
-    def get_small_webrtc_transport(webrtc_connection):
+    def get_vad_analyzer():
+        """Create the VAD analyzer used by the transports.
+
+        By default every analyzer shares one process-wide Silero model
+        (VAD_SHARED_ENGINE=false loads a model per session instead).
+        """
+        if os.getenv("VAD_SHARED_ENGINE", "true").lower() == "true":
+            from services.vad_engine_service import SharedSileroVADAnalyzer
+
+            return SharedSileroVADAnalyzer()
+        from pipecat.audio.vad.silero import SileroVADAnalyzer
+
+        return SileroVADAnalyzer()
+
+    @staticmethod
+    def get_audio_params(audio: AudioConfig = None, vad_analyzer=None) -> dict:
+        """Audio parameters of a transport, following the session's AudioConfig."""
+        audio = audio or AudioConfig()
+        return dict(
+            audio_in_enabled=True,
+            audio_out_enabled=True,
+            audio_in_sample_rate=audio.in_sample_rate,
+            audio_out_sample_rate=audio.out_sample_rate,
+            audio_out_10ms_chunks=audio.out_10ms_chunks,
+            vad_analyzer=vad_analyzer or ProvidersService.get_vad_analyzer(),
+        )
+
+    @staticmethod
+    def get_small_webrtc_transport(
+        webrtc_connection, vad_analyzer=None, audio: AudioConfig = None
+    ):
+        from pipecat.transports.network.small_webrtc import SmallWebRTCTransport
+
         return SmallWebRTCTransport(
             webrtc_connection=webrtc_connection,
             params=TransportParams(
-                audio_in_enabled=True,
-                audio_out_enabled=True,
-                vad_analyzer=SileroVADAnalyzer(),
-                audio_out_10ms_chunks=2,
+                **ProvidersService.get_audio_params(audio, vad_analyzer)
             ),
         )
 
     @staticmethod
-    def get_daily_transport(room_url: str, token: str):
+    def get_daily_transport(
+        room_url: str, token: str, vad_analyzer=None, audio: AudioConfig = None
+    ):
         """Get a Daily transport with the specified parameters.
 
         This will only work if USE_DAILY is set to true in the environment.
@@ -174,14 +367,11 @@ class ProvidersService:
             raise ValueError(
                 "Daily feature is not enabled. Set USE_DAILY=true to enable it."
             )
+        from pipecat.transports.services.daily import DailyParams, DailyTransport
 
         return DailyTransport(
             room_url,
             token,
             "Comfortly Agent",
-            DailyParams(
-                audio_in_enabled=True,
-                audio_out_enabled=True,
-                vad_analyzer=SileroVADAnalyzer(),
-            ),
+            DailyParams(**ProvidersService.get_audio_params(audio, vad_analyzer)),
         )
@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import os
+from typing import List, Optional, Tuple
+
+from loguru import logger
+
+from models.memory import MemoryOperation, UserMemory
+from services.user_memory_service import UserMemoryService
+
+
+def memory_hash(memory: Optional[str]) -> str:
+    """Short stable fingerprint of a memory document."""
+    return hashlib.sha256((memory or "").encode()).hexdigest()[:16]
+
+
+class RollingMemoryConsolidator:
+    """
+    Folds completed turns into memory operations while the session is live.
+
+    Every `batch_turns` finished turns are turned into add, update and remove
+    operations in the background with a fast model, and applied to a draft
+    the next batch is compared against. When the session ends only the turns
+    that were not folded yet (at most one or two batches) are left for the
+    final consolidation, so end-of-session work no longer grows with call
+    length. The operations, not the draft, are what gets queued.
+    """
+
+    def __init__(
+        self,
+        current_memory: Optional[str] = "",
+        batch_turns: Optional[int] = None,
+        model: Optional[str] = None,
+    ):
+        """
+        Args:
+            current_memory (str): The user's memory when the session started.
+            batch_turns (int): Turns folded per background merge (MEMORY_ROLLING_BATCH_TURNS).
+            model (str): Model used for background merges (MEMORY_ROLLING_MODEL).
+        """
+        self.base_memory = UserMemory.parse(current_memory)
+        self.draft = self.base_memory
+        self.operations: List[MemoryOperation] = []
+        self.batch_turns = batch_turns or int(
+            os.getenv("MEMORY_ROLLING_BATCH_TURNS", "6")
+        )
+        self.model = model or os.getenv("MEMORY_ROLLING_MODEL", "gemini-2.5-flash")
+        self.messages: List[dict] = []
+        # Number of messages already folded into the draft
+        self.consolidated = 0
+        self._fold_task: Optional[asyncio.Task] = None
+        self._memory_service: Optional[UserMemoryService] = None
+
+    def add_message(self, role: str, content: str):
+        """Record a finalized turn and start a background fold when a batch is complete."""
+        self.messages.append({"role": role, "content": content})
+
+        if role != "assistant" or (self._fold_task and not self._fold_task.done()):
+            return
+        pending = self.messages[self.consolidated :]
+        user_turns = sum(1 for message in pending if message["role"] == "user")
+        if user_turns >= self.batch_turns:
+            upto = len(self.messages)
+            self._fold_task = asyncio.create_task(self._fold(upto))
+
+    async def _fold(self, upto: int):
+        batch = self.messages[self.consolidated : upto]
+        try:
+            if self._memory_service is None:
+                self._memory_service = UserMemoryService()
+            operations = await asyncio.to_thread(
+                self._memory_service.create_memory_operations,
+                batch,
+                self.draft,
+                raise_errors=True,
+                model=self.model,
+                thinking_budget=0,
+            )
+            self.draft, applied, _ = self.draft.apply(operations)
+            self.operations.extend(applied)
+            self.consolidated = upto
+            logger.debug(
+                f"Folded {len(batch)} messages into {len(applied)} memory operations"
+            )
+        except Exception as e:
+            # The batch stays pending and is retried with the next one
+            logger.warning(f"Rolling memory fold failed: {e}")
+
+    async def finish(
+        self, timeout: Optional[float] = None
+    ) -> Tuple[List[MemoryOperation], List[dict]]:
+        """
+        Stop folding and return what is left for the final consolidation.
+
+        Args:
+            timeout (float): Seconds to wait for an in-flight fold (MEMORY_ROLLING_FINISH_TIMEOUT).
+
+        Returns:
+            tuple: The operations so far and the messages not folded into them yet.
+        """
+        if timeout is None:
+            timeout = float(os.getenv("MEMORY_ROLLING_FINISH_TIMEOUT", "2"))
+        if self._fold_task and not self._fold_task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(self._fold_task), timeout)
+            except asyncio.TimeoutError:
+                # Keep the previous operations, the batch goes into the tail instead
+                self._fold_task.cancel()
+        return list(self.operations), self.messages[self.consolidated :]
+
+    @property
+    def base_version(self) -> int:
+        """Version of the memory the operations were made against."""
+        return self.base_memory.version
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.operations) or self.consolidated < len(self.messages)
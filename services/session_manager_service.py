@@ -0,0 +1,301 @@
+import asyncio
+import os
+import random
+import time
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+
+class SessionState(str, Enum):
+    starting = "starting"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+    cancelled = "cancelled"
+
+
+ACTIVE_STATES = (SessionState.starting, SessionState.running)
+
+
+class CapacityError(Exception):
+    """Raised when a node has no room for another session."""
+
+
+class Session:
+    """A single agent session tracked by the SessionManager."""
+
+    def __init__(
+        self, session_id: str, kind: str, user_id: Optional[str], connection: Any = None
+    ):
+        self.id = session_id
+        self.kind = kind
+        self.user_id = user_id
+        self.connection = connection
+        self.task: Optional[asyncio.Task] = None
+        self.state = SessionState.starting
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.last_activity = time.monotonic()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.state in ACTIVE_STATES
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+    def to_dict(self) -> dict:
+        return {
+            "task_id": self.id,
+            "kind": self.kind,
+            "status": self.state.value,
+            "exception": self.error,
+            "created_at": self.created_at,
+            "idle_secs": round(time.monotonic() - self.last_activity, 1),
+        }
+
+
+class SessionManager:
+    """
+    Registry of the agent sessions running on this node.
+
+    Tracks each session through its state transitions, enforces a maximum
+    number of concurrent sessions and periodically reaps finished sessions
+    as well as sessions that have been idle for too long.
+
+    In multi-worker mode a node can ask to be recycled: after starting
+    `recycle_after` sessions it stops accepting new ones (draining) and the
+    front process restarts it once the last one has ended. It also measures
+    its event loop lag, which the front process uses for placement.
+    """
+
+    # Seconds between two event loop lag probes
+    LAG_PROBE_INTERVAL = 0.5
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        reap_interval: Optional[float] = None,
+        retention: Optional[float] = None,
+        retry_after: Optional[int] = None,
+        recycle_after: Optional[int] = None,
+    ):
+        """
+        Initialize the registry. Unset arguments are read from the environment.
+
+        Args:
+            max_sessions (int): Maximum concurrent sessions (MAX_SESSIONS).
+            idle_timeout (float): Seconds without activity before a session is cancelled (SESSION_IDLE_TIMEOUT).
+            reap_interval (float): Seconds between reaper runs (SESSION_REAP_INTERVAL).
+            retention (float): Seconds finished sessions stay visible in /status (SESSION_RETENTION).
+            retry_after (int): Retry-After value in seconds sent when full (SESSION_RETRY_AFTER).
+            recycle_after (int): Sessions started before the node drains for a restart (WORKER_RECYCLE_AFTER), 0 never.
+        """
+        self.max_sessions = max_sessions or int(os.getenv("MAX_SESSIONS", "50"))
+        self.idle_timeout = idle_timeout or float(
+            os.getenv("SESSION_IDLE_TIMEOUT", "900")
+        )
+        self.reap_interval = reap_interval or float(
+            os.getenv("SESSION_REAP_INTERVAL", "30")
+        )
+        self.retention = (
+            retention
+            if retention is not None
+            else float(os.getenv("SESSION_RETENTION", "300"))
+        )
+        self.retry_after = retry_after or int(os.getenv("SESSION_RETRY_AFTER", "5"))
+        recycle_after = (
+            recycle_after
+            if recycle_after is not None
+            else int(os.getenv("WORKER_RECYCLE_AFTER", "0"))
+        )
+        # Up to 10% more so workers started together do not all drain at once
+        self.recycle_after = round(recycle_after * random.uniform(1, 1.1))
+
+        self._sessions: Dict[str, Session] = {}
+        self._active = 0
+        self._started = 0
+        self.loop_lag_ms = 0.0
+        self._reaper: Optional[asyncio.Task] = None
+        self._lag_probe: Optional[asyncio.Task] = None
+
+    @property
+    def active_count(self) -> int:
+        return self._active
+
+    @property
+    def draining(self) -> bool:
+        """True once the node has started the sessions it may run before a restart."""
+        return 0 < self.recycle_after <= self._started
+
+    @property
+    def free_capacity(self) -> int:
+        if self.draining:
+            return 0
+        return max(0, self.max_sessions - self._active)
+
+    def has_capacity(self) -> bool:
+        return not self.draining and self._active < self.max_sessions
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> Optional[Session]:
+        return self._sessions.get(session_id)
+
+    def connections(self, kind: Optional[str] = None) -> List[Any]:
+        """Return the connections of active sessions, optionally filtered by kind."""
+        return [
+            s.connection
+            for s in self._sessions.values()
+            if s.active and s.connection and (kind is None or s.kind == kind)
+        ]
+
+    def register(
+        self,
+        session_id: str,
+        kind: str,
+        user_id: Optional[str] = None,
+        connection: Any = None,
+    ) -> Session:
+        """
+        Add a new session in the starting state.
+
+        Raises:
+            CapacityError: If the node already runs max_sessions sessions.
+        """
+        if self.draining:
+            raise CapacityError("Node is draining before a restart")
+        if not self.has_capacity():
+            raise CapacityError(
+                f"Session limit reached ({self._active}/{self.max_sessions})"
+            )
+        session = Session(session_id, kind, user_id, connection)
+        self._sessions[session_id] = session
+        self._active += 1
+        self._started += 1
+        return session
+
+    def attach_task(self, session_id: str, task: asyncio.Task):
+        """Bind the session to the task running its agent."""
+        session = self._sessions[session_id]
+        session.task = task
+        self.transition(session_id, SessionState.running)
+        task.add_done_callback(lambda t: self._on_task_done(session_id, t))
+
+    def transition(self, session_id: str, state: SessionState, error: Optional[str] = None):
+        """Move a session to a new state, keeping the active count in sync."""
+        session = self._sessions.get(session_id)
+        if session is None or session.state == state:
+            return
+        was_active = session.active
+        session.state = state
+        session.error = error
+        session.touch()
+        if was_active and not session.active:
+            self._active -= 1
+            session.finished_at = time.monotonic()
+            session.connection = None
+        logger.debug(f"Session {session_id} is now {state.value}")
+
+    def touch(self, session_id: str):
+        """Record activity so the session is not reaped as idle."""
+        session = self._sessions.get(session_id)
+        if session:
+            session.touch()
+
+    def cancel(self, session_id: str) -> bool:
+        """Cancel the session's task. Returns False if the session is unknown."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return False
+        if session.task and not session.task.done():
+            session.task.cancel()
+        else:
+            self.transition(session_id, SessionState.cancelled)
+        return True
+
+    def remove(self, session_id: str):
+        session = self._sessions.pop(session_id, None)
+        if session and session.active:
+            self._active -= 1
+
+    async def start(self):
+        """Start the periodic reaper and the event loop lag probe."""
+        self._reaper = asyncio.create_task(self._reap_loop())
+        self._lag_probe = asyncio.create_task(self._lag_loop())
+
+    async def stop(self):
+        """Stop the background tasks and cancel every session still running."""
+        for task in (self._reaper, self._lag_probe):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._reaper = None
+        self._lag_probe = None
+        for session_id in list(self._sessions):
+            self.cancel(session_id)
+
+    def status(self) -> dict:
+        counts = {state.value: 0 for state in SessionState}
+        for session in self._sessions.values():
+            counts[session.state.value] += 1
+        return {
+            "active_tasks": [s.to_dict() for s in self._sessions.values() if s.active],
+            "counts": counts,
+            "total_tasks": len(self._sessions),
+            **self.readiness(),
+        }
+
+    def readiness(self) -> dict:
+        return {
+            "ready": self.has_capacity(),
+            "max_sessions": self.max_sessions,
+            "active_sessions": self._active,
+            "free_capacity": self.free_capacity,
+            "sessions_started": self._started,
+            "draining": self.draining,
+            "loop_lag_ms": round(self.loop_lag_ms, 1),
+        }
+
+    def _on_task_done(self, session_id: str, task: asyncio.Task):
+        if task.cancelled():
+            self.transition(session_id, SessionState.cancelled)
+        elif task.exception():
+            self.transition(session_id, SessionState.failed, str(task.exception()))
+        else:
+            self.transition(session_id, SessionState.completed)
+
+    async def _lag_loop(self):
+        """Track how late the event loop wakes up, smoothed over a few seconds."""
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.LAG_PROBE_INTERVAL)
+            lag = (time.perf_counter() - start - self.LAG_PROBE_INTERVAL) * 1000
+            self.loop_lag_ms += 0.2 * (max(0.0, lag) - self.loop_lag_ms)
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                self.reap()
+            except Exception as e:
+                logger.error(f"Session reaper failed: {e}")
+
+    def reap(self):
+        """Drop finished sessions past retention and cancel idle ones."""
+        now = time.monotonic()
+        for session_id, session in list(self._sessions.items()):
+            if not session.active:
+                if now - session.finished_at >= self.retention:
+                    del self._sessions[session_id]
+            elif now - session.last_activity >= self.idle_timeout:
+                logger.info(f"Cancelling idle session {session_id}")
+                self.cancel(session_id)
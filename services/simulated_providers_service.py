@@ -0,0 +1,202 @@
+import asyncio
+import itertools
+import os
+import random
+from typing import AsyncGenerator, Dict, Optional
+
+import numpy as np
+from loguru import logger
+from pipecat.frames.frames import (
+    Frame,
+    LLMTextFrame,
+    TranscriptionFrame,
+    TTSAudioRawFrame,
+    TTSStartedFrame,
+    TTSStoppedFrame,
+)
+from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext
+from pipecat.services.openai.llm import OpenAILLMService
+from pipecat.services.stt_service import SegmentedSTTService
+from pipecat.services.tts_service import TTSService
+from pipecat.utils.time import time_now_iso8601
+
+from models.agent_model import SimulatedProfile
+from utils.transcript import estimate_tokens
+
+PROFILES: Dict[str, SimulatedProfile] = {
+    "fast": SimulatedProfile(
+        stt_latency_ms=80,
+        stt_ms_per_audio_second=10,
+        llm_ttfb_ms=250,
+        llm_tokens_per_second=150,
+        tts_ttfb_ms=120,
+        tts_realtime_factor=8.0,
+    ),
+    "typical": SimulatedProfile(),
+    "slow": SimulatedProfile(
+        stt_latency_ms=300,
+        stt_ms_per_audio_second=40,
+        llm_ttfb_ms=1200,
+        llm_tokens_per_second=40,
+        tts_ttfb_ms=450,
+        tts_realtime_factor=1.5,
+        jitter=0.4,
+    ),
+}
+
+TRANSCRIPTS = [
+    "I had a really long day at work today",
+    "I keep worrying about things I can not control",
+    "Can we talk about how I have been sleeping lately",
+    "I think I am starting to feel a little better",
+    "My friend said something that really hurt me",
+]
+
+REPLY_WORDS = (
+    "That sounds like a lot to carry. Thank you for telling me about it. "
+    "Take a slow breath with me and tell me what part of it feels heaviest "
+    "right now, and we can look at it together one small step at a time, "
+    "without any rush and without judging how you feel about it."
+).split()
+
+
+def get_simulated_profile() -> SimulatedProfile:
+    """
+    Return the profile selected by SIMULATED_PROFILE (fast, typical, slow).
+
+    Any field can be overridden with SIMULATED_<FIELD>, e.g. SIMULATED_LLM_TTFB_MS=800.
+    """
+    name = os.getenv("SIMULATED_PROFILE", "typical")
+    profile = PROFILES.get(name)
+    if profile is None:
+        logger.warning(f"Unknown simulated profile {name}, using typical")
+        profile = PROFILES["typical"]
+    overrides = {}
+    for field in SimulatedProfile.model_fields:
+        value = os.getenv(f"SIMULATED_{field.upper()}")
+        if value is not None:
+            overrides[field] = value
+    return SimulatedProfile(**{**profile.model_dump(), **overrides})
+
+
+def _delay(ms: float, profile: SimulatedProfile) -> float:
+    """Seconds to wait for a nominal delay in ms, with the profile's jitter applied."""
+    return max(0.0, ms * (1 + random.uniform(-profile.jitter, profile.jitter)) / 1000)
+
+
+class SimulatedSTTService(SegmentedSTTService):
+    """Returns a canned transcript for each VAD segment after a configurable delay."""
+
+    def __init__(self, profile: Optional[SimulatedProfile] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.profile = profile or get_simulated_profile()
+        self.set_model_name("simulated")
+        self._transcripts = itertools.cycle(TRANSCRIPTS)
+
+    def can_generate_metrics(self) -> bool:
+        return True
+
+    async def run_stt(self, audio: bytes) -> AsyncGenerator[Frame, None]:
+        # 16-bit mono WAV, minus the 44 byte header
+        seconds = max(0, len(audio) - 44) / 2 / self.sample_rate
+        await self.start_ttfb_metrics()
+        await asyncio.sleep(
+            _delay(
+                self.profile.stt_latency_ms
+                + self.profile.stt_ms_per_audio_second * seconds,
+                self.profile,
+            )
+        )
+        await self.stop_ttfb_metrics()
+        yield TranscriptionFrame(next(self._transcripts), "", time_now_iso8601())
+
+
+class SimulatedLLMService(OpenAILLMService):
+    """
+    Streams a canned reply with the profile's time to first token and token rate.
+
+    The time to first token grows with the prompt length
+    (llm_ms_per_1k_prompt_tokens).
+    """
+
+    def __init__(
+        self,
+        model: str = "simulated",
+        profile: Optional[SimulatedProfile] = None,
+        **kwargs,
+    ):
+        super().__init__(model=model, api_key="simulated", **kwargs)
+        self.profile = profile or get_simulated_profile()
+
+    async def _process_context(self, context: OpenAILLMContext):
+        await self.start_ttfb_metrics()
+        # Prefill grows with the prompt, like it does for the real providers
+        prompt_tokens = estimate_tokens(context.get_messages())
+        await asyncio.sleep(
+            _delay(
+                self.profile.llm_ttfb_ms
+                + self.profile.llm_ms_per_1k_prompt_tokens * prompt_tokens / 1000,
+                self.profile,
+            )
+        )
+        await self.stop_ttfb_metrics()
+
+        words = REPLY_WORDS[: self.profile.llm_reply_words]
+        interval = 1 / self.profile.llm_tokens_per_second
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(interval)
+            await self.push_frame(LLMTextFrame(word if i == 0 else " " + word))
+
+
+class SimulatedTTSService(TTSService):
+    """
+    Produces a voiced hum as long as the text would take to say.
+
+    Audio is generated tts_realtime_factor times faster than it plays, after
+    the profile's time to first byte.
+    """
+
+    WORDS_PER_SECOND = 2.5
+    CHUNK_MS = 40
+
+    def __init__(self, profile: Optional[SimulatedProfile] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.profile = profile or get_simulated_profile()
+        self.set_model_name("simulated")
+        self._hum: Optional[bytes] = None
+
+    def can_generate_metrics(self) -> bool:
+        return True
+
+    def _hum_for(self, sample_rate: int) -> bytes:
+        # One second of audio, built once and looped. Stored twice so any
+        # chunk starting inside the first second can be sliced without copying.
+        if self._hum is None:
+            t = np.arange(sample_rate) / sample_rate
+            envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+            signal = 0.2 * envelope * np.sin(2 * np.pi * 180 * t)
+            self._hum = (signal * 32767).astype(np.int16).tobytes() * 2
+        return self._hum
+
+    async def run_tts(self, text: str) -> AsyncGenerator[Frame, None]:
+        await self.start_ttfb_metrics()
+        await asyncio.sleep(_delay(self.profile.tts_ttfb_ms, self.profile))
+        yield TTSStartedFrame()
+
+        hum = self._hum_for(self.sample_rate)
+        seconds = max(1, len(text.split())) / self.WORDS_PER_SECOND
+        chunk = self.sample_rate * 2 * self.CHUNK_MS // 1000
+        total = int(self.sample_rate * 2 * seconds) // 2 * 2
+        offset = 0
+        while offset < total:
+            size = min(chunk, total - offset)
+            start = offset % (len(hum) // 2)
+            audio = hum[start : start + size]
+            await self.stop_ttfb_metrics()
+            yield TTSAudioRawFrame(audio, self.sample_rate, 1)
+            offset += size
+            await asyncio.sleep(
+                self.CHUNK_MS / 1000 / self.profile.tts_realtime_factor
+            )
+        yield TTSStoppedFrame()
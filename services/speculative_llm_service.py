@@ -0,0 +1,246 @@
+import asyncio
+import copy
+import os
+import re
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from loguru import logger
+from pipecat.frames.frames import (
+    Frame,
+    InterimTranscriptionFrame,
+    LLMTextFrame,
+    TranscriptionFrame,
+)
+from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from services.metrics_service import LLM_SPECULATION_WASTED_TOKENS, LLM_SPECULATIONS
+from utils.transcript import estimate_tokens, message_role, message_text
+
+_NOT_WORD = re.compile(r"[^\w\s']")
+
+# Set inside a speculative generation, whose frames are buffered instead of pushed
+_current_speculation: ContextVar[Optional["Speculation"]] = ContextVar(
+    "speculation", default=None
+)
+
+
+def normalize_transcript(text: str) -> str:
+    """Lowercase words only, so punctuation added to the final transcript still matches."""
+    return " ".join(_NOT_WORD.sub(" ", text.lower()).split())
+
+
+@dataclass
+class Speculation:
+    text: str
+    turn: int
+    context: OpenAILLMContext
+    prompt_tokens: int
+    frames: asyncio.Queue = field(default_factory=asyncio.Queue)
+    task: Optional[asyncio.Task] = None
+    completion: str = ""
+    failed: bool = False
+
+
+class SpeculativeLLMProcessor(FrameProcessor):
+    """
+    Starts the LLM reply on interim transcripts, before the user turn ends.
+
+    Sits right after the STT (and transcript.user()), ahead of the user
+    context aggregator, and wraps the LLM service's _process_context. Once
+    the transcript of the current turn (final segments plus the latest
+    interim) has not changed for `stable_ms`, a generation is started in the
+    background on a copy of the context with that text as the user message.
+    Its frames are buffered, nothing reaches the TTS yet.
+
+    When the user aggregator then sends the real context, its last user
+    message is compared to the speculated text. If they match the buffered
+    frames are replayed and the rest of the generation is streamed through,
+    so the LLM's time to first token overlaps the VAD stop delay. If the
+    transcript changed in the meantime the speculation is cancelled and,
+    once the new text is stable, started again; a speculation that does not
+    match the final context is dropped and the LLM runs as usual.
+
+    Outcomes and the tokens spent on discarded speculations are counted in
+    agent_llm_speculations_total and agent_llm_speculation_wasted_tokens_total.
+    """
+
+    def __init__(
+        self,
+        llm,
+        context: OpenAILLMContext,
+        stable_ms: Optional[float] = None,
+        min_words: Optional[int] = None,
+        prepare_context: Optional[Callable[[OpenAILLMContext], None]] = None,
+        **kwargs,
+    ):
+        """
+        Args:
+            llm: The LLM service of the pipeline, wrapped in place.
+            context (OpenAILLMContext): The context shared with the context aggregator.
+            stable_ms (float): How long the transcript must stay unchanged before
+                speculating (LLM_SPECULATION_STABLE_MS).
+            min_words (int): Shorter transcripts are not speculated on (LLM_SPECULATION_MIN_WORDS).
+            prepare_context (Callable): Applied to the speculative context, like the processors
+                between the user aggregator and the LLM apply to the real one.
+        """
+        super().__init__(**kwargs)
+        self.llm = llm
+        self.context = context
+        self.stable_ms = stable_ms or float(os.getenv("LLM_SPECULATION_STABLE_MS", "500"))
+        self.min_words = min_words or int(os.getenv("LLM_SPECULATION_MIN_WORDS", "3"))
+        self.prepare_context = prepare_context
+        self.outcomes = {"hit": 0, "miss": 0, "cancelled": 0, "failed": 0}
+        self._finals: List[str] = []
+        self._interim = ""
+        self._candidate = ""
+        self._turn = 0
+        self._generating = False
+        self._speculation: Optional[Speculation] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._wrap_llm()
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, InterimTranscriptionFrame):
+            self._interim = frame.text
+            self._on_transcript()
+        elif isinstance(frame, TranscriptionFrame) and frame.text.strip():
+            # The user aggregator joins final segments the same way
+            self._finals.append(frame.text)
+            self._interim = ""
+            self._on_transcript()
+
+        await self.push_frame(frame, direction)
+
+    def _on_transcript(self):
+        candidate = " ".join(self._finals + ([self._interim] if self._interim else []))
+        if normalize_transcript(candidate) == normalize_transcript(self._candidate):
+            return
+        self._candidate = candidate
+        if self._speculation:
+            speculation, self._speculation = self._speculation, None
+            self._discard(speculation, "cancelled")
+        if self._timer:
+            self._timer.cancel()
+        self._timer = asyncio.create_task(self._speculate_when_stable(candidate))
+
+    async def _speculate_when_stable(self, text: str):
+        await asyncio.sleep(self.stable_ms / 1000)
+        self._timer = None
+        if self._generating or len(text.split()) < self.min_words:
+            return
+        context = copy.copy(self.context)
+        context._messages = list(self.context._messages)
+        context.add_messages([{"role": "user", "content": text}])
+        if self.prepare_context:
+            self.prepare_context(context)
+        messages = context.get_messages_for_persistent_storage()
+        system = getattr(context, "system_message", None)
+        speculation = Speculation(
+            text=text,
+            turn=self._turn,
+            context=context,
+            prompt_tokens=estimate_tokens(messages + ([system] if system else [])),
+        )
+        speculation.task = asyncio.create_task(self._run(speculation))
+        self._speculation = speculation
+        logger.debug(f"Speculating on: {text}")
+
+    async def _run(self, speculation: Speculation):
+        _current_speculation.set(speculation)
+        try:
+            await self._llm_process_context(speculation.context)
+        except Exception as e:
+            logger.warning(f"Speculative generation failed: {e}")
+            speculation.failed = True
+        finally:
+            speculation.frames.put_nowait(None)
+
+    def _wrap_llm(self):
+        self._llm_process_context = self.llm._process_context
+        push_frame = self.llm.push_frame
+
+        async def speculative_push_frame(
+            frame: Frame, direction: FrameDirection = FrameDirection.DOWNSTREAM
+        ):
+            speculation = _current_speculation.get()
+            if speculation is None:
+                await push_frame(frame, direction)
+                return
+            if isinstance(frame, LLMTextFrame):
+                speculation.completion += frame.text
+            speculation.frames.put_nowait((frame, direction))
+
+        async def speculative_process_context(context: OpenAILLMContext):
+            speculation, self._speculation = self._speculation, None
+            turn, self._turn = self._turn, self._turn + 1
+            self._finals, self._interim, self._candidate = [], "", ""
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+            self._generating = True
+            try:
+                if speculation and self._matches(speculation, context, turn):
+                    if await self._replay(speculation, push_frame):
+                        return
+                elif speculation:
+                    self._discard(speculation, "miss")
+                await self._llm_process_context(context)
+            finally:
+                self._generating = False
+
+        self.llm.push_frame = speculative_push_frame
+        self.llm._process_context = speculative_process_context
+
+    @staticmethod
+    def _matches(speculation: Speculation, context: OpenAILLMContext, turn: int) -> bool:
+        if speculation.turn != turn:
+            return False
+        messages = context.get_messages_for_persistent_storage()
+        if not messages or message_role(messages[-1]) != "user":
+            return False
+        return normalize_transcript(message_text(messages[-1])) == normalize_transcript(
+            speculation.text
+        )
+
+    async def _replay(self, speculation: Speculation, push_frame) -> bool:
+        """Push the speculative frames for real. False if it failed before producing text."""
+        try:
+            while True:
+                item = await speculation.frames.get()
+                if item is None:
+                    break
+                await push_frame(*item)
+        finally:
+            if not speculation.task.done():
+                speculation.task.cancel()
+        if speculation.failed and not speculation.completion:
+            self._count(speculation, "failed")
+            return False
+        self._count(speculation, "hit")
+        return True
+
+    def _discard(self, speculation: Speculation, outcome: str):
+        speculation.task.cancel()
+        self._count(speculation, outcome)
+        LLM_SPECULATION_WASTED_TOKENS.labels("prompt").inc(speculation.prompt_tokens)
+        LLM_SPECULATION_WASTED_TOKENS.labels("completion").inc(
+            len(speculation.completion) // 4
+        )
+
+    def _count(self, speculation: Speculation, outcome: str):
+        self.outcomes[outcome] += 1
+        LLM_SPECULATIONS.labels(outcome).inc()
+        logger.debug(f"Speculation {outcome}: {speculation.text}")
+
+    async def cleanup(self):
+        await super().cleanup()
+        if self._timer:
+            self._timer.cancel()
+        if self._speculation:
+            self._speculation.task.cancel()
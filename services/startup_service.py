@@ -0,0 +1,75 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+class StartupService:
+    """
+    Background warm-up of a server process, with its liveness and readiness.
+
+    The server binds its port right away and runs the slow part of its
+    startup (pipecat and provider SDK imports, the memory queue, the agent
+    pool and its VAD model) as warm-up steps afterwards. The process is live
+    as long as no step has failed, and ready once all steps have finished.
+    """
+
+    _instance: Optional["StartupService"] = None
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.ready = False
+        self.error: Optional[str] = None
+        self.ready_ms: Optional[int] = None
+        # Duration of each finished step in ms, in order
+        self.steps: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def get_instance(cls) -> "StartupService":
+        """Return the process-wide startup state."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @property
+    def live(self) -> bool:
+        return self.error is None
+
+    def start(self, steps: List[Tuple[str, Callable[[], Awaitable]]]):
+        """Run the (name, coroutine function) steps one after another in the background."""
+        self.started_at = time.monotonic()
+        self._task = asyncio.create_task(self._run(steps))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, steps: List[Tuple[str, Callable[[], Awaitable]]]):
+        for name, step in steps:
+            start = time.perf_counter()
+            try:
+                await step()
+            except Exception as e:
+                self.error = f"{name}: {e}"
+                logger.error(f"Warm-up step {name} failed: {e}")
+                return
+            self.steps[name] = round((time.perf_counter() - start) * 1000)
+        self.ready = True
+        self.ready_ms = round((time.monotonic() - self.started_at) * 1000)
+        logger.info(f"Warm-up finished in {self.ready_ms}ms: {self.steps}")
+
+    def stats(self) -> dict:
+        return {
+            "live": self.live,
+            "ready": self.ready,
+            "error": self.error,
+            "ready_ms": self.ready_ms,
+            "steps_ms": self.steps,
+        }
@@ -1,14 +1,42 @@
+import hashlib
 import os
+import time
+from typing import Optional
 
 from jose import jwt
 from jose.exceptions import JWTError as InvalidTokenError
 
+from utils.cache import TTLCache
+
 
 class TokenService:
+    """
+    Verifies Supabase JWTs.
+
+    Verified payloads are cached by token digest until the token expires, and
+    rejected tokens are remembered for TOKEN_NEGATIVE_TTL seconds, so a client
+    reconnecting or renegotiating with the same token skips the HMAC check.
+    """
+
+    _secret_key: Optional[str] = None
+    token_cache = TTLCache(
+        max_size=int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+        ttl=float(os.getenv("TOKEN_CACHE_TTL", "3600")),
+    )
+    negative_ttl = float(os.getenv("TOKEN_NEGATIVE_TTL", "10"))
+
     def __init__(self):
-        self.secret_key = os.getenv(
+        if TokenService._secret_key is None:
+            TokenService.load_secret_key()
+        self.secret_key = TokenService._secret_key
+
+    @classmethod
+    def load_secret_key(cls):
+        """Read JWT_SECRET_KEY from the environment. Called once at startup."""
+        cls._secret_key = os.getenv(
             "JWT_SECRET_KEY",
         )
+        cls.token_cache.clear()
 
     def verify_token(self, token):
         """
@@ -23,12 +51,33 @@ class TokenService:
         Raises:
             InvalidTokenError: If the token is invalid or verification fails.
         """
+        digest = hashlib.sha256(token.encode()).digest()
+        cached = self.token_cache.get(digest)
+        if cached is not None:
+            valid, result = cached
+            if valid:
+                return dict(result)
+            raise InvalidTokenError(result)
+
         try:
             # Decode the token using the secret key
             payload = jwt.decode(
                 token, self.secret_key, audience="authenticated", algorithms=["HS256"]
             )
-            return payload
         except InvalidTokenError as e:
-            # Raise an error if the token is invalid
-            raise InvalidTokenError(f"Invalid token: {e}")
+            # Remember the rejection briefly, then raise an error
+            message = f"Invalid token: {e}"
+            self.token_cache.set(digest, (False, message), ttl=self.negative_ttl)
+            raise InvalidTokenError(message)
+
+        # Keep the payload until the token expires
+        ttl = None
+        if isinstance(payload.get("exp"), (int, float)):
+            ttl = min(payload["exp"] - time.time(), self.token_cache.ttl)
+        self.token_cache.set(digest, (True, payload), ttl=ttl)
+        return dict(payload)
+
+    @classmethod
+    def cache_stats(cls) -> dict:
+        """Return hit/miss counters of the verified-token cache."""
+        return cls.token_cache.stats()
@@ -0,0 +1,294 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+# Journal operations, in the order they are queued
+OPEN = "open"
+TURN = "turn"
+CLOSE = "close"
+
+
+class TranscriptJournalService:
+    """
+    Append-only journal of the finalized turns of every live session.
+
+    Until a session's transcript is handed to the memory queue it only lives
+    in the session's memory, so a crash, an OOM kill or a shutdown that
+    cancels the session loses the conversation and its memory update. Each
+    session's turns are therefore also appended to the journal, a series of
+    local segment files (`<seq>.jsonl`, a new one every `segment_bytes`)
+    shared by the sessions of the process, each record tagged with its
+    session. Once a session's consolidation is queued its journal is closed,
+    and segments are deleted, oldest first, when all their sessions are
+    closed. Sessions still open in the segments found at startup never got
+    that far and are fed to the memory queue by `recover`.
+
+    Appends only put the turn on a bounded in-memory queue. A single writer
+    task writes the queued records in batches off the event loop with one
+    fsync per batch, every `fsync_interval` seconds at most, which bounds
+    the turns a crash can lose. When the queue is full, turns are dropped
+    rather than holding up the pipeline.
+
+    Each worker process journals into its own directory (by WORKER_INDEX),
+    so recovery never picks up the live sessions of another worker.
+    """
+
+    _instance: Optional["TranscriptJournalService"] = None
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        fsync_interval: Optional[float] = None,
+        max_pending: Optional[int] = None,
+        segment_bytes: Optional[int] = None,
+    ):
+        """
+        Initialize the journal. Unset arguments are read from the environment.
+
+        Args:
+            directory (str): Directory of the segment files (JOURNAL_DIR, per worker below it).
+            fsync_interval (float): Seconds between two batches (JOURNAL_FSYNC_INTERVAL).
+            max_pending (int): Records buffered before turns are dropped (JOURNAL_MAX_PENDING).
+            segment_bytes (int): Size at which the journal moves to a new segment (JOURNAL_SEGMENT_BYTES).
+        """
+        self.directory = directory or os.path.join(
+            os.getenv("JOURNAL_DIR", "data/journal"),
+            f"worker-{os.getenv('WORKER_INDEX', '0')}",
+        )
+        self.fsync_interval = (
+            fsync_interval
+            if fsync_interval is not None
+            else float(os.getenv("JOURNAL_FSYNC_INTERVAL", "0.2"))
+        )
+        self.max_pending = max_pending or int(os.getenv("JOURNAL_MAX_PENDING", "10000"))
+        self.segment_bytes = segment_bytes or int(
+            os.getenv("JOURNAL_SEGMENT_BYTES", str(1024 * 1024))
+        )
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending)
+        self._write_lock = threading.Lock()
+        self._writer: Optional[asyncio.Task] = None
+        # Current segment, and the still open sessions with records in each segment
+        self._seq = 0
+        self._file = None
+        self._size = 0
+        self._segments: Dict[int, Set[str]] = {}
+        self._open: Set[str] = set()
+
+        # Metrics
+        self.appended = 0
+        self.dropped = 0
+        self.batches = 0
+        self.fsyncs = 0
+        self.recovered = 0
+
+    @classmethod
+    def get_instance(cls) -> "TranscriptJournalService":
+        """Return the process-wide journal."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def enabled() -> bool:
+        return os.getenv("JOURNAL_ENABLED", "true").lower() == "true"
+
+    async def start(self):
+        """Start the writer on a new segment, after the ones left by a previous run."""
+        existing = self._segment_numbers()
+        self._seq = existing[-1] + 1 if existing else 0
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def stop(self):
+        """Write what is still queued and close the segment. Open sessions stay for recovery."""
+        if self._writer:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        await asyncio.to_thread(self._write_batch, self._drain())
+        with self._write_lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def open_session(self, session_id: str, user_id: str):
+        """Start the journal of a session."""
+        self._put((OPEN, session_id, {"user_id": user_id, "started_at": time.time()}))
+
+    def append(self, session_id: str, role: str, content: str):
+        """Queue a finalized turn, never waits."""
+        if self._put((TURN, session_id, {"role": role, "content": content, "ts": time.time()})):
+            self.appended += 1
+
+    def close_session(self, session_id: str):
+        """Close the journal of a session whose transcript reached the memory queue."""
+        self._put((CLOSE, session_id, {}))
+
+    def _put(self, operation: Tuple[str, str, dict]) -> bool:
+        try:
+            self._queue.put_nowait(operation)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"Transcript journal full, dropped a {operation[0]} of session {operation[1]}")
+            return False
+
+    def _drain(self) -> List[Tuple[str, str, dict]]:
+        batch = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _write_loop(self):
+        while True:
+            batch = [await self._queue.get()]
+            batch.extend(self._drain())
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                logger.error(f"Transcript journal write failed: {e}")
+            # Records arriving meanwhile go into the next batch
+            await asyncio.sleep(self.fsync_interval)
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:08d}.jsonl")
+
+    def _segment_numbers(self) -> List[int]:
+        return sorted(
+            int(name.split(".")[0])
+            for name in os.listdir(self.directory)
+            if name.endswith(".jsonl")
+        )
+
+    def _write_batch(self, batch: List[Tuple[str, str, dict]]):
+        """Append the records in order with a single fsync, then drop the segments no longer needed."""
+        if not batch:
+            return
+        with self._write_lock:
+            created = self._file is None
+            if created:
+                self._file = open(self._path(self._seq), "ab")
+                self._segments[self._seq] = set()
+            closed = False
+            for operation, session_id, record in batch:
+                if operation == OPEN:
+                    self._open.add(session_id)
+                elif session_id not in self._open:
+                    # Records of a session that was closed, or whose open was dropped
+                    continue
+                if self._size >= self.segment_bytes:
+                    self._sync()
+                    self._file.close()
+                    self._seq += 1
+                    self._file = open(self._path(self._seq), "ab")
+                    self._segments[self._seq] = set()
+                    self._size = 0
+                    created = True
+                line = (
+                    json.dumps({"op": operation, "session_id": session_id, **record}, ensure_ascii=False)
+                    + "\n"
+                ).encode()
+                self._file.write(line)
+                self._size += len(line)
+                if operation == CLOSE:
+                    self._open.discard(session_id)
+                    for sessions in self._segments.values():
+                        sessions.discard(session_id)
+                    closed = True
+                else:
+                    self._segments[self._seq].add(session_id)
+            self._sync()
+            if created:
+                # Make the new file names themselves durable
+                fd = os.open(self.directory, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            if closed:
+                self._truncate()
+            self.batches += 1
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.fsyncs += 1
+
+    def _truncate(self):
+        # Oldest first, so a close record never outlives the records it closes
+        for seq in sorted(self._segments):
+            if seq == self._seq or self._segments[seq]:
+                break
+            os.remove(self._path(seq))
+            del self._segments[seq]
+
+    def read_orphans(self) -> List[dict]:
+        """
+        Read the sessions left open in the segments on disk, as {"session_id", "user_id", "messages"}.
+
+        A last record cut short by the crash is skipped.
+        """
+        sessions: Dict[str, dict] = {}
+        for seq in self._segment_numbers():
+            with open(self._path(seq), "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    session_id = record["session_id"]
+                    if record["op"] == OPEN:
+                        sessions[session_id] = {
+                            "session_id": session_id,
+                            "user_id": record["user_id"],
+                            "messages": [],
+                        }
+                    elif record["op"] == CLOSE:
+                        sessions.pop(session_id, None)
+                    elif session_id in sessions:
+                        sessions[session_id]["messages"].append(
+                            {"role": record["role"], "content": record["content"]}
+                        )
+        return list(sessions.values())
+
+    async def recover(self, enqueue: Callable[..., Awaitable]):
+        """
+        Hand the transcripts of sessions that ended without queuing their consolidation to `enqueue`.
+
+        Called at startup, before `start`. The segments are deleted once
+        every orphan has been queued.
+
+        Args:
+            enqueue (Callable): MemoryQueueService.enqueue or a coroutine function with its signature.
+        """
+        orphans = await asyncio.to_thread(self.read_orphans)
+        for orphan in orphans:
+            if orphan["messages"]:
+                # The session's watermark drops turns an earlier job already covered
+                await enqueue(orphan["user_id"], orphan["messages"], session_id=orphan["session_id"])
+                self.recovered += 1
+        for seq in self._segment_numbers():
+            os.remove(self._path(seq))
+        if orphans:
+            logger.info(f"Recovered {self.recovered} transcripts from the journal")
+
+    def stats(self) -> dict:
+        return {
+            "open_sessions": len(self._open),
+            "segments": len(self._segments),
+            "pending": self._queue.qsize(),
+            "appended": self.appended,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "fsyncs": self.fsyncs,
+            "recovered": self.recovered,
+        }
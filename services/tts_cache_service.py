@@ -0,0 +1,436 @@
+import asyncio
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import AsyncGenerator, Iterable, List, Optional, Tuple
+
+from loguru import logger
+from pipecat.frames.frames import (
+    EndFrame,
+    ErrorFrame,
+    Frame,
+    StartFrame,
+    TTSAudioRawFrame,
+    TTSStartedFrame,
+    TTSStoppedFrame,
+)
+from pipecat.services.tts_service import TTSService
+
+from services.hedging_service import HedgedTTSService
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tts_entries (
+    key TEXT PRIMARY KEY,
+    blocks TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    sample_rate INTEGER NOT NULL,
+    num_channels INTEGER NOT NULL,
+    checksum INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tts_entries_lru ON tts_entries (last_used);
+CREATE TABLE IF NOT EXISTS tts_meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Seconds of audio per frame when replaying a cached phrase
+CHUNK_SECONDS = 0.2
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and unicode variants so equivalent phrases share an entry."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def cache_key(
+    provider: str,
+    model_id: Optional[str],
+    voice_id: Optional[str],
+    voice_instructions: Optional[str],
+    text: str,
+) -> str:
+    parts = [provider, model_id or "", voice_id or "", voice_instructions or "", normalize_text(text)]
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+class TTSCacheService:
+    """
+    Persistent cache of synthesized speech.
+
+    PCM audio lives in a fixed-size segment file that is memory-mapped and
+    split into blocks; an SQLite index maps each phrase to its blocks. When
+    the file is full the least recently used phrases are evicted. Several
+    worker processes can share the same files: allocations happen inside
+    SQLite write transactions, and every read is checked against the stored
+    checksum so a phrase evicted by another process mid-read is a miss.
+
+    Only pinned phrases (e.g. the greeting) and phrases synthesized at least
+    `min_repeats` times in this process are stored, so one-off LLM replies
+    never reach the disk.
+    """
+
+    _instance: Optional["TTSCacheService"] = None
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        size_mb: Optional[int] = None,
+        block_kb: Optional[int] = None,
+        min_repeats: Optional[int] = None,
+        max_chars: Optional[int] = None,
+    ):
+        """
+        Open or create the cache. Unset arguments are read from the environment.
+
+        Args:
+            path (str): Segment file, the index is stored next to it (TTS_CACHE_PATH).
+            size_mb (int): Size of the segment file in MB (TTS_CACHE_SIZE_MB).
+            block_kb (int): Allocation unit in KB (TTS_CACHE_BLOCK_KB).
+            min_repeats (int): Syntheses of a phrase before it is stored, 0 stores
+                pinned phrases only (TTS_CACHE_MIN_REPEATS).
+            max_chars (int): Longer texts are never cached (TTS_CACHE_MAX_CHARS).
+        """
+        self.path = path or os.getenv("TTS_CACHE_PATH", "data/tts_cache.bin")
+        self.size = (size_mb or int(os.getenv("TTS_CACHE_SIZE_MB", "64"))) * 2**20
+        self.block_size = (block_kb or int(os.getenv("TTS_CACHE_BLOCK_KB", "64"))) * 2**10
+        self.min_repeats = (
+            min_repeats
+            if min_repeats is not None
+            else int(os.getenv("TTS_CACHE_MIN_REPEATS", "2"))
+        )
+        self.max_chars = max_chars or int(os.getenv("TTS_CACHE_MAX_CHARS", "300"))
+        self.block_count = self.size // self.block_size
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < self.size:
+                os.ftruncate(fd, self.size)
+            self._mmap = mmap.mmap(fd, self.size)
+        finally:
+            os.close(fd)
+
+        self._db = sqlite3.connect(
+            f"{self.path}.index", check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+        self._check_layout()
+
+        self.pinned = set()
+        self._seen: "OrderedDict[str, int]" = OrderedDict()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+
+    @classmethod
+    def get_instance(cls) -> "TTSCacheService":
+        """Return the process-wide cache."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def cache_stats(cls) -> Optional[dict]:
+        """Return the counters of the process-wide cache, None if it is not in use."""
+        return cls._instance.stats() if cls._instance else None
+
+    def _check_layout(self):
+        """Drop the index if the segment file was resized or re-blocked."""
+        with self._db_lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                layout = dict(self._db.execute("SELECT name, value FROM tts_meta"))
+                if layout != {"size": self.size, "block_size": self.block_size}:
+                    if layout:
+                        logger.info("TTS cache layout changed, clearing the index")
+                    self._db.execute("DELETE FROM tts_entries")
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO tts_meta (name, value) VALUES (?, ?)",
+                        [("size", self.size), ("block_size", self.block_size)],
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def pin(self, texts: Iterable[str]):
+        """Always cache these phrases, regardless of how often they repeat."""
+        self.pinned.update(normalize_text(t) for t in texts if t)
+
+    def should_store(self, key: str, text: str) -> bool:
+        """Count a synthesis of the phrase and decide whether to store its audio."""
+        normalized = normalize_text(text)
+        if normalized in self.pinned:
+            return True
+        if self.min_repeats <= 0 or len(normalized) > self.max_chars:
+            return False
+        count = self._seen.pop(key, 0) + 1
+        self._seen[key] = count
+        while len(self._seen) > 10000:
+            self._seen.popitem(last=False)
+        return count >= self.min_repeats
+
+    def get(self, key: str) -> Optional[Tuple[bytes, int, int]]:
+        """
+        Look up a phrase.
+
+        Returns:
+            tuple: (pcm, sample_rate, num_channels), or None on a miss.
+        """
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT blocks, length, sample_rate, num_channels, checksum "
+                "FROM tts_entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            blocks, length, sample_rate, num_channels, checksum = row
+            audio = self._read(blocks, length)
+            if zlib.crc32(audio) != checksum:
+                # Overwritten by another process after an eviction
+                self.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE tts_entries SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+        self.hits += 1
+        return audio, sample_rate, num_channels
+
+    def put(self, key: str, audio: bytes, sample_rate: int, num_channels: int) -> bool:
+        """Store a phrase, evicting the least recently used ones to make room."""
+        needed = -(-len(audio) // self.block_size)
+        if not audio or needed > self.block_count:
+            return False
+        with self._db_lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if self._db.execute(
+                    "SELECT 1 FROM tts_entries WHERE key = ?", (key,)
+                ).fetchone():
+                    self._db.execute("COMMIT")
+                    return True
+                free = self._free_blocks()
+                while len(free) < needed:
+                    victim, blocks = self._db.execute(
+                        "SELECT key, blocks FROM tts_entries ORDER BY last_used LIMIT 1"
+                    ).fetchone()
+                    self._db.execute("DELETE FROM tts_entries WHERE key = ?", (victim,))
+                    free.extend(int(b) for b in blocks.split(","))
+                    self.evicted += 1
+                blocks = sorted(free)[:needed]
+                # Write the audio before the index row so readers never see a
+                # committed entry pointing at unwritten blocks
+                self._write(blocks, audio)
+                self._db.execute(
+                    "INSERT INTO tts_entries "
+                    "(key, blocks, length, sample_rate, num_channels, checksum, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        ",".join(map(str, blocks)),
+                        len(audio),
+                        sample_rate,
+                        num_channels,
+                        zlib.crc32(audio),
+                        time.time(),
+                    ),
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        self.stored += 1
+        return True
+
+    def _free_blocks(self) -> List[int]:
+        used = set()
+        for (blocks,) in self._db.execute("SELECT blocks FROM tts_entries"):
+            used.update(int(b) for b in blocks.split(","))
+        return [b for b in range(self.block_count) if b not in used]
+
+    def _read(self, blocks: str, length: int) -> bytes:
+        chunks = []
+        for b in blocks.split(","):
+            start = int(b) * self.block_size
+            chunks.append(self._mmap[start : start + self.block_size])
+        return b"".join(chunks)[:length]
+
+    def _write(self, blocks: List[int], audio: bytes):
+        for i, b in enumerate(blocks):
+            chunk = audio[i * self.block_size : (i + 1) * self.block_size]
+            start = b * self.block_size
+            self._mmap[start : start + len(chunk)] = chunk
+
+    def stats(self) -> dict:
+        with self._db_lock:
+            entries, used = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM tts_entries"
+            ).fetchone()
+        return {
+            "entries": entries,
+            "bytes": used,
+            "capacity_bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stored": self.stored,
+            "evicted": self.evicted,
+        }
+
+
+def add_tts_cache(
+    tts: TTSService,
+    provider: str,
+    model_id: Optional[str] = None,
+    voice_id: Optional[str] = None,
+    voice_instructions: Optional[str] = None,
+    pinned: Optional[Iterable[str]] = None,
+    cache: Optional[TTSCacheService] = None,
+) -> TTSService:
+    """
+    Serve repeated phrases of a TTS service from the persistent cache.
+
+    The service's run_tts is wrapped: on a hit the cached PCM is pushed
+    downstream to the output transport without calling the provider, on a
+    miss the provider's audio is passed through and stored once the phrase
+    qualifies (see TTSCacheService.should_store). Interrupted or failed
+    syntheses are never stored.
+
+    Args:
+        tts (TTSService): The provider service to wrap.
+        provider (str): Provider name, part of the cache key.
+        model_id (str): Model, part of the cache key.
+        voice_id (str): Voice, part of the cache key.
+        voice_instructions (str): Voice instructions, part of the cache key.
+        pinned (Iterable[str]): Phrases that are always cached, e.g. the greeting.
+        cache (TTSCacheService): Defaults to the process-wide cache.
+
+    Returns:
+        TTSService: The same service instance.
+    """
+    cache = cache or TTSCacheService.get_instance()
+    cache.pin(pinned or [])
+    run_tts = tts.run_tts
+    pending = set()
+
+    async def store(key: str, audio: bytes, sample_rate: int, num_channels: int):
+        try:
+            await asyncio.to_thread(cache.put, key, audio, sample_rate, num_channels)
+        except Exception as e:
+            logger.warning(f"Failed to store TTS audio in the cache: {e}")
+
+    async def cached_run_tts(text: str) -> AsyncGenerator[Frame, None]:
+        key = cache_key(provider, model_id, voice_id, voice_instructions, text)
+        hit = await asyncio.to_thread(cache.get, key)
+        # Audio stored at another rate would be resampled on every playback,
+        # synthesize it again at the service's rate instead
+        if hit and hit[1] == tts.sample_rate:
+            audio, sample_rate, num_channels = hit
+            await tts.start_ttfb_metrics()
+            yield TTSStartedFrame()
+            chunk = int(sample_rate * CHUNK_SECONDS) * 2 * num_channels
+            for offset in range(0, len(audio), chunk):
+                await tts.stop_ttfb_metrics()
+                yield TTSAudioRawFrame(
+                    audio[offset : offset + chunk], sample_rate, num_channels
+                )
+            yield TTSStoppedFrame()
+            return
+
+        keep = cache.should_store(key, text)
+        chunks, sample_rate, num_channels = [], None, 1
+        async for frame in run_tts(text):
+            if isinstance(frame, ErrorFrame):
+                keep = False
+            elif keep and isinstance(frame, TTSAudioRawFrame):
+                if sample_rate is None:
+                    sample_rate, num_channels = frame.sample_rate, frame.num_channels
+                if frame.sample_rate == sample_rate:
+                    chunks.append(frame.audio)
+                else:
+                    keep = False
+            yield frame
+
+        if keep and chunks:
+            task = asyncio.create_task(
+                store(key, b"".join(chunks), sample_rate, num_channels)
+            )
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+    tts.run_tts = cached_run_tts
+    return tts
+
+
+async def presynthesize(
+    tts: TTSService,
+    text: str,
+    provider: str,
+    model_id: Optional[str] = None,
+    voice_id: Optional[str] = None,
+    voice_instructions: Optional[str] = None,
+    cache: Optional[TTSCacheService] = None,
+) -> bool:
+    """
+    Synthesize a phrase outside of a pipeline and store it in the cache.
+
+    The key arguments must match the ones the session's TTS service is
+    wrapped with (see add_tts_cache), so the session later gets a hit.
+
+    Args:
+        tts (TTSService): A TTS service that is not part of a running pipeline,
+            a hedged one synthesizes on its primary.
+        text (str): The phrase to synthesize.
+        provider (str): Provider name, part of the cache key.
+        model_id (str): Model, part of the cache key.
+        voice_id (str): Voice, part of the cache key.
+        voice_instructions (str): Voice instructions, part of the cache key.
+        cache (TTSCacheService): Defaults to the process-wide cache.
+
+    Returns:
+        bool: Whether the audio is in the cache.
+    """
+    cache = cache or TTSCacheService.get_instance()
+    key = cache_key(provider, model_id, voice_id, voice_instructions, text)
+    if isinstance(tts, HedgedTTSService):
+        # Only the primary's voice is cached
+        tts = tts.primary
+
+    # Outside a pipeline no StartFrame sets the output sample rate. A rate
+    # given to the service's constructor still takes precedence over this one.
+    await tts.start(StartFrame(audio_out_sample_rate=24000))
+    chunks, sample_rate, num_channels = [], None, 1
+    try:
+        hit = await asyncio.to_thread(cache.get, key)
+        if hit and hit[1] == tts.sample_rate:
+            return True
+        # Call the provider directly, bypassing a cache wrapper on the instance
+        async for frame in type(tts).run_tts(tts, text):
+            if isinstance(frame, ErrorFrame):
+                raise RuntimeError(frame.error)
+            if isinstance(frame, TTSAudioRawFrame):
+                sample_rate, num_channels = frame.sample_rate, frame.num_channels
+                chunks.append(frame.audio)
+    finally:
+        await tts.stop(EndFrame())
+    if not chunks:
+        return False
+    return await asyncio.to_thread(
+        cache.put, key, b"".join(chunks), sample_rate, num_channels
+    )
@@ -7,6 +7,9 @@ from google import genai
 from google.genai import types
 from google.genai.types import HttpOptions
 
+from models.memory import MemoryOperation, UserMemory
+from utils.transcript import serialize_transcript
+
 
 class UserMemoryService:
     def __init__(self):
@@ -21,17 +24,21 @@ class UserMemoryService:
 
     def create_user_memory(
         self,
-        conversation_messages: List[str],
+        conversation_messages: List[dict],
         current_user_memory: str = "",
-    
+        raise_errors: bool = False,
+        model: str = "gemini-2.5-pro",
+        thinking_budget: int = -1,
     ) -> str:
         """
         Create a concise user memory from conversation messages and existing user memory.
 
         Args:
-            conversation_messages (List[str]): List of conversation messages.
+            conversation_messages (List[dict]): List of conversation messages.
             current_user_memory (str): Existing user memory.
-            user_context (Optional[Dict[str, Any]]): Additional user context like timezone, preferences, etc.
+            raise_errors (bool): Raise generation errors instead of returning the existing memory.
+            model (str): Gemini model used for the merge.
+            thinking_budget (int): Thinking token budget, -1 lets the model decide.
 
         Returns:
             str: A concise user memory not exceeding 3000 tokens.
@@ -43,10 +50,8 @@ class UserMemoryService:
         current_day = current_datetime.strftime("%A")
 
       
-        # Format conversation messages for better processing
-        formatted_conversation = str(
-            conversation_messages
-        )
+        # Format conversation messages as a compact role-prefixed transcript
+        formatted_conversation = serialize_transcript(conversation_messages)
 
         # Create system instruction with improved prompt
         system_instruction = types.Content(
@@ -83,7 +88,7 @@ class UserMemoryService:
 
         # Generate concise memory using Google Generative AI
         generate_content_config = types.GenerateContentConfig(
-            thinking_config=types.ThinkingConfig(thinking_budget=-1),
+            thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget),
             response_mime_type="text/plain",
             max_output_tokens=3000,
             temperature=0.3,  # Lower temperature for more consistent outputs
@@ -91,7 +96,7 @@ class UserMemoryService:
 
         try:
             response = self.client.models.generate_content(
-                model="gemini-2.5-pro",
+                model=model,
                 contents=[system_instruction, content],
                 config=generate_content_config,
             )
@@ -101,9 +106,120 @@ class UserMemoryService:
 
         except Exception as e:
             print(f"Error generating memory: {e}")
+            if raise_errors:
+                raise
             return current_user_memory  # Return existing memory if generation fails
 
 
+    def create_memory_operations(
+        self,
+        conversation_messages: List[dict],
+        current_memory: UserMemory,
+        raise_errors: bool = False,
+        model: str = "gemini-2.5-pro",
+        thinking_budget: int = -1,
+    ) -> List[MemoryOperation]:
+        """
+        Work out how a conversation changes the user's memory.
+
+        Unlike create_user_memory the model only writes the changes: facts to
+        add, facts to update and facts to remove, referring to existing facts
+        by id. Output tokens scale with what the conversation taught, not
+        with the size of the memory.
+
+        Args:
+            conversation_messages (List[dict]): List of conversation messages.
+            current_memory (UserMemory): The memory the operations apply to.
+            raise_errors (bool): Raise generation errors instead of returning no operations.
+            model (str): Gemini model used for the merge.
+            thinking_budget (int): Thinking token budget, -1 lets the model decide.
+
+        Returns:
+            List[MemoryOperation]: The operations, in the order to apply them.
+        """
+        current_datetime = datetime.now()
+        system_instruction = types.Content(
+            role="user",
+            parts=[
+                types.Part.from_text(
+                    text=self._get_operations_prompt(
+                        current_datetime.strftime("%Y-%m-%d"),
+                        current_datetime.strftime("%A"),
+                    )
+                )
+            ],
+        )
+
+        facts = "\n".join(
+            f"[{fact.id}] {fact.type.value} ({fact.confidence:.1f}): {fact.text}"
+            for fact in current_memory.facts
+        )
+        content = types.Content(
+            role="user",
+            parts=[
+                types.Part.from_text(
+                    text=f"=== EXISTING FACTS ===\n{facts or '(none)'}\n\n"
+                    f"=== NEW CONVERSATION ===\n{serialize_transcript(conversation_messages)}"
+                )
+            ],
+        )
+
+        generate_content_config = types.GenerateContentConfig(
+            thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget),
+            response_mime_type="application/json",
+            response_schema=list[MemoryOperation],
+            max_output_tokens=1500,
+            temperature=0.3,
+        )
+
+        try:
+            response = self.client.models.generate_content(
+                model=model,
+                contents=[system_instruction, content],
+                config=generate_content_config,
+            )
+            return [
+                MemoryOperation.model_validate(operation)
+                for operation in json.loads(response.text or "[]")
+            ]
+
+        except Exception as e:
+            print(f"Error generating memory operations: {e}")
+            if raise_errors:
+                raise
+            return []
+
+    def _get_operations_prompt(self, current_date: str, current_day: str) -> str:
+        """
+        Generate the system prompt for memory operations.
+
+        Args:
+            current_date (str): Current date in YYYY-MM-DD format.
+            current_day (str): Current day of the week.
+
+        Returns:
+            str: System prompt for memory operations.
+        """
+        return f"""You maintain the long-term memory of a supportive voice companion about one user. The memory is a list of facts, each with an id, a type and a confidence. Read the new conversation and output only the changes it makes to the memory, as a JSON list of operations.
+
+CURRENT CONTEXT:
+- Date: {current_date}
+- Day: {current_day}
+
+OPERATIONS:
+- {{"op": "add", "type": ..., "text": ..., "confidence": ...}} for something new worth remembering.
+- {{"op": "update", "id": ..., "text": ..., "confidence": ...}} when the conversation corrects, refines or confirms an existing fact. Give the complete new text.
+- {{"op": "remove", "id": ...}} when a fact is no longer true or the user asks to forget it.
+
+TYPES: identity (name, age, work, location), relationship, preference, goal, event (with its date when known), wellbeing (feelings, health, concerns), other.
+
+RULES:
+- One short third-person sentence per fact, with absolute dates instead of "yesterday" or "next week".
+- Only use ids from the existing facts. Never repeat a fact that is already there unchanged.
+- Confidence is 0 to 1: how sure you are that the fact is true and still current.
+- Skip small talk and anything said only by the assistant.
+- Output [] if the conversation changes nothing."""
+
     def _get_system_prompt(
         self, current_date: str, current_time: str, current_day: str
     ) -> str:
@@ -156,6 +272,121 @@ INSTRUCTIONS:
 
 Process the provided information and create an updated user memory following these guidelines."""
 
+    def create_greeting(
+        self,
+        user_memory: str,
+        user_name: Optional[str] = None,
+        raise_errors: bool = False,
+        model: str = "gemini-2.5-flash",
+    ) -> Optional[str]:
+        """
+        Write a short personalized opening line for the user's next session.
+
+        Args:
+            user_memory (str): The user's consolidated memory.
+            user_name (str): The user's name, if known.
+            raise_errors (bool): Raise generation errors instead of returning None.
+            model (str): Gemini model used for the greeting.
+
+        Returns:
+            str: One or two spoken sentences, or None if generation failed.
+        """
+        system_instruction = types.Content(
+            role="user",
+            parts=[
+                types.Part.from_text(
+                    text="""You are a warm, supportive companion opening a new voice conversation with someone you have talked to before. Write the first thing you say: one or two short sentences, at most 25 words. Greet them by name if known and gently refer to one recent topic from their memory, without sensitive details, diagnoses or anything they might not want said out loud. End with an open, low-pressure question. Plain spoken text only, no emojis, markdown or quotes."""
+                )
+            ],
+        )
+
+        input_text = f"User Memory: {user_memory}"
+        if user_name:
+            input_text = f"User Name: {user_name}\n{input_text}"
+        content = types.Content(
+            role="user",
+            parts=[types.Part.from_text(text=input_text)],
+        )
+
+        generate_content_config = types.GenerateContentConfig(
+            thinking_config=types.ThinkingConfig(thinking_budget=0),
+            response_mime_type="text/plain",
+            max_output_tokens=100,
+            temperature=0.7,
+        )
+
+        try:
+            response = self.client.models.generate_content(
+                model=model,
+                contents=[system_instruction, content],
+                config=generate_content_config,
+            )
+            return response.text.strip().strip('"') or None
+        except Exception as e:
+            print(f"Error generating greeting: {e}")
+            if raise_errors:
+                raise
+            return None
+
+    def summarize_conversation(
+        self,
+        conversation_messages: List[dict],
+        previous_summary: str = "",
+        raise_errors: bool = False,
+        model: str = "gemini-2.5-flash",
+    ) -> str:
+        """
+        Fold the older part of a live conversation into a running summary.
+
+        Args:
+            conversation_messages (List[dict]): Messages to fold into the summary.
+            previous_summary (str): Summary of the messages before them.
+            raise_errors (bool): Raise generation errors instead of returning the previous summary.
+            model (str): Gemini model used for the summary.
+
+        Returns:
+            str: The updated summary.
+        """
+        system_instruction = types.Content(
+            role="user",
+            parts=[
+                types.Part.from_text(
+                    text="""You maintain the running summary of an ongoing supportive voice conversation, so the assistant can continue it without the full transcript. Merge the new turns into the existing summary. Keep what the user shared (events, feelings, names, concerns), what the assistant suggested or asked, and anything left open. Write compact third-person notes, at most 250 words, no preamble."""
+                )
+            ],
+        )
+
+        input_parts = []
+        if previous_summary.strip():
+            input_parts.append(f"=== SUMMARY SO FAR ===\n{previous_summary}\n")
+        input_parts.append(
+            f"=== NEW TURNS ===\n{serialize_transcript(conversation_messages)}"
+        )
+        content = types.Content(
+            role="user",
+            parts=[types.Part.from_text(text="\n".join(input_parts))],
+        )
+
+        generate_content_config = types.GenerateContentConfig(
+            thinking_config=types.ThinkingConfig(thinking_budget=0),
+            response_mime_type="text/plain",
+            max_output_tokens=600,
+            temperature=0.2,
+        )
+
+        try:
+            response = self.client.models.generate_content(
+                model=model,
+                contents=[system_instruction, content],
+                config=generate_content_config,
+            )
+            return response.text.strip()
+        except Exception as e:
+            print(f"Error generating conversation summary: {e}")
+            if raise_errors:
+                raise
+            return previous_summary
+
     def get_memory_summary(self, user_memory: str) -> str:
         """
         Generate a brief summary of the user memory for quick reference.
@@ -0,0 +1,240 @@
+import os
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from importlib import resources
+from typing import List, Optional, Tuple
+
+import numpy as np
+import onnxruntime
+from loguru import logger
+from pipecat.audio.vad.vad_analyzer import VADAnalyzer, VADParams
+
+# Same reset period pipecat uses for its per-session Silero model
+MODEL_RESET_STATES_TIME = 5.0
+
+
+def _context_size(sample_rate: int) -> int:
+    return 64 if sample_rate == 16000 else 32
+
+
+def _window_size(sample_rate: int) -> int:
+    return 512 if sample_rate == 16000 else 256
+
+
+class SileroVADEngine:
+    """Process-wide Silero VAD model shared by every session.
+
+    Sessions submit one window at a time together with their own recurrent
+    state. A collector thread groups the pending windows into batches and a
+    small thread pool scores each batch with a single ONNX call.
+    """
+
+    _instance: Optional["SileroVADEngine"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        num_threads: Optional[int] = None,
+    ):
+        """
+        Load the model and start the collector thread.
+
+        Args:
+            max_batch_size (int): Largest number of windows scored in one call (VAD_MAX_BATCH).
+            max_wait_ms (float): How long to wait for more windows before scoring (VAD_MAX_WAIT_MS).
+            num_threads (int): Number of inference threads (VAD_ENGINE_THREADS).
+        """
+        self.max_batch_size = max_batch_size or int(os.getenv("VAD_MAX_BATCH", "64"))
+        self.max_wait = (
+            max_wait_ms
+            if max_wait_ms is not None
+            else float(os.getenv("VAD_MAX_WAIT_MS", "2"))
+        ) / 1000
+        num_threads = num_threads or int(os.getenv("VAD_ENGINE_THREADS", "2"))
+
+        model_file_path = str(
+            resources.files("pipecat.audio.vad.data").joinpath("silero_vad.onnx")
+        )
+        opts = onnxruntime.SessionOptions()
+        opts.inter_op_num_threads = 1
+        opts.intra_op_num_threads = 1
+        self._session = onnxruntime.InferenceSession(
+            model_file_path, providers=["CPUExecutionProvider"], sess_options=opts
+        )
+
+        self._requests: "queue.Queue[Tuple[int, np.ndarray, np.ndarray, Future]]" = (
+            queue.Queue()
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=num_threads, thread_name_prefix="silero-vad"
+        )
+        self._sessions = 0
+        self._sessions_lock = threading.Lock()
+        self._collector = threading.Thread(
+            target=self._collect, name="silero-vad-collector", daemon=True
+        )
+        self._collector.start()
+        self.batches = 0
+        self.windows = 0
+        logger.info("Loaded shared Silero VAD engine")
+
+    @classmethod
+    def get_instance(cls) -> "SileroVADEngine":
+        """Return the process-wide engine, loading the model on first use."""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def register(self):
+        """Count a live session, used to size the batching window."""
+        with self._sessions_lock:
+            self._sessions += 1
+
+    def unregister(self):
+        with self._sessions_lock:
+            self._sessions = max(0, self._sessions - 1)
+
+    def score(
+        self, window: np.ndarray, state: np.ndarray, sample_rate: int
+    ) -> Future:
+        """
+        Queue one window for scoring.
+
+        Args:
+            window (np.ndarray): Float32 array of shape (1, context + samples).
+            state (np.ndarray): Float32 recurrent state of shape (2, 1, 128).
+            sample_rate (int): 8000 or 16000.
+
+        Returns:
+            Future: Resolves to (confidence, new_state).
+        """
+        future: Future = Future()
+        self._requests.put((sample_rate, window, state, future))
+        return future
+
+    def stats(self) -> dict:
+        return {
+            "sessions": self._sessions,
+            "pending": self._requests.qsize(),
+            "batches": self.batches,
+            "windows": self.windows,
+        }
+
+    def _collect(self):
+        """Group queued windows into batches and hand them to the thread pool."""
+        while True:
+            batch = [self._requests.get()]
+            # No point in waiting for windows from other sessions if there are none
+            max_batch = min(self.max_batch_size, max(1, self._sessions))
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        batch.append(self._requests.get_nowait())
+                    else:
+                        batch.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            by_rate: dict = {}
+            for request in batch:
+                by_rate.setdefault(request[0], []).append(request)
+            for sample_rate, requests in by_rate.items():
+                self._executor.submit(self._run, sample_rate, requests)
+
+    def _run(self, sample_rate: int, requests: List[tuple]):
+        """Score a batch of windows that share a sample rate."""
+        try:
+            x = np.concatenate([request[1] for request in requests], axis=0)
+            state = np.concatenate([request[2] for request in requests], axis=1)
+            out, new_state = self._session.run(
+                None,
+                {
+                    "input": x,
+                    "state": state,
+                    "sr": np.array(sample_rate, dtype="int64"),
+                },
+            )
+            self.batches += 1
+            self.windows += len(requests)
+            for i, request in enumerate(requests):
+                request[3].set_result(
+                    (float(out[i][0]), new_state[:, i : i + 1, :].copy())
+                )
+        except Exception as e:
+            for request in requests:
+                if not request[3].done():
+                    request[3].set_exception(e)
+
+
+class SharedSileroVADAnalyzer(VADAnalyzer):
+    """Silero VAD analyzer backed by the shared SileroVADEngine.
+
+    Each analyzer keeps its own recurrent state and audio context, only the
+    model and the inference threads are shared.
+    """
+
+    def __init__(
+        self,
+        *,
+        engine: Optional[SileroVADEngine] = None,
+        sample_rate: Optional[int] = None,
+        params: Optional[VADParams] = None,
+    ):
+        super().__init__(sample_rate=sample_rate, params=params)
+        self._engine = engine or SileroVADEngine.get_instance()
+        self._engine.register()
+        weakref.finalize(self, self._engine.unregister)
+        self._state = np.zeros((2, 1, 128), dtype=np.float32)
+        self._window: Optional[np.ndarray] = None
+        self._last_reset_time = 0
+
+    def set_sample_rate(self, sample_rate: int):
+        if sample_rate != 16000 and sample_rate != 8000:
+            raise ValueError(
+                f"Silero VAD sample rate needs to be 16000 or 8000 (sample rate: {sample_rate})"
+            )
+        super().set_sample_rate(sample_rate)
+        # Preallocated (1, context + samples) window reused for every call
+        self._window = np.zeros(
+            (1, _context_size(self.sample_rate) + _window_size(self.sample_rate)),
+            dtype=np.float32,
+        )
+
+    def num_frames_required(self) -> int:
+        return _window_size(self.sample_rate)
+
+    def voice_confidence(self, buffer) -> float:
+        try:
+            context_size = _context_size(self.sample_rate)
+            audio_int16 = np.frombuffer(buffer, np.int16)
+            np.multiply(
+                audio_int16, 1 / 32768.0, out=self._window[0, context_size:], casting="unsafe"
+            )
+
+            confidence, self._state = self._engine.score(
+                self._window, self._state, self.sample_rate
+            ).result(timeout=1.0)
+
+            # Carry the tail of this window over as the next window's context
+            self._window[0, :context_size] = self._window[0, -context_size:]
+
+            # Same periodic reset as SileroVADAnalyzer
+            curr_time = time.time()
+            if curr_time - self._last_reset_time >= MODEL_RESET_STATES_TIME:
+                self._state = np.zeros((2, 1, 128), dtype=np.float32)
+                self._window[0, :context_size] = 0
+                self._last_reset_time = curr_time
+
+            return confidence
+        except Exception as e:
+            logger.error(f"Error analyzing audio with shared Silero VAD: {e}")
+            return 0
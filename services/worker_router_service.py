@@ -0,0 +1,222 @@
+import asyncio
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from loguru import logger
+
+# Prefix the front process adds to pc_ids so renegotiations find their worker
+_PC_ID_PATTERN = re.compile(r"^w(\d+)-(.+)$")
+
+
+def encode_pc_id(worker: int, pc_id: str) -> str:
+    return f"w{worker}-{pc_id}"
+
+
+def decode_pc_id(pc_id: str) -> Tuple[Optional[int], str]:
+    """Split a front pc_id into (worker index, worker-local pc_id)."""
+    match = _PC_ID_PATTERN.match(pc_id or "")
+    if not match:
+        return None, pc_id
+    return int(match.group(1)), match.group(2)
+
+
+class Worker:
+    """A server.py worker process as seen by the front process."""
+
+    def __init__(self, index: int, url: str):
+        self.index = index
+        self.url = url.rstrip("/")
+        self.healthy = False
+        self.free_capacity = 0
+        self.active_sessions = 0
+        self.max_sessions = 0
+        self.draining = False
+        self.loop_lag_ms = 0.0
+        # Last time the worker answered its health check as live
+        self.checked_at = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "worker": self.index,
+            "url": self.url,
+            "healthy": self.healthy,
+            "active_sessions": self.active_sessions,
+            "free_capacity": self.free_capacity,
+            "max_sessions": self.max_sessions,
+            "draining": self.draining,
+            "loop_lag_ms": self.loop_lag_ms,
+        }
+
+
+class WorkerRouter:
+    """
+    Routes requests from the front process to server.py workers.
+
+    New sessions go to the healthy worker with the most free capacity, as
+    reported by each worker's /ready endpoint, unless its event loop lags
+    more than `lag_budget_ms`. WebRTC pc_ids handed to
+    clients carry the index of the owning worker, so renegotiations are sent
+    back to the process holding the SmallWebRTCConnection without any shared
+    state between processes.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        poll_interval: Optional[float] = None,
+        lag_budget_ms: Optional[float] = None,
+        secret: Optional[str] = None,
+    ):
+        """
+        Args:
+            urls (List[str]): Base URLs of the workers, in worker index order.
+            poll_interval (float): Seconds between /ready polls (WORKER_POLL_INTERVAL).
+            lag_budget_ms (float): Event loop lag above which a worker is placed last (WORKER_LAG_BUDGET_MS).
+            secret (str): Sent to the workers with every request, their /worker endpoints
+                only accept it (WORKER_SECRET).
+        """
+        self.set_workers(urls)
+        self.secret = secret or os.getenv("WORKER_SECRET")
+        self.poll_interval = poll_interval or float(
+            os.getenv("WORKER_POLL_INTERVAL", "2")
+        )
+        self.lag_budget_ms = lag_budget_ms or float(
+            os.getenv("WORKER_LAG_BUDGET_MS", "50")
+        )
+        self.timeout = aiohttp.ClientTimeout(
+            total=float(os.getenv("WORKER_REQUEST_TIMEOUT", "30"))
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._poller: Optional[asyncio.Task] = None
+        # Daily task ids are chosen by the worker, remember where they live
+        self._daily_tasks: Dict[str, int] = {}
+
+    def set_workers(self, urls: List[str]):
+        self.workers = [Worker(i, url) for i, url in enumerate(urls)]
+
+    async def start(self):
+        self._session = aiohttp.ClientSession(timeout=self.timeout)
+        await self.poll()
+        self._poller = asyncio.create_task(self._poll_loop())
+
+    async def stop(self):
+        if self._poller:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    def get(self, index: Optional[int]) -> Optional[Worker]:
+        if index is None or not 0 <= index < len(self.workers):
+            return None
+        return self.workers[index]
+
+    def candidates(self) -> List[Worker]:
+        """
+        Healthy workers with free capacity, least loaded first.
+
+        Sessions of a worker whose event loop already lags compete for its
+        GIL, another one would add audio jitter to all of them, so such
+        workers only get sessions when the others are full.
+        """
+        workers = [w for w in self.workers if w.healthy and w.free_capacity > 0]
+        return sorted(
+            workers,
+            key=lambda w: (
+                w.loop_lag_ms > self.lag_budget_ms,
+                -w.free_capacity,
+                w.active_sessions,
+            ),
+        )
+
+    def reserve(self, worker: Worker):
+        # Account for the new session until the next poll confirms it
+        worker.free_capacity -= 1
+        worker.active_sessions += 1
+
+    def remember_task(self, task_id: str, worker: Worker):
+        self._daily_tasks[task_id] = worker.index
+
+    def forget_task(self, task_id: str) -> Optional[int]:
+        return self._daily_tasks.pop(task_id, None)
+
+    async def request(
+        self,
+        worker: Worker,
+        method: str,
+        path: str,
+        params: Optional[dict] = None,
+        json: Optional[dict] = None,
+    ) -> Tuple[int, dict, dict]:
+        """
+        Forward a request to a worker.
+
+        Returns:
+            tuple: Status code, JSON body and the response headers worth passing on.
+        """
+        secret = {"X-Worker-Secret": self.secret} if self.secret else None
+        async with self._session.request(
+            method, worker.url + path, params=params, json=json, headers=secret
+        ) as response:
+            try:
+                body = await response.json(content_type=None)
+            except ValueError:
+                body = {"detail": await response.text()}
+            headers = {}
+            if "Retry-After" in response.headers:
+                headers["Retry-After"] = response.headers["Retry-After"]
+            return response.status, body, headers
+
+    async def poll(self):
+        await asyncio.gather(*(self._poll_worker(w) for w in self.workers))
+
+    async def _poll_worker(self, worker: Worker):
+        try:
+            async with self._session.get(
+                worker.url + "/ready", timeout=aiohttp.ClientTimeout(total=2)
+            ) as response:
+                status = await response.json(content_type=None)
+            was_healthy = worker.healthy
+            # A worker whose warm-up failed still answers, but will never be ready
+            worker.healthy = status.get("live", True)
+            worker.free_capacity = status.get("free_capacity", 0)
+            worker.active_sessions = status.get("active_sessions", 0)
+            worker.max_sessions = status.get("max_sessions", 0)
+            worker.draining = status.get("draining", False)
+            worker.loop_lag_ms = status.get("loop_lag_ms", 0.0)
+            if worker.healthy:
+                worker.checked_at = time.time()
+            if worker.healthy and not was_healthy:
+                logger.info(f"Worker {worker.index} at {worker.url} is up")
+            elif was_healthy and not worker.healthy:
+                logger.warning(f"Worker {worker.index} at {worker.url} failed its warm-up")
+        except Exception as e:
+            if worker.healthy:
+                logger.warning(f"Worker {worker.index} at {worker.url} is down: {e}")
+            worker.healthy = False
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self.poll()
+
+    def readiness(self) -> dict:
+        healthy = [w for w in self.workers if w.healthy]
+        free_capacity = sum(max(0, w.free_capacity) for w in healthy)
+        return {
+            "ready": free_capacity > 0,
+            "workers": len(self.workers),
+            "healthy_workers": len(healthy),
+            "draining_workers": sum(1 for w in healthy if w.draining),
+            "max_sessions": sum(w.max_sessions for w in healthy),
+            "active_sessions": sum(w.active_sessions for w in healthy),
+            "free_capacity": free_capacity,
+        }
@@ -0,0 +1,169 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+from typing import Callable, List, Optional
+
+from loguru import logger
+
+from services.worker_router_service import WorkerRouter
+
+
+class WorkerProcess:
+    """A local server.py worker process started by the front process."""
+
+    def __init__(self, index: int, port: int):
+        self.index = index
+        self.port = port
+        self.process: Optional[multiprocessing.Process] = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.last_restart_reason: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "worker": self.index,
+            "pid": self.process.pid if self.process else None,
+            "alive": bool(self.process and self.process.is_alive()),
+            "uptime_secs": round(time.time() - self.started_at, 1) if self.started_at else None,
+            "restarts": self.restarts,
+            "last_restart_reason": self.last_restart_reason,
+        }
+
+
+class WorkerSupervisor:
+    """
+    Keeps the local worker processes of the front process running.
+
+    Checked after every /ready poll of the router, a worker is restarted
+    when its process has exited, when it has failed its health check for
+    `unhealthy_timeout` seconds (a stuck event loop), and when it drained
+    for recycling (WORKER_RECYCLE_AFTER sessions started, see
+    SessionManager) and its last session ended. Recycles happen one worker
+    at a time, while all the others are healthy, so capacity never drops by
+    more than one worker.
+    """
+
+    def __init__(
+        self,
+        router: WorkerRouter,
+        target: Callable,
+        host: str,
+        ports: List[int],
+        unhealthy_timeout: Optional[float] = None,
+        stop_timeout: Optional[float] = None,
+    ):
+        """
+        Args:
+            router (WorkerRouter): Router of the front process, whose polls report worker health.
+            target (Callable): Process entry point, called with (index, host, port, parent_pid).
+            host (str): Host the workers listen on.
+            ports (List[int]): Port of each worker, in worker index order.
+            unhealthy_timeout (float): Seconds a worker may fail its health check before a restart (WORKER_UNHEALTHY_TIMEOUT).
+            stop_timeout (float): Seconds a worker gets to shut down before it is killed (WORKER_STOP_TIMEOUT).
+        """
+        self.router = router
+        self.target = target
+        self.host = host
+        self.unhealthy_timeout = unhealthy_timeout or float(
+            os.getenv("WORKER_UNHEALTHY_TIMEOUT", "30")
+        )
+        self.stop_timeout = stop_timeout or float(os.getenv("WORKER_STOP_TIMEOUT", "10"))
+        self.processes = [WorkerProcess(i, port) for i, port in enumerate(ports)]
+        self._context = multiprocessing.get_context("spawn")
+        self._supervisor: Optional[asyncio.Task] = None
+
+    @property
+    def urls(self) -> List[str]:
+        return [f"http://{self.host}:{p.port}" for p in self.processes]
+
+    def spawn_all(self):
+        for worker in self.processes:
+            self._spawn(worker)
+
+    def _spawn(self, worker: WorkerProcess):
+        worker.process = self._context.Process(
+            target=self.target,
+            args=(worker.index, self.host, worker.port, os.getpid()),
+            daemon=True,
+        )
+        worker.process.start()
+        worker.started_at = time.time()
+
+    async def start(self):
+        self._supervisor = asyncio.create_task(self._supervise_loop())
+
+    async def stop(self):
+        if self._supervisor:
+            self._supervisor.cancel()
+            try:
+                await self._supervisor
+            except asyncio.CancelledError:
+                pass
+            self._supervisor = None
+
+    def stop_all(self):
+        """Stop every worker, killing the ones that do not exit in time."""
+        for worker in self.processes:
+            if worker.process and worker.process.is_alive():
+                os.kill(worker.process.pid, signal.SIGINT)
+        for worker in self.processes:
+            if worker.process:
+                worker.process.join(timeout=self.stop_timeout)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+
+    async def _supervise_loop(self):
+        while True:
+            await asyncio.sleep(self.router.poll_interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Worker supervision failed: {e}")
+
+    async def check(self):
+        """Restart dead or stuck workers, then recycle at most one drained worker."""
+        now = time.time()
+        for worker in self.processes:
+            state = self.router.workers[worker.index]
+            if not worker.process.is_alive():
+                await self.restart(worker, f"exited with code {worker.process.exitcode}")
+            elif (
+                not state.healthy
+                and now - max(state.checked_at, worker.started_at) > self.unhealthy_timeout
+            ):
+                await self.restart(worker, "failed its health checks")
+
+        if not all(w.healthy for w in self.router.workers):
+            return
+        for worker in self.processes:
+            state = self.router.workers[worker.index]
+            if state.draining and state.active_sessions == 0:
+                await self.restart(worker, "recycled")
+                return
+
+    async def restart(self, worker: WorkerProcess, reason: str):
+        logger.info(f"Restarting worker {worker.index}: {reason}")
+        state = self.router.workers[worker.index]
+        # No placements until the new process answers its first poll
+        state.healthy = False
+        state.draining = False
+        state.free_capacity = 0
+        process = worker.process
+        if process.is_alive():
+            os.kill(process.pid, signal.SIGINT)
+            await asyncio.to_thread(process.join, self.stop_timeout)
+            if process.is_alive():
+                process.kill()
+                await asyncio.to_thread(process.join)
+        self._spawn(worker)
+        worker.restarts += 1
+        worker.last_restart_reason = reason
+
+    def stats(self) -> dict:
+        return {
+            "unhealthy_timeout": self.unhealthy_timeout,
+            "restarts": sum(w.restarts for w in self.processes),
+            "processes": [w.to_dict() for w in self.processes],
+        }
@@ -0,0 +1,145 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """In-process LRU cache with per-entry expiry and single-flight loading.
+
+    Entries expire after `ttl` seconds (or a per-entry ttl passed to `set`)
+    and the least recently used entry is evicted once `max_size` is reached.
+    `get_or_load` makes concurrent misses for the same key share one load.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        """
+        Args:
+            max_size (int): Maximum number of entries kept.
+            ttl (float): Default time to live of an entry in seconds.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        # Writes during an in-flight load, so a slow load cannot overwrite a
+        # newer value. Only keys being loaded have an entry.
+        self._versions: Dict[Hashable, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entries if needed."""
+        ttl = self.ttl if ttl is None else ttl
+        self._bump(key)
+        if ttl <= 0:
+            self._entries.pop(key, None)
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        """Drop a key from the cache."""
+        self._entries.pop(key, None)
+        self._bump(key)
+
+    def clear(self):
+        self._entries.clear()
+        for key in self._versions:
+            self._versions[key] += 1
+
+    def _bump(self, key: Hashable):
+        if key in self._versions:
+            self._versions[key] += 1
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """
+        Return the cached value, loading it on a miss.
+
+        Concurrent misses for the same key await the same load, which runs
+        in its own task: a caller that is cancelled stops waiting without
+        cancelling the load for the others. None results are returned but
+        not cached.
+
+        Args:
+            key (Hashable): Cache key.
+            loader (Callable): Coroutine function producing the value.
+            ttl (float): Optional time to live for the loaded value.
+
+        Returns:
+            Any: The cached or freshly loaded value.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self._versions[key] = 0
+            task = asyncio.ensure_future(self._load(key, loader, ttl))
+            # Nobody may be left waiting when it fails
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float],
+    ) -> Any:
+        try:
+            value = await loader()
+            if self._versions.get(key) == 0:
+                if value is not None:
+                    self.set(key, value, ttl)
+            else:
+                # Written while loading, the written value is newer
+                value = self._entries.get(key, (0, value))[1]
+            return value
+        finally:
+            self._inflight.pop(key, None)
+            self._versions.pop(key, None)
+
+    def stats(self) -> dict:
+        """Return size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
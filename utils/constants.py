@@ -1,7 +1,11 @@
+import os
 from typing import Optional
 
+from loguru import logger
+
 from models.agent_model import (
     AgentModel,
+    AudioConfig,
     LLMConfig,
     LLMProvider,
     STTConfig,
@@ -14,28 +18,82 @@ default_voice_instructions = (
     "Use a friendly and engaging tone. Speak clearly and at a moderate pace."
 )
 
+# Rate every TTS provider synthesizes at natively; OpenAI only produces 24kHz
+TTS_SAMPLE_RATE = 24000
+# Model of each LLM provider, for the default agent and hedging secondaries
+DEFAULT_LLM_MODELS = {
+    LLMProvider.google: "gemini-2.5-flash",
+    LLMProvider.openai: "gpt-4o-mini",
+    LLMProvider.simulated: "simulated",
+}
+# (model, voice) of each TTS provider
+DEFAULT_TTS_VOICES = {
+    TTSProvider.google: (None, "en-US-Chirp-HD-F"),
+    TTSProvider.openai: ("gpt-4o-mini-tts", "alloy"),
+    TTSProvider.simulated: (None, None),
+}
+# Silero VAD only supports these
+AUDIO_IN_SAMPLE_RATES = (8000, 16000)
+
+
+def get_audio_config(tts_provider: TTSProvider) -> AudioConfig:
+    """Return the sample rate plan of the audio path.
+
+    The input rate (AUDIO_IN_SAMPLE_RATE) is what the VAD and the STT
+    consume, the output rate defaults to the TTS's native rate
+    (AUDIO_OUT_SAMPLE_RATE overrides it for providers that synthesize at any
+    rate). Input audio stops at the STT unless AUDIO_STT_PASSTHROUGH=true.
+    Output is written in 20 ms chunks, AUDIO_OUT_10MS_CHUNKS=4 halves the
+    writes to the transport.
+    """
+    in_sample_rate = int(os.getenv("AUDIO_IN_SAMPLE_RATE", "16000"))
+    if in_sample_rate not in AUDIO_IN_SAMPLE_RATES:
+        logger.warning(f"Unsupported input sample rate {in_sample_rate}, using 16000")
+        in_sample_rate = 16000
+
+    out_sample_rate = int(os.getenv("AUDIO_OUT_SAMPLE_RATE") or TTS_SAMPLE_RATE)
+    if tts_provider == TTSProvider.openai and out_sample_rate != TTS_SAMPLE_RATE:
+        logger.warning(
+            f"OpenAI TTS only produces {TTS_SAMPLE_RATE}Hz, output is resampled to {out_sample_rate}Hz"
+        )
+
+    return AudioConfig(
+        in_sample_rate=in_sample_rate,
+        out_sample_rate=out_sample_rate,
+        out_10ms_chunks=int(os.getenv("AUDIO_OUT_10MS_CHUNKS", "2")),
+        stt_passthrough=os.getenv("AUDIO_STT_PASSTHROUGH", "false").lower() == "true",
+    )
+
 
 def get_default_agent_model(
     prompt: str,
     voice_instructions: Optional[str] = None,
 ) -> AgentModel:
-    """Return a default AgentModel configuration."""
+    """Return a default AgentModel configuration.
+
+    Providers can be swapped with LLM_PROVIDER, STT_PROVIDER and TTS_PROVIDER,
+    e.g. "simulated" for load tests, each with its own default model and voice.
+    """
+    llm_provider = LLMProvider(os.getenv("LLM_PROVIDER", LLMProvider.google.value))
+    tts_provider = TTSProvider(os.getenv("TTS_PROVIDER", TTSProvider.openai.value))
+    tts_model, tts_voice = DEFAULT_TTS_VOICES[tts_provider]
     return AgentModel(
         llm=LLMConfig(
             temperature=0.7,
             prompt=prompt,
             max_tokens=2000,
-            model_id="gemini-2.5-flash",
-            provider=LLMProvider.google,
+            model_id=DEFAULT_LLM_MODELS[llm_provider],
+            provider=llm_provider,
         ),
         tts=TTSConfig(
-            provider=TTSProvider.openai,
-            model_id="gpt-4o-mini-tts",
-            voice_id="alloy",
+            provider=tts_provider,
+            model_id=tts_model,
+            voice_id=tts_voice,
             voice_instructions=voice_instructions or default_voice_instructions,
         ),
         stt=STTConfig(
-            provider=STTProvider.deepgram,
+            provider=STTProvider(os.getenv("STT_PROVIDER", STTProvider.deepgram.value)),
         ),
+        audio=get_audio_config(tts_provider),
         first_message="Hello! How can I assist you today?",
     )
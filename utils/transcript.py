@@ -0,0 +1,109 @@
+import re
+from typing import Any, Iterable, List
+
+ROLE_PREFIXES = {"user": "U", "assistant": "A"}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def message_text(message: Any) -> str:
+    """
+    Return the plain text of a message in any of the formats we store.
+
+    Handles OpenAI style messages ("content" as a string or a list of parts),
+    Google style messages ("parts", as dicts or Content objects) and pipecat
+    TranscriptionMessage objects.
+    """
+    if isinstance(message, dict):
+        content = message.get("content", message.get("parts"))
+    else:
+        content = getattr(message, "content", getattr(message, "parts", message))
+
+    if isinstance(content, str):
+        text = content
+    elif isinstance(content, list):
+        texts = []
+        for part in content:
+            if isinstance(part, str):
+                texts.append(part)
+            elif isinstance(part, dict) and isinstance(part.get("text"), str):
+                texts.append(part["text"])
+            elif isinstance(getattr(part, "text", None), str):
+                texts.append(part.text)
+        text = " ".join(texts)
+    else:
+        text = ""
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def message_role(message: Any) -> str:
+    role = message.get("role") if isinstance(message, dict) else getattr(message, "role", "")
+    # Google contexts call the assistant "model"
+    return "assistant" if role == "model" else role or ""
+
+
+def compact_messages(messages: Iterable[Any]) -> List[dict]:
+    """
+    Reduce a conversation to the user and assistant turns worth remembering.
+
+    System and tool messages and empty messages are dropped, a message
+    repeating the one right before it is removed and consecutive messages
+    of the same role are merged.
+
+    Args:
+        messages (Iterable): Messages in any format understood by message_text.
+
+    Returns:
+        List[dict]: Messages as {"role": ..., "content": ...}.
+    """
+    compacted: List[dict] = []
+    previous = None
+    for message in messages:
+        role = message_role(message)
+        if role not in ROLE_PREFIXES:
+            continue
+        text = message_text(message)
+        if not text:
+            continue
+
+        # Only back-to-back repeats, e.g. a turn finalized twice: the same
+        # answer later in the call is a different turn
+        key = (role, text.lower())
+        if key == previous:
+            continue
+        previous = key
+
+        if compacted and compacted[-1]["role"] == role:
+            compacted[-1]["content"] += " " + text
+        else:
+            compacted.append({"role": role, "content": text})
+    return compacted
+
+
+def serialize_transcript(messages: Iterable[Any]) -> str:
+    """
+    Serialize a conversation into a dense role-prefixed transcript.
+
+    Example:
+        U: I could not sleep again
+        A: That sounds exhausting. What kept you up?
+
+    Args:
+        messages (Iterable): Messages in any format understood by message_text.
+
+    Returns:
+        str: One line per turn.
+    """
+    return "\n".join(
+        f"{ROLE_PREFIXES[message['role']]}: {message['content']}"
+        for message in compact_messages(messages)
+    )
+
+
+def estimate_tokens(messages: Iterable[Any]) -> int:
+    """
+    Rough token count of a conversation, about 4 characters per token.
+
+    Good enough to enforce a context budget without loading a tokenizer.
+    """
+    return sum(len(message_text(message)) // 4 + 4 for message in messages)